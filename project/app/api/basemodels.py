@@ -1,6 +1,9 @@
-from typing import Optional, Set
+from datetime import datetime
+from typing import List, Optional, Set
 from pydantic import BaseModel, Field, validator
 
+from app.api.pagination import PAGE_COLUMNS, DEFAULT_PAGE_COLUMNS, decode_cursor
+
 
 def valid_user_id(cls, user_id):
     """Validate that 'user_id' must contain 10 characters and be string type."""
@@ -10,6 +13,18 @@ def valid_user_id(cls, user_id):
 
     return user_id
 
+
+def valid_month(cls, month):
+    """Validate that a month is in 'YYYY-MM' format, unless left unset."""
+    if month is None or month == 'optional field':
+        return month
+    try:
+        datetime.strptime(month, '%Y-%m')
+    except ValueError:
+        raise AssertionError(f"{month} is not a month in YYYY-MM format.")
+
+    return month
+
 class User(BaseModel):
     """User data model to parse the request JSON body."""
     user_id: str = Field(..., 
@@ -22,7 +37,29 @@ class User(BaseModel):
     # validators
     _valid_user_id = validator('user_id', allow_reuse=True)(valid_user_id)
     
-class GraphRequest(BaseModel):
+class MonthRange(BaseModel):
+    """Optional month bounds of a graph request."""
+    start_month: Optional[str] = 'optional field'
+    end_month: Optional[str] = 'optional field'
+
+    # validators
+    _valid_start_month = validator('start_month', allow_reuse=True)(valid_month)
+    _valid_end_month = validator('end_month', allow_reuse=True)(valid_month)
+
+    def month_range(self):
+        """Return (start_month, end_month) as 'YYYY-MM', None where a bound is not set."""
+        return tuple(None if month in (None, 'optional field') else month
+                     for month in (self.start_month, self.end_month))
+
+
+def valid_graph_type(cls, value):
+    """Validate that graph_type is valid."""
+    graph_list = ['TransactionTable', 'CategoryBarMonth']
+
+    assert value in graph_list, f"{value} is not a valid graph type. Guess I'll die."        
+    return value
+
+class GraphRequest(MonthRange):
     user_id: str = Field(..., 
                          example='000000', 
                          description="Valid user identification number", 
@@ -32,16 +69,63 @@ class GraphRequest(BaseModel):
                             example='CategoryBarMonth', 
                             description="Valid graph type"
                             )
-    start_month: Optional[str] = 'optional field'
-    end_month: Optional[str] = 'optional field'
                                       
+    # validators
+    _valid_user_id = validator('user_id', allow_reuse=True)(valid_user_id)
+    _valid_graph_type = validator('graph_type', allow_reuse=True)(valid_graph_type)
+
+class BatchGraphRequest(MonthRange):
+    user_ids: List[str] = Field(...,
+                                example=['000000', '000001'],
+                                description="Valid user identification numbers",
+                                min_items=1,
+                                max_items=1000
+                                )
+    graph_types: List[str] = Field(...,
+                                   example=['TransactionTable', 'CategoryBarMonth'],
+                                   description="Valid graph types, rendered for every user",
+                                   min_items=1
+                                   )
+
+    # validators
+    _valid_user_ids = validator('user_ids', each_item=True, allow_reuse=True)(valid_user_id)
+    _valid_graph_types = validator('graph_types', each_item=True, allow_reuse=True)(valid_graph_type)
+
+class TransactionPageRequest(BaseModel):
+    user_id: str = Field(...,
+                         example='000000',
+                         description="Valid user identification number",
+                         max_length=6
+                         )
+    page_size: int = Field(50,
+                           description="Transactions per page",
+                           ge=1,
+                           le=500
+                           )
+    cursor: Optional[str] = Field(None,
+                                  description="next_cursor of the previous page, omitted for the first page"
+                                  )
+    columns: List[str] = Field(DEFAULT_PAGE_COLUMNS,
+                               example=DEFAULT_PAGE_COLUMNS,
+                               description="Table columns to return",
+                               min_items=1
+                               )
+
     # validators
     _valid_user_id = validator('user_id', allow_reuse=True)(valid_user_id)
 
-    @validator('graph_type')
-    def valid_graph_type(cls, value):
-        """Validate that graph_type is valid."""
-        graph_list = ['TransactionTable', 'CategoryBarMonth']
+    @validator('columns', each_item=True)
+    def valid_column(cls, value):
+        """Validate that the column can be selected."""
+        assert value in PAGE_COLUMNS, f"{value} is not a transaction table column."
+        return value
 
-        assert value in graph_list, f"{value} is not a valid graph type. Guess I'll die."        
-        return value
\ No newline at end of file
+    @validator('cursor')
+    def valid_cursor(cls, value):
+        """Validate that the cursor was returned by an earlier page."""
+        if value is not None:
+            try:
+                decode_cursor(value)
+            except ValueError as e:
+                raise AssertionError(str(e))
+        return value
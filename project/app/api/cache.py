@@ -0,0 +1,161 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def sizeof(value):
+    """Approximate size of a cached value in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(sizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class LRUCache(object):
+    """Thread-safe least-recently-used cache with a memory budget and TTL.
+
+    Entries are evicted oldest-first once `max_entries` or `max_bytes` is
+    exceeded, and treated as missing once older than `ttl` seconds.
+
+    Usage:
+    >>> cache = LRUCache(max_bytes=64 * 2**20, ttl=300)
+    >>> cache.put(45153, df)
+    >>> cache.get(45153)
+    """
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 256 * 2**20,
+                 ttl: float = 300.0, sizeof=sizeof):
+        """
+        Args:
+            max_entries (int): maximum number of entries.
+            max_bytes (int): memory budget for all entries, as measured by `sizeof`.
+            ttl (float): seconds an entry stays valid. None keeps entries until evicted.
+            sizeof (callable): returns the size of a value in bytes.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sizeof = sizeof
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._stale_hits = 0
+        self._invalidations = 0
+
+    def _remove(self, key):
+        value, size, stored_at = self._entries.pop(key)
+        self._bytes -= size
+        return value
+
+    def _expired(self, stored_at):
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+    def get(self, key, default=None):
+        """Return the cached value for `key`, or `default` if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return default
+            if self._expired(entry[2]):
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def lookup(self, key):
+        """Return `(value, fresh)` for `key`, keeping entries that outlived the TTL.
+
+        For callers that can refresh a stale value more cheaply than rebuilding
+        it. Returns `(None, False)` if `key` is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None, False
+            self._entries.move_to_end(key)
+            if self._expired(entry[2]):
+                self._stale_hits += 1
+                return entry[0], False
+            self._hits += 1
+            return entry[0], True
+
+    def put(self, key, value):
+        """Store `value` under `key`, evicting least recently used entries as needed.
+
+        Values larger than the whole budget are not stored.
+        """
+        size = self._sizeof(value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, key):
+        """Drop `key` from the cache."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self._invalidations += 1
+
+    def invalidate_matching(self, predicate):
+        """Drop every entry whose key satisfies `predicate(key)`."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+                self._invalidations += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+
+    def items(self):
+        """Return a list of `(key, value)` pairs, least recently used first, including expired ones."""
+        with self._lock:
+            return [(key, entry[0]) for key, entry in self._entries.items()]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def statistics(self):
+        """Return cache counters and current memory use."""
+        with self._lock:
+            lookups = self._hits + self._stale_hits + self._misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'stale_hits': self._stale_hits,
+                'invalidations': self._invalidations,
+            }
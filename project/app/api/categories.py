@@ -0,0 +1,95 @@
+from os.path import join, dirname
+
+import numpy as np
+import pandas as pd
+
+
+CATEGORY_PATH = join(dirname(__file__), 'data', 'plaid_categories.csv')
+
+CATEGORY_LEVELS = [
+    'category_name',
+    'parent_category_name',
+    'grandparent_category_name'
+]
+
+
+class CategoryLookup(object):
+    """Immutable Plaid category hierarchy keyed by integer category id.
+
+    Built once from `plaid_categories.csv`. Category names are stored as
+    categoricals, so joining transactions is an `np.searchsorted` over the
+    sorted ids followed by a `take` of category codes, with no per-request
+    DataFrame construction.
+
+    Usage:
+    >>> positions = categories.positions(transactions['category_id'])
+    >>> categories.take(positions, 'parent_category_name')
+    """
+    def __init__(self, frame):
+        """
+        Args:
+            frame (pd.DataFrame): category_id, category_name, parent_category_name
+                and grandparent_category_name columns, one row per category id.
+        """
+        ids = pd.to_numeric(frame['category_id']).to_numpy(dtype=np.int64)
+        if len(np.unique(ids)) != len(ids):
+            raise ValueError("category ids must be unique.")
+
+        order = np.argsort(ids, kind='mergesort')
+        self._ids = ids[order]
+        self._ids.setflags(write=False)
+
+        self._levels = {}
+        for level in CATEGORY_LEVELS:
+            values = pd.Categorical(frame[level].to_numpy()[order])
+            codes = values.codes.copy()
+            codes.setflags(write=False)
+            self._levels[level] = (codes, values.categories)
+
+        # frame in source order for _handle_category_features
+        self._frame = frame.reset_index(drop=True).copy()
+
+    @classmethod
+    def from_csv(cls, path: str = CATEGORY_PATH):
+        return cls(pd.read_csv(path, dtype=str))
+
+    def __len__(self):
+        return len(self._ids)
+
+    def positions(self, category_id):
+        """Return the lookup position of each category id, -1 where unknown.
+
+        Args:
+            category_id: array-like of category ids as strings or integers.
+        """
+        # parse each distinct id once; transactions repeat a few hundred ids
+        codes, uniques = pd.factorize(pd.Series(category_id, copy=False))
+        keys = pd.to_numeric(pd.Series(uniques), errors='coerce').to_numpy(dtype=np.float64)
+        known = ~np.isnan(keys)
+        keys = np.where(known, keys, -1).astype(np.int64)
+
+        positions = np.searchsorted(self._ids, keys)
+        positions[positions >= len(self._ids)] = 0
+        positions = np.where(known & (self._ids[positions] == keys), positions, -1)
+
+        # missing ids have code -1 and map to the appended -1
+        return np.append(positions, -1).take(codes)
+
+    def ids(self, positions):
+        """Return the category ids at `positions` as int64."""
+        return self._ids.take(positions)
+
+    def take(self, positions, level: str):
+        """Return the names of `level` at `positions` as a Categorical.
+
+        Positions must be valid, i.e. unknown ids filtered out beforehand.
+        """
+        codes, categories = self._levels[level]
+        return pd.Categorical.from_codes(codes.take(positions), categories=categories)
+
+    def frame(self):
+        """Return the hierarchy as a DataFrame in source order."""
+        return self._frame.copy()
+
+
+categories = CategoryLookup.from_csv()
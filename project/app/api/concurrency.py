@@ -0,0 +1,78 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedExecutor(object):
+    """Run blocking callables off the event loop on a fixed-size thread pool.
+
+    At most `max_workers` calls run at once; further calls queue up without
+    blocking the event loop.
+
+    Usage:
+    >>> df = await io_executor.run(SaverlifeUtility._generate_dataframe, table='transactions')
+    """
+    def __init__(self, name: str, max_workers: int):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+
+    def _call(self, func):
+        with self._lock:
+            self._active += 1
+        try:
+            result = func()
+        except BaseException:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+        return result
+
+    async def run(self, func, *args, **kwargs):
+        """Await `func(*args, **kwargs)` executed on the pool."""
+        with self._lock:
+            self._submitted += 1
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        return await loop.run_in_executor(self._executor, self._call, call)
+
+    def statistics(self):
+        """Return executor usage counters."""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'active': self._active,
+                'queued': self._submitted - self._completed - self._active,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+# database stage: sized to the connection pool so threads never queue on checkout
+io_executor = BoundedExecutor(
+    name='saverlife-io',
+    max_workers=int(os.getenv('SAVERLIFE_IO_WORKERS', os.getenv('POSTGRES_POOL_MAXSIZE', 10)))
+)
+
+# pandas wrangling, figure rendering and model fitting
+cpu_executor = BoundedExecutor(
+    name='saverlife-cpu',
+    max_workers=int(os.getenv('SAVERLIFE_CPU_WORKERS', os.cpu_count() or 1))
+)
@@ -0,0 +1,438 @@
+"""Monthly aggregate cube of transactions.
+
+Cells hold the sum and count of transactions per bank account, month and
+category id. Category levels (category, parent, grandparent) are rolled up
+from the cells on read, so one cube serves every level. Amounts are summed
+both as whole dollars, the unit of the charts and forecasts, and exactly in
+cents.
+
+The cube is persisted as Arrow IPC files and updated incrementally from a
+per-account (created_at, id) watermark and row count. Build or refresh it from the
+`project` directory; running servers pick up the new files on their next
+lookup:
+
+    python -m app.api.cube build
+    python -m app.api.cube refresh
+    python -m app.api.cube info
+"""
+import argparse
+import os
+import threading
+import time
+from os.path import join, dirname
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.api.cache import LRUCache
+from app.api.categories import categories
+
+
+DEFAULT_CUBE_DIR = join(dirname(__file__), 'data', 'cube')
+
+CUBE_COLUMNS = [
+    'bank_account_id',
+    'month',
+    'category_id',
+    'amount',
+    'amount_cents',
+    'count'
+]
+
+CUBE_DTYPES = {
+    'bank_account_id': 'int64',
+    'month': 'int32',
+    'category_id': 'int64',
+    'amount': 'int64',
+    'amount_cents': 'int64',
+    'count': 'int64'
+}
+
+
+def aggregate(df):
+    """Aggregate wrangled transactions into cube cells.
+
+    Args:
+        df (pd.DataFrame): wrangled transactions with bank_account_id, date,
+            category_id and amount in dollars.
+    Returns:
+        pd.DataFrame: `CUBE_COLUMNS`, one row per account, month and category
+            id, sorted. `month` counts months since 1970-01.
+    """
+    dates = df['date'].to_numpy().astype('datetime64[M]')
+    known = ~np.isnat(dates)
+    amount = df['amount'].to_numpy()[known]
+
+    keys = pd.DataFrame({
+        'bank_account_id': df['bank_account_id'].to_numpy()[known].astype(np.int64),
+        'month': dates[known].astype(np.int64).astype(np.int32),
+        'category_id': df['category_id'].to_numpy()[known].astype(np.int64),
+        # whole dollars per transaction, as Visualize has always summed them
+        'amount': amount.astype(np.int64),
+        'amount_cents': np.round(amount * 100).astype(np.int64),
+        'count': np.ones(len(amount), dtype=np.int64)
+    })
+
+    cells = keys.groupby(['bank_account_id', 'month', 'category_id'], sort=True).sum().reset_index()
+    return cells.astype(CUBE_DTYPES)[CUBE_COLUMNS]
+
+
+def combine(*frames):
+    """Add cube cells of the same account, month and category id together."""
+    frames = [frame for frame in frames if frame is not None and len(frame) > 0]
+    if len(frames) == 0:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in CUBE_DTYPES.items()})
+    if len(frames) == 1:
+        return frames[0]
+    cells = pd.concat(frames, ignore_index=True)
+    cells = cells.groupby(['bank_account_id', 'month', 'category_id'], sort=True).sum().reset_index()
+    return cells.astype(CUBE_DTYPES)[CUBE_COLUMNS]
+
+
+def rollup(cells, level: str):
+    """Roll cube cells up to monthly totals of one category level.
+
+    Every month between the first and last month of each name is present,
+    with zero totals where there were no transactions, as with
+    `groupby(level).resample('M').sum()` on the transactions.
+
+    Args:
+        cells (pd.DataFrame): cube cells of one account.
+        level (str): 'category_name', 'parent_category_name' or 'grandparent_category_name'.
+    Returns:
+        pd.DataFrame: level, date (month end), amount and count, sorted by name and date.
+    """
+    positions = categories.positions(cells['category_id'].to_numpy())
+    known = positions >= 0
+    names = categories.take(positions[known], level)
+
+    totals = pd.DataFrame({
+        'code': names.codes,
+        'month': cells['month'].to_numpy()[known],
+        'amount': cells['amount'].to_numpy()[known],
+        'count': cells['count'].to_numpy()[known]
+    }).groupby(['code', 'month'], sort=True).sum()
+
+    # expand each name to its full month range
+    bounds = totals.reset_index().groupby('code')['month'].agg(['min', 'max'])
+    lengths = (bounds['max'] - bounds['min'] + 1).to_numpy()
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    months = np.repeat(bounds['min'].to_numpy(), lengths) + (np.arange(lengths.sum()) - starts)
+    index = pd.MultiIndex.from_arrays([np.repeat(bounds.index.to_numpy(), lengths), months], names=['code', 'month'])
+    totals = totals.reindex(index, fill_value=0)
+
+    # month end labels, as resample('M') uses
+    months = totals.index.get_level_values('month').to_numpy().astype('datetime64[M]')
+    month_end = (months + 1).astype('datetime64[D]') - np.timedelta64(1, 'D')
+    return pd.DataFrame({
+        level: pd.Categorical.from_codes(totals.index.get_level_values('code'), categories=names.categories),
+        'date': month_end.astype('datetime64[ns]'),
+        'amount': totals['amount'].to_numpy(),
+        'count': totals['count'].to_numpy()
+    })
+
+
+def month_ordinal(month: str):
+    """Return a 'YYYY-MM' month as months since 1970-01, the `month` of cube cells."""
+    return int(np.datetime64(month, 'M').astype(np.int64))
+
+
+def window(cells, start_month: str = None, end_month: str = None):
+    """Keep the cube cells from `start_month` through `end_month`.
+
+    Args:
+        start_month (str): first month, 'YYYY-MM', or None for no lower bound.
+        end_month (str): last month, 'YYYY-MM', or None for no upper bound.
+    """
+    if start_month is None and end_month is None:
+        return cells
+    keep = np.ones(len(cells), dtype=bool)
+    if start_month is not None:
+        keep &= cells['month'].to_numpy() >= month_ordinal(start_month)
+    if end_month is not None:
+        keep &= cells['month'].to_numpy() <= month_ordinal(end_month)
+    return cells.loc[keep].reset_index(drop=True)
+
+
+class MonthlyCube(object):
+    """Thread-safe store of cube cells and watermarks, keyed by bank account.
+
+    The persisted cube is loaded on first use, and again whenever a build or
+    refresh has rewritten it. Accounts updated since are held separately,
+    in a bounded least-recently-used cache, until `save()` writes a new cube;
+    accounts evicted from it are read from the persisted cube again.
+
+    Usage:
+    >>> cube = MonthlyCube()
+    >>> cells, watermark, rows, fresh = cube.lookup(45153)
+    >>> rollup(cells, 'parent_category_name')
+    """
+    cells_name = 'cells.arrow'
+    watermarks_name = 'watermarks.arrow'
+
+    def __init__(self, root: str = None, ttl: float = 300.0, max_entries: int = 4096, max_bytes: int = 64 * 2**20):
+        """
+        Args:
+            root (str): cube directory. Defaults to SAVERLIFE_CUBE_DIR.
+            ttl (float): seconds an account stays fresh after it was built or refreshed.
+                None keeps accounts fresh until the next refresh.
+            max_entries (int): maximum number of updated accounts held in memory.
+            max_bytes (int): memory budget of the updated accounts' cells.
+        """
+        self.root = root or os.getenv('SAVERLIFE_CUBE_DIR', DEFAULT_CUBE_DIR)
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._base = None
+        self._base_ids = None
+        self._watermarks = None
+        self._loaded_mtime = None
+        # bank_account_id to (cells, watermark, rows, refreshed_at)
+        self._updated = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=None)
+
+        self._hits = 0
+        self._misses = 0
+        self._stale_hits = 0
+        self._updates = 0
+        self._reloads = 0
+
+    def _load(self):
+        """(Re)load the persisted cube if it was (re)written since the last load."""
+        cells_path = join(self.root, self.cells_name)
+        watermarks_path = join(self.root, self.watermarks_name)
+        try:
+            # watermarks are written last, so their mtime marks a complete cube
+            mtime = os.stat(watermarks_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if self._base is not None and mtime == self._loaded_mtime:
+            return
+        if self._base is not None:
+            self._reloads += 1
+
+        if mtime is not None and os.path.exists(cells_path):
+            self._base = pa.ipc.open_file(pa.memory_map(cells_path, 'r')).read_pandas()
+            watermarks = pa.ipc.open_file(pa.memory_map(watermarks_path, 'r')).read_pandas()
+            if 'rows' not in watermarks.columns:
+                # cubes written before row counts were kept
+                watermarks['rows'] = None
+            self._watermarks = {
+                int(account): ((created_at.to_pydatetime(), int(latest_id)), None if pd.isnull(rows) else int(rows))
+                for account, created_at, latest_id, rows
+                in watermarks[['bank_account_id', 'created_at', 'id', 'rows']].itertuples(index=False)
+            }
+        else:
+            self._base = combine()
+            self._watermarks = {}
+        self._base_ids = self._base['bank_account_id'].to_numpy()
+        self._loaded_mtime = mtime
+        # updated accounts catch up with the new cube from its watermarks
+        self._updated.clear()
+
+    def _entry(self, bank_account_id: int):
+        """Return `(cells, watermark, rows, refreshed_at)` of an account, None if unknown."""
+        entry = self._updated.get(bank_account_id)
+        if entry is not None:
+            return entry
+        if bank_account_id not in self._watermarks:
+            return None
+        lo = int(np.searchsorted(self._base_ids, bank_account_id, side='left'))
+        hi = int(np.searchsorted(self._base_ids, bank_account_id, side='right'))
+        watermark, rows = self._watermarks[bank_account_id]
+        return self._base.iloc[lo:hi].reset_index(drop=True), watermark, rows, None
+
+    def _fresh(self, refreshed_at: float):
+        if refreshed_at is None:
+            return False
+        return self.ttl is None or time.monotonic() - refreshed_at <= self.ttl
+
+    def lookup(self, bank_account_id):
+        """Return `(cells, watermark, rows, fresh)` of an account, `(None, None, None, False)` if not in the cube.
+
+        `rows` counts the account's raw transactions up to the watermark, None
+        if unknown.
+        """
+        bank_account_id = int(bank_account_id)
+        with self._lock:
+            self._load()
+            entry = self._entry(bank_account_id)
+            if entry is None:
+                self._misses += 1
+                return None, None, None, False
+            cells, watermark, rows, refreshed_at = entry
+            fresh = self._fresh(refreshed_at)
+            if fresh:
+                self._hits += 1
+            else:
+                self._stale_hits += 1
+            return cells, watermark, rows, fresh
+
+    def put(self, bank_account_id, cells, watermark, rows: int = None):
+        """Replace the cells of an account and record its watermark and raw row count."""
+        bank_account_id = int(bank_account_id)
+        with self._lock:
+            self._load()
+            self._updated.put(bank_account_id, (cells, watermark, rows, time.monotonic()))
+            self._updates += 1
+        return cells
+
+    def watermarks(self):
+        """Return the per-account ((created_at, id) watermark, raw row count)."""
+        with self._lock:
+            self._load()
+            watermarks = dict(self._watermarks)
+            watermarks.update((account, (watermark, rows)) for account, (_, watermark, rows, _) in self._updated.items())
+            return watermarks
+
+    def save(self):
+        """Write the cube, including accounts updated since it was loaded."""
+        with self._lock:
+            self._load()
+            updated = dict(self._updated.items())
+            base = self._base
+            if updated:
+                keep = ~np.isin(self._base_ids, list(updated))
+                base = combine(base.loc[keep], *(cells for cells, _, _, _ in updated.values()))
+            watermarks = dict(self._watermarks)
+            watermarks.update((account, (watermark, rows)) for account, (_, watermark, rows, _) in updated.items())
+            frame = pd.DataFrame(
+                [(account, created_at, latest_id, -1 if rows is None else rows)
+                 for account, ((created_at, latest_id), rows) in sorted(watermarks.items())],
+                columns=['bank_account_id', 'created_at', 'id', 'rows']
+            ).astype({'bank_account_id': 'int64', 'created_at': 'datetime64[ns]', 'id': 'int64', 'rows': 'int64'})
+
+            os.makedirs(self.root, exist_ok=True)
+            for name, df in ((self.cells_name, base), (self.watermarks_name, frame)):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                path = join(self.root, name)
+                with pa.OSFile(path + '.tmp', 'wb') as sink:
+                    with pa.ipc.new_file(sink, table.schema) as writer:
+                        writer.write_table(table)
+                os.replace(path + '.tmp', path)
+
+            self._base = base.reset_index(drop=True)
+            self._base_ids = self._base['bank_account_id'].to_numpy()
+            self._watermarks = watermarks
+            self._loaded_mtime = os.stat(join(self.root, self.watermarks_name)).st_mtime_ns
+            self._updated.clear()
+
+    def statistics(self):
+        """Return cube size and lookup counters."""
+        with self._lock:
+            self._load()
+            lookups = self._hits + self._stale_hits + self._misses
+            updated = self._updated.items()
+            base_accounts = self._watermarks or {}
+            return {
+                'loaded': self._base is not None,
+                'accounts': len(base_accounts) + sum(1 for account, _ in updated if account not in base_accounts),
+                'cells': (len(self._base) if self._base is not None else 0) + sum(len(cells) for _, (cells, _, _, _) in updated),
+                'pending_accounts': len(updated),
+                'pending_bytes': self._updated.statistics()['bytes'],
+                'pending_evictions': self._updated.statistics()['evictions'],
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'stale_hits': self._stale_hits,
+                'hit_rate': round(self._hits / lookups, 4) if lookups else 0.0,
+                'updates': self._updates,
+                'reloads': self._reloads,
+            }
+
+
+def watermarks_of(x):
+    """Return the (created_at, id) watermark of each account in raw transaction rows."""
+    latest = pd.DataFrame({
+        'bank_account_id': x['bank_account_id'].to_numpy(),
+        'created_at': pd.to_datetime(x['created_at']).to_numpy(),
+        'id': x['id'].to_numpy()
+    }).dropna(subset=['created_at'])
+    latest = latest.sort_values(['bank_account_id', 'created_at', 'id'], kind='mergesort').drop_duplicates('bank_account_id', keep='last')
+    return {
+        int(account): (created_at.to_pydatetime(), int(latest_id))
+        for account, created_at, latest_id in latest.itertuples(index=False)
+    }
+
+
+def build(cube, utility, bank_account_ids: list = None, chunk_accounts: int = 1000):
+    """Stream transactions from the database and (re)build the cells of their accounts.
+
+    Args:
+        cube (MonthlyCube): target cube.
+        utility (SaverlifeUtility): source of wrangled transaction chunks.
+        bank_account_ids (list): accounts to build. Every account if None.
+        chunk_accounts (int): accounts per streamed chunk.
+    Returns:
+        int: number of accounts built.
+    """
+    built = 0
+    for x in utility.iter_transactions(bank_account_ids=bank_account_ids, chunk_accounts=chunk_accounts,
+                                       chunk_rows=None, wrangle=False):
+        # watermarks and row counts of the raw rows, so rows dropped by wrangling are not fetched again
+        cells = aggregate(utility._wrangle_transactions(x))
+        cells = {account: group.reset_index(drop=True) for account, group in cells.groupby('bank_account_id')}
+        rows = x['bank_account_id'].astype('int64').value_counts()
+        for account, watermark in watermarks_of(x).items():
+            cube.put(account, cells.get(account, combine()), watermark, int(rows[account]))
+            built += 1
+    return built
+
+
+def refresh(cube, utility, chunk_accounts: int = 1000):
+    """Bring the cube up to date with the database.
+
+    Accounts whose latest (created_at, id) moved past their watermark, or
+    whose row count changed, are refreshed as in
+    `SaverlifeUtility.monthly_aggregates`; accounts new to the cube are built
+    in full.
+
+    Returns:
+        tuple: number of refreshed and of newly built accounts.
+    """
+    known = cube.watermarks()
+    changed, new = [], []
+    for account, created_at, latest_id, rows in utility.handle_statement('transaction_account_watermarks') or []:
+        if int(account) not in known:
+            new.append(int(account))
+            continue
+        watermark, known_rows = known[int(account)]
+        if rows != known_rows or (created_at is not None and (created_at, int(latest_id)) > watermark):
+            changed.append(int(account))
+
+    for account in changed:
+        utility.monthly_aggregates(account, refresh=True)
+
+    built = build(cube, utility, bank_account_ids=new, chunk_accounts=chunk_accounts) if new else 0
+    return len(changed), built
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['build', 'refresh', 'info'])
+    parser.add_argument('--chunk-accounts', type=int, default=1000)
+    args = parser.parse_args()
+
+    from app.api.utils import SaverlifeUtility
+
+    # every account built or refreshed is written by save(), so none may be evicted before it
+    cube = SaverlifeUtility._cube = MonthlyCube(root=SaverlifeUtility._cube.root, ttl=None,
+                                                max_entries=float('inf'), max_bytes=float('inf'))
+
+    if args.command == 'info':
+        stats = cube.statistics()
+        print(f"{cube.root}: {stats['accounts']} accounts, {stats['cells']} cells")
+        return
+
+    if args.command == 'build' or not cube.watermarks():
+        built = build(cube, SaverlifeUtility, chunk_accounts=args.chunk_accounts)
+        print(f"built {built} accounts")
+    else:
+        refreshed, built = refresh(cube, SaverlifeUtility, chunk_accounts=args.chunk_accounts)
+        print(f"refreshed {refreshed} accounts, built {built} new accounts")
+    cube.save()
+    print(f"wrote {cube.root}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import threading
+
+from app.api.cache import LRUCache
+
+
+# part of every key; bump when the payload of a figure changes
+FIGURE_FORMAT = 1
+
+
+def etag_matches(if_none_match: str, etag: str):
+    """Return True if an If-None-Match header value matches `etag`.
+
+    Uses the weak comparison If-None-Match calls for: W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+class FigureCache(object):
+    """Serialized figure payloads keyed by request parameters and the account's data version.
+
+    Each payload is stored with its ETag, a hash of the payload itself, so an
+    ETag only ever names the bytes it was sent with. A client is answered 304
+    only while the payload its ETag names is still cached.
+
+    Usage:
+    >>> key = figure_cache.key(user_id, graph_type, start_month, end_month, legacy, version)
+    >>> content, etag = figure_cache.get(key) or (None, None)
+    >>> figure_cache.put(key, content, figure_cache.etag(content))
+    """
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 2**20, ttl: float = 3600.0):
+        """
+        Args:
+            max_entries (int): maximum number of cached payloads.
+            max_bytes (int): memory budget for all payloads.
+            ttl (float): seconds a payload stays cached.
+        """
+        self._cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+        self._lock = threading.Lock()
+        self._not_modified = 0
+
+    def key(self, *params):
+        return (FIGURE_FORMAT,) + tuple(str(param) for param in params)
+
+    def etag(self, content: bytes):
+        """Return the strong ETag of a serialized payload, quoted."""
+        return '"' + hashlib.sha1(content).hexdigest() + '"'
+
+    def get(self, key):
+        """Return the cached `(content, etag)` of `key`, None if not cached."""
+        return self._cache.get(key)
+
+    def put(self, key, content: bytes, etag: str):
+        self._cache.put(key, (content, etag))
+
+    def record_not_modified(self):
+        with self._lock:
+            self._not_modified += 1
+
+    def clear(self):
+        self._cache.clear()
+
+    def statistics(self):
+        """Return payload cache counters and the number of 304 responses."""
+        with self._lock:
+            not_modified = self._not_modified
+        return dict(self._cache.statistics(), not_modified=not_modified)
+
+
+figure_cache = FigureCache(
+    max_entries=int(os.getenv('SAVERLIFE_FIGURE_CACHE_MAX_ENTRIES', 512)),
+    max_bytes=int(os.getenv('SAVERLIFE_FIGURE_CACHE_MAX_BYTES', 64 * 2**20)),
+    ttl=float(os.getenv('SAVERLIFE_FIGURE_CACHE_TTL', 3600))
+)
@@ -0,0 +1,132 @@
+import json
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+# bar colors of the monthly category chart
+FLOW_COLORS = {'inflow': '#C01089', 'outflow': '#4066B0'}
+
+# header of each transactions table column
+TABLE_HEADERS = {
+    'formatted_date': 'Date',
+    'amount': 'Amount',
+    'category_name': 'Category',
+    'parent_category_name': 'Parent Category',
+    'grandparent_category_name': 'Grandparent Category',
+    'merchant_city': 'City',
+    'merchant_state': 'State',
+    'purpose': 'Purpose'
+}
+
+
+@lru_cache(maxsize=None)
+def _template_json(name: str):
+    return go.Figure(layout=dict(template=name)).to_json()
+
+
+def template(name: str):
+    """Return the expanded Plotly layout template `name` as a plain dict, as `fig.to_json()` embeds it."""
+    return json.loads(_template_json(name))['layout']['template']
+
+
+def monthly_bar_figure(monthly, name_column: str = 'category_name'):
+    """Build the figure dict of the monthly categorized bar chart.
+
+    One horizontal bar trace per month, the last month visible, and a
+    dropdown switching between months. Equivalent to building the chart
+    with one `go.Bar` per month, without partitioning or validating per
+    trace: rows are sorted and split by month in one pass.
+
+    Args:
+        monthly (pd.DataFrame): `name_column`, date (month end) and amount,
+            one row per name and month.
+        name_column (str): column labelling the bars.
+    Returns:
+        dict: figure with `data` and `layout`, ready for JSON serialization.
+    """
+    monthly = monthly.sort_values("date")
+    monthly = monthly.loc[monthly['amount'] != 0]
+    monthly = monthly.sort_values(['amount'], ascending=True)
+
+    amounts = monthly['amount'].to_numpy()
+    names = np.asarray(monthly[name_column], dtype=object)
+    colors = np.where(amounts >= 0, FLOW_COLORS['outflow'], FLOW_COLORS['inflow']).astype(object)
+
+    # group rows by month, keeping the amount order within each month
+    months = monthly['date'].to_numpy().astype('datetime64[M]')
+    order = np.argsort(months, kind='mergesort')
+    months = months[order]
+    unique_months, starts = np.unique(months, return_index=True)
+    bounds = np.append(starts, len(months))
+    labels = np.datetime_as_string(unique_months, unit='M').tolist()
+
+    amounts, names, colors = amounts[order].tolist(), names[order].tolist(), colors[order].tolist()
+
+    length_of_interest = len(labels)
+    data = []
+    for i, label in enumerate(labels):
+        lo, hi = bounds[i], bounds[i + 1]
+        data.append({
+            'marker': {'color': colors[lo:hi]},
+            'name': label,
+            'orientation': 'h',
+            'visible': i == length_of_interest - 1,
+            'x': amounts[lo:hi],
+            'y': names[lo:hi],
+            'type': 'bar'
+        })
+
+    buttons = []
+    for i, label in enumerate(labels):
+        visible = [False] * length_of_interest
+        visible[i] = True
+        buttons.append({'args': [{'visible': visible}, {'annotations': []}], 'label': label, 'method': 'update'})
+
+    layout = {
+        'template': template('simple_white'),
+        'font': {'family': 'Arial'},
+        'height': 800,
+        'updatemenus': [{'active': length_of_interest - 1, 'buttons': buttons}]
+    }
+
+    return {'data': data, 'layout': layout}
+
+
+def transactions_table_figure(transactions, title: str, columns: list = None):
+    """Build the figure dict of the transactions table.
+
+    Column values stay NumPy arrays; serialize the figure with
+    `app.api.serialization.dumps`.
+
+    Args:
+        transactions (pd.DataFrame): formatted_date, amount and the category levels, in display order.
+        title (str): table title.
+        columns (list): `TABLE_HEADERS` columns to show. Date, amount and
+            the category levels if None.
+    Returns:
+        dict: figure with `data` and `layout`.
+    """
+    if columns is None:
+        columns = ['formatted_date', 'amount', 'category_name', 'parent_category_name', 'grandparent_category_name']
+    return {
+        'data': [{
+            'cells': {
+                'align': 'left',
+                'fill': {'color': 'whitesmoke'},
+                'values': [transactions[column].to_numpy() for column in columns]
+            },
+            'header': {
+                'align': 'left',
+                'fill': {'color': 'lightgray'},
+                'values': [TABLE_HEADERS[column] for column in columns]
+            },
+            'type': 'table'
+        }],
+        'layout': {
+            'template': template(pio.templates.default),
+            'title': {'font': {'size': 30}, 'text': title}
+        }
+    }
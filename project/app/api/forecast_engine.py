@@ -0,0 +1,166 @@
+"""Vectorized next-month forecasts for many series at once.
+
+The forecasters of `Visualize.next_month_forecast` reimplemented with NumPy
+over a dense (series x months) matrix, so a whole cohort is forecast in a
+few array operations instead of one sktime fit per series:
+
+- seasonal naive, as `NaiveForecaster(strategy="seasonal_last", sp=12)`
+- recursive 1-nearest-neighbour regression over a 12 month window, as
+  `ReducedRegressionForecaster(KNeighborsRegressor(n_neighbors=1),
+  window_length=12, strategy="recursive")`
+
+Series are right-aligned: row i holds its months oldest to newest in the
+last `lengths[i]` columns and NaN before them.
+"""
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import as_strided
+
+from app.api.categories import categories
+
+
+def series_matrix(cells, level: str = 'parent_category_name'):
+    """Build the monthly series of every account and `level` name from cube cells.
+
+    Each series runs from the first to the last month with transactions,
+    zero-filled in between, as `app.api.cube.rollup` returns them.
+
+    Args:
+        cells (pd.DataFrame): cube cells of any number of accounts.
+        level (str): category level to roll up to.
+    Returns:
+        tuple: keys (pd.DataFrame of bank_account_id, `level` and
+            last_month, months since 1970-01), the right-aligned float64
+            matrix of amounts and the length of each series.
+    """
+    positions = categories.positions(cells['category_id'].to_numpy())
+    known = positions >= 0
+    names = categories.take(positions[known], level)
+
+    totals = pd.DataFrame({
+        'bank_account_id': cells['bank_account_id'].to_numpy()[known],
+        'code': names.codes,
+        'month': cells['month'].to_numpy()[known],
+        'amount': cells['amount'].to_numpy()[known]
+    }).groupby(['bank_account_id', 'code', 'month'], sort=True)['amount'].sum().reset_index()
+
+    series, row = np.unique(totals[['bank_account_id', 'code']].to_numpy(), axis=0, return_inverse=True)
+    row = row.reshape(-1)
+    months = totals['month'].to_numpy().astype(np.int64)
+    first = np.full(len(series), np.iinfo(np.int64).max)
+    last = np.full(len(series), np.iinfo(np.int64).min)
+    np.minimum.at(first, row, months)
+    np.maximum.at(last, row, months)
+    lengths = (last - first + 1).astype(np.int64)
+
+    width = int(lengths.max()) if len(lengths) else 0
+    Y = np.full((len(series), width), np.nan)
+    Y[np.arange(width) >= width - lengths[:, None]] = 0.0
+    Y[row, width - 1 - (last[row] - months)] = totals['amount'].to_numpy()
+
+    keys = pd.DataFrame({
+        'bank_account_id': series[:, 0],
+        level: pd.Categorical.from_codes(series[:, 1], categories=names.categories),
+        'last_month': last
+    })
+    return keys, Y, lengths
+
+
+def seasonal_naive(Y, lengths, sp: int = 12, horizon: int = 1):
+    """Repeat the last `sp` months of every series.
+
+    Returns:
+        np.ndarray: (series x horizon) forecasts, NaN for series shorter than `sp`.
+    """
+    steps = Y.shape[1] - sp + np.arange(horizon) % sp
+    forecasts = Y[:, steps] if Y.shape[1] >= sp else np.full((len(Y), horizon), np.nan)
+    forecasts[lengths < sp] = np.nan
+    return forecasts
+
+
+def knn_recursive(Y, lengths, window_length: int = 12, horizon: int = 1, chunk_size: int = 4096):
+    """Forecast every series with recursive 1-nearest-neighbour regression.
+
+    Each series is matched against its own history: the training windows are
+    its `window_length`-month windows and the month after each. The latest
+    window is matched to the closest training window by Euclidean distance,
+    whose next month is the forecast; for further steps the forecast is
+    appended to the window and matched again. Of equally close windows the
+    earliest is taken.
+
+    Args:
+        Y (np.ndarray): right-aligned series.
+        lengths (np.ndarray): length of each series.
+        chunk_size (int): series compared at once, bounding the memory of
+            the (series x windows x window_length) distance computation.
+    Returns:
+        np.ndarray: (series x horizon) forecasts, NaN for series with fewer
+            than `window_length + 1` months.
+    """
+    n, width = Y.shape
+    forecasts = np.full((n, horizon), np.nan)
+    n_windows = width - window_length
+    if n_windows < 1:
+        return forecasts
+
+    for lo in range(0, n, chunk_size):
+        y = np.ascontiguousarray(Y[lo:lo + chunk_size])
+        rows = np.arange(len(y))
+        stride_series, stride_month = y.strides
+        windows = as_strided(y, shape=(len(y), n_windows, window_length),
+                             strides=(stride_series, stride_month, stride_month), writeable=False)
+        targets = y[:, window_length:]
+        # windows starting before a series' first month are never nearest
+        padded = np.arange(n_windows) < width - lengths[lo:lo + chunk_size, None]
+
+        query = y[:, -window_length:]
+        for step in range(horizon):
+            distances = np.square(windows - query[:, None, :]).sum(axis=2)
+            distances[padded] = np.inf
+            nearest = targets[rows, distances.argmin(axis=1)]
+            forecasts[lo:lo + chunk_size, step] = nearest
+            query = np.concatenate([query[:, 1:], nearest[:, None]], axis=1)
+
+    forecasts[lengths < window_length + 1] = np.nan
+    return forecasts
+
+
+def forecast_batch(cells, model: str = "kNeighbors", horizon: int = 1, min_months: int = 13,
+                   level: str = 'parent_category_name'):
+    """Forecast the monthly totals of every account and category level name.
+
+    Like `Visualize.next_month_forecast`, only series with at least
+    `min_months` months are forecast.
+
+    Args:
+        cells (pd.DataFrame): cube cells of any number of accounts.
+        model (str): 'Naive' for seasonal naive, otherwise recursive nearest neighbour.
+        horizon (int): months to forecast.
+        min_months (int): shortest series forecast.
+        level (str): category level to forecast.
+    Returns:
+        pd.DataFrame: bank_account_id, `level`, step (1 is next month),
+            date (month end) and amount, one row per series and step.
+    """
+    keys, Y, lengths = series_matrix(cells, level)
+    keep = lengths >= min_months
+    keys, Y, lengths = keys.loc[keep].reset_index(drop=True), Y[keep], lengths[keep]
+    if len(keys):
+        # drop columns left empty by the removed series
+        Y = Y[:, Y.shape[1] - lengths.max():]
+
+    if model == "Naive":
+        forecasts = seasonal_naive(Y, lengths, sp=12, horizon=horizon)
+    else:
+        forecasts = knn_recursive(Y, lengths, window_length=12, horizon=horizon)
+
+    steps = np.arange(horizon) + 1
+    months = (keys['last_month'].to_numpy()[:, None] + steps).reshape(-1).astype('datetime64[M]')
+    return pd.DataFrame({
+        'bank_account_id': np.repeat(keys['bank_account_id'].to_numpy(), horizon),
+        level: pd.Categorical.from_codes(np.repeat(keys[level].cat.codes.to_numpy(), horizon),
+                                         categories=keys[level].cat.categories),
+        'step': np.tile(steps, len(keys)),
+        'date': ((months + 1).astype('datetime64[D]') - np.timedelta64(1, 'D')).astype('datetime64[ns]'),
+        'amount': forecasts.reshape(-1)
+    })
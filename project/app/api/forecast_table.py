@@ -0,0 +1,293 @@
+"""Precomputed next-month forecasts of every account with 12+ months of history.
+
+A nightly job forecasts each parent category of every qualifying account,
+with the logic of `Visualize.next_month_forecast`, and writes the forecast
+results table: one Arrow IPC part per chunk of accounts, under a directory
+per run. Each part is checkpointed in the run manifest, so an interrupted
+run resumes after the last account written. A run becomes current only
+once complete; `/dev/forecast/` serves it while it is fresh. Older runs
+are then deleted, except the one before it.
+
+Run it from the `project` directory:
+
+    python -m app.api.forecast_table run
+    python -m app.api.forecast_table run --restart
+    python -m app.api.forecast_table info
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+from os.path import join, dirname
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.api.forecasting import forecast_pool
+
+
+DEFAULT_FORECAST_TABLE_DIR = join(dirname(__file__), 'data', 'forecasts')
+
+
+class ForecastTable(object):
+    """Forecast results of the nightly job, read through by `/dev/forecast/`.
+
+    Usage:
+    >>> table = ForecastTable()
+    >>> table.lookup(45153)
+    {'Food and Drink': -310.0, ...}
+    """
+    current_name = 'current.json'
+    manifest_name = 'manifest.json'
+
+    def __init__(self, root: str = None, max_age: float = 36 * 3600.0):
+        """
+        Args:
+            root (str): table directory. Defaults to SAVERLIFE_FORECAST_TABLE_DIR.
+            max_age (float): seconds a completed run stays fresh.
+        """
+        self.root = root or os.getenv('SAVERLIFE_FORECAST_TABLE_DIR', DEFAULT_FORECAST_TABLE_DIR)
+        self.max_age = max_age
+
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._current = None
+        self._results = None
+        self._ids = None
+
+        self._hits = 0
+        self._misses = 0
+        self._stale = 0
+
+    def _write_json(self, path: str, value: dict):
+        # write then rename, so readers never see a partial file
+        partial = f"{path}.{uuid.uuid4().hex}"
+        with open(partial, 'w') as f:
+            json.dump(value, f)
+        os.replace(partial, path)
+
+    def _runs(self):
+        return sorted(name for name in os.listdir(self.root) if os.path.isdir(join(self.root, name)))
+
+    def _read_json(self, path: str):
+        with open(path) as f:
+            return json.load(f)
+
+    def _load(self):
+        """(Re)load the current run if `current.json` changed since the last load."""
+        path = join(self.root, self.current_name)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            self._loaded_mtime, self._current, self._results = None, None, None
+            return
+        if mtime == self._loaded_mtime:
+            return
+
+        current = self._read_json(path)
+        manifest = self._read_json(join(self.root, current['run'], self.manifest_name))
+        frames = [
+            pa.ipc.open_file(pa.memory_map(join(self.root, current['run'], part), 'r')).read_pandas()
+            for part in manifest['parts']
+        ]
+        results = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(
+            {'bank_account_id': pd.Series(dtype='int64'), 'parent_category_name': pd.Series(dtype=object),
+             'amount': pd.Series(dtype='float64')})
+        results = results.sort_values('bank_account_id', kind='mergesort').reset_index(drop=True)
+
+        self._loaded_mtime, self._current, self._results = mtime, current, results
+        self._ids = results['bank_account_id'].to_numpy()
+
+    def lookup(self, bank_account_id, model: str = 'kNeighbors'):
+        """Return the precomputed forecasts of an account, None if there are none fresh.
+
+        Returns:
+            dict: parent_category_name to next month's forecast; empty if the
+                account was forecast but no category had enough history.
+        """
+        with self._lock:
+            self._load()
+            if self._current is None or self._current['model'] != model:
+                self._misses += 1
+                return None
+            if time.time() - self._current['completed_at'] > self.max_age:
+                self._stale += 1
+                return None
+
+            bank_account_id = int(bank_account_id)
+            lo = int(np.searchsorted(self._ids, bank_account_id, side='left'))
+            hi = int(np.searchsorted(self._ids, bank_account_id, side='right'))
+            if lo == hi:
+                self._misses += 1
+                return None
+            self._hits += 1
+            rows = self._results.iloc[lo:hi].dropna(subset=['parent_category_name'])
+            return dict(zip(rows['parent_category_name'], rows['amount']))
+
+    def start(self, model: str, restart: bool = False):
+        """Return the manifest of the incomplete run of `model` to resume, or of a new run."""
+        os.makedirs(self.root, exist_ok=True)
+        runs = self._runs()
+        if runs and not restart:
+            manifest = self._read_json(join(self.root, runs[-1], self.manifest_name))
+            if manifest['completed_at'] is None and manifest['model'] == model:
+                return manifest
+
+        run = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+        os.makedirs(join(self.root, run), exist_ok=True)
+        manifest = {'run': run, 'model': model, 'started_at': time.time(), 'completed_at': None,
+                    'last_account': None, 'accounts': 0, 'parts': []}
+        self._write_json(join(self.root, run, self.manifest_name), manifest)
+        return manifest
+
+    def write_part(self, manifest: dict, results, last_account: int, accounts: int):
+        """Write a chunk of results and checkpoint the run after `last_account`.
+
+        Args:
+            results (pd.DataFrame): bank_account_id, parent_category_name and amount.
+            last_account (int): highest account id of the chunk.
+            accounts (int): accounts forecast in the chunk.
+        """
+        part = f"part-{len(manifest['parts']):05d}.arrow"
+        table = pa.Table.from_pandas(results, preserve_index=False)
+        partial = join(self.root, manifest['run'], f".{part}")
+        with pa.OSFile(partial, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(partial, join(self.root, manifest['run'], part))
+
+        manifest['parts'].append(part)
+        manifest['last_account'] = int(last_account)
+        manifest['accounts'] += accounts
+        self._write_json(join(self.root, manifest['run'], self.manifest_name), manifest)
+
+    def complete(self, manifest: dict):
+        """Mark the run complete, make it the current run and prune older runs."""
+        manifest['completed_at'] = time.time()
+        self._write_json(join(self.root, manifest['run'], self.manifest_name), manifest)
+        self._write_json(join(self.root, self.current_name),
+                         {'run': manifest['run'], 'model': manifest['model'], 'completed_at': manifest['completed_at']})
+        self.prune(manifest['run'])
+
+    def prune(self, run: str):
+        """Delete the runs older than `run`, except the latest of them.
+
+        The previous run is kept for servers that loaded it before `run`
+        became current; runs newer than `run` may still be in progress.
+
+        Returns:
+            list: deleted runs.
+        """
+        older = [name for name in self._runs() if name < run]
+        for name in older[:-1]:
+            shutil.rmtree(join(self.root, name), ignore_errors=True)
+        return older[:-1]
+
+    def statistics(self):
+        """Return the current run and lookup counters."""
+        with self._lock:
+            self._load()
+            current = self._current
+            return {
+                'run': current['run'] if current else None,
+                'age': round(time.time() - current['completed_at'], 1) if current else None,
+                'max_age': self.max_age,
+                'rows': len(self._results) if self._results is not None else 0,
+                'hits': self._hits,
+                'misses': self._misses,
+                'stale': self._stale
+            }
+
+
+def run(table, utility, model: str = 'kNeighbors', chunk_accounts: int = 500, restart: bool = False):
+    """Forecast every account with 12+ months of history into a new run of `table`.
+
+    Accounts are streamed `chunk_accounts` at a time. The series of a chunk
+    are forecast together on the forecast pool, bounded by
+    SAVERLIFE_FORECAST_WORKERS, and each chunk is checkpointed once written.
+    If the batch fails, its series are forecast one by one and those that
+    fail again are left out, as accounts without a forecast.
+
+    Args:
+        table (ForecastTable): target table.
+        utility (SaverlifeUtility): source of transactions.
+        model (str): forecaster, see `app.api.forecasting.forecast_series`.
+        restart (bool): start a new run instead of resuming an interrupted one.
+    Returns:
+        dict: manifest of the completed run.
+    """
+    from app.api.utils import Visualize
+
+    manifest = table.start(model, restart=restart)
+    accounts = [int(row[0]) for row in utility.handle_statement('forecast_accounts') or []]
+    if manifest['last_account'] is not None:
+        accounts = [account for account in accounts if account > manifest['last_account']]
+
+    for lo in range(0, len(accounts), chunk_accounts):
+        chunk = accounts[lo:lo + chunk_accounts]
+
+        series = {}
+        forecast_accounts = set()
+        for df in utility.iter_transactions(bank_account_ids=chunk, chunk_rows=None, chunk_accounts=chunk_accounts):
+            for account, transactions in df.groupby('bank_account_id', sort=False):
+                SaverlifeVisual = Visualize(user_id=str(account), transactions=transactions.reset_index(drop=True))
+                for parent_cat, y in SaverlifeVisual.forecast_series().items():
+                    series[(int(account), parent_cat)] = y
+                forecast_accounts.add(int(account))
+
+        try:
+            forecasts = forecast_pool.forecast(series, model=model, horizon=1)
+        except Exception:
+            # one failed or timed out fit fails the whole batch; retry series by series, skipping failures
+            traceback.print_exc()
+            forecasts = {}
+            for key, y in series.items():
+                try:
+                    forecasts.update(forecast_pool.forecast({key: y}, model=model, horizon=1))
+                except Exception:
+                    traceback.print_exc()
+
+        # accounts without a forecast keep a row without category, telling them from unprocessed accounts
+        empty = sorted(forecast_accounts - {account for account, _ in forecasts})
+        results = pd.DataFrame({
+            'bank_account_id': np.array([account for account, _ in forecasts] + empty, dtype=np.int64),
+            'parent_category_name': [str(parent_cat) for _, parent_cat in forecasts] + [None] * len(empty),
+            'amount': np.array([y_pred[0] for y_pred in forecasts.values()] + [np.nan] * len(empty), dtype=np.float64)
+        })
+        table.write_part(manifest, results, last_account=chunk[-1], accounts=len(chunk))
+        print(f"forecast {manifest['accounts']} accounts")
+
+    table.complete(manifest)
+    return manifest
+
+
+forecast_table = ForecastTable(max_age=float(os.getenv('SAVERLIFE_FORECAST_TABLE_MAX_AGE', 36 * 3600)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['run', 'info'])
+    parser.add_argument('--chunk-accounts', type=int, default=500)
+    parser.add_argument('--model', default='kNeighbors', choices=['kNeighbors', 'Naive'])
+    parser.add_argument('--restart', action='store_true', help="start over instead of resuming")
+    args = parser.parse_args()
+
+    from app.api.utils import SaverlifeUtility
+
+    if args.command == 'info':
+        print(f"{forecast_table.root}: {forecast_table.statistics()}")
+        return
+
+    manifest = run(forecast_table, SaverlifeUtility, model=args.model, chunk_accounts=args.chunk_accounts,
+                   restart=args.restart)
+    print(f"wrote run {manifest['run']}: {manifest['accounts']} accounts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from os.path import join
+
+import numpy as np
+import sktime
+
+from app.api.cache import LRUCache
+
+
+# forecaster parameters of each model, part of every forecast cache key
+MODEL_PARAMS = {
+    'Naive': {'strategy': 'seasonal_last', 'sp': 12},
+    'kNeighbors': {'n_neighbors': 1, 'window_length': 12, 'strategy': 'recursive'}
+}
+
+
+def forecast_series(y, model: str = "kNeighbors", horizon: int = 1):
+    """Fit a forecaster to the monthly totals `y` and forecast the next `horizon` months.
+
+    A module-level function, so it can be sent to the forecast pool.
+
+    Args:
+        y (pd.Series): monthly totals of one parent category, oldest first.
+        model (str): 'Naive' for a seasonal naive forecast, otherwise a
+            recursive 1-nearest-neighbour regression over the last 12 months.
+        horizon (int): months to forecast; only these steps are predicted.
+    Returns:
+        np.ndarray: forecast amounts of the `horizon` months after `y`.
+    """
+    # imported here, so the caches and the pool load without the sktime 0.4 API
+    from sktime.forecasting.naive import NaiveForecaster
+    from sktime.forecasting.compose import ReducedRegressionForecaster
+    from sklearn.neighbors import KNeighborsRegressor
+
+    # Set forecasting horizon
+    fh = np.arange(horizon) + 1
+    # Initialize a forecaster, seasonal periodicity of 12 (months per year)
+    if model == "Naive":
+        params = MODEL_PARAMS["Naive"]
+        forecaster = NaiveForecaster(strategy=params["strategy"], sp=params["sp"])
+    else:
+        params = MODEL_PARAMS["kNeighbors"]
+        regressor = KNeighborsRegressor(n_neighbors=params["n_neighbors"])
+        forecaster = ReducedRegressionForecaster(regressor=regressor, window_length=params["window_length"],
+                                                 strategy=params["strategy"])
+    # Fit forecaster to training data
+    forecaster.fit(y)
+    # Forecast prediction to match size of forecasting horizon
+    y_pred = forecaster.predict(fh)
+    return y_pred.values
+
+
+class ForecastCache(object):
+    """Forecasts keyed by model, parameters, horizon and the content of the series.
+
+    A monthly series that has not changed since the last request is not
+    fitted again. Forecasts live in a bounded in-memory LRU and, if `root`
+    is set, also as one .npy file per key, so they survive restarts. Keys
+    include the sktime version, so an upgrade never serves old forecasts.
+
+    Usage:
+    >>> key = forecast_cache.key(y, 'kNeighbors', horizon=1)
+    >>> forecast_cache.get(key)
+    """
+    def __init__(self, max_entries: int = 65536, max_bytes: int = 32 * 2**20, root: str = None):
+        """
+        Args:
+            max_entries (int): maximum number of forecasts kept in memory.
+            max_bytes (int): memory budget of the in-memory forecasts.
+            root (str): directory to persist forecasts in. Memory only if None.
+        """
+        self._cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=None)
+        self.root = root
+        self._lock = threading.Lock()
+        self._disk_hits = 0
+        self._disk_writes = 0
+        if root is not None:
+            os.makedirs(root, exist_ok=True)
+
+    def key(self, y, model: str, horizon: int):
+        """Return the hex digest identifying the forecasts of `y`."""
+        params = sorted(MODEL_PARAMS.get(model, MODEL_PARAMS['kNeighbors']).items())
+        digest = hashlib.sha1(f"{sktime.__version__}|{model}|{params}|{horizon}|".encode('utf-8'))
+        digest.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str):
+        return join(self.root, f"{key}.npy")
+
+    def get(self, key: str):
+        """Return the cached forecasts of `key`, or None."""
+        forecasts = self._cache.get(key)
+        if forecasts is not None or self.root is None:
+            return forecasts
+        try:
+            forecasts = np.load(self._path(key), allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        forecasts.setflags(write=False)
+        self._cache.put(key, forecasts)
+        with self._lock:
+            self._disk_hits += 1
+        return forecasts
+
+    def put(self, key: str, forecasts):
+        forecasts = np.array(forecasts, dtype=np.float64)
+        forecasts.setflags(write=False)
+        self._cache.put(key, forecasts)
+        if self.root is None:
+            return
+        # write then rename, so readers never see a partial file
+        partial = join(self.root, f".{key}.{uuid.uuid4().hex}.npy")
+        try:
+            np.save(partial, forecasts, allow_pickle=False)
+            os.replace(partial, self._path(key))
+        except OSError:
+            traceback.print_exc()
+            return
+        with self._lock:
+            self._disk_writes += 1
+
+    def clear(self):
+        """Drop the in-memory forecasts; persisted forecasts are kept."""
+        self._cache.clear()
+
+    def statistics(self):
+        """Return in-memory cache counters plus disk hits and writes."""
+        statistics = self._cache.statistics()
+        with self._lock:
+            disk_hits, disk_writes = self._disk_hits, self._disk_writes
+        lookups = statistics['hits'] + statistics['misses']
+        return dict(statistics,
+                    root=self.root,
+                    disk_hits=disk_hits,
+                    disk_writes=disk_writes,
+                    hit_rate=round((statistics['hits'] + disk_hits) / lookups, 4) if lookups else 0.0)
+
+
+def _terminate_workers(executor):
+    """Kill the worker processes of a ProcessPoolExecutor, stopping the fits they are running.
+
+    Shutting an executor down cancels only queued tasks, and it has no public
+    way to stop running ones, so this reads its private `_processes` mapping.
+    If a Python version drops that attribute, running fits are left to finish
+    and their workers exit after the shutdown.
+    """
+    processes = getattr(executor, '_processes', None) or {}
+    for process in list(processes.values()):
+        process.terminate()
+
+
+class ForecastTimeout(Exception):
+    """Raised when the forecasts of a batch are not done before its deadline."""
+
+
+class ForecastPool(object):
+    """Fit per-category forecasters in parallel on a reusable process pool.
+
+    Fits are CPU bound and hold the GIL, so they go to worker processes. The
+    pool is started on first use and kept for later requests. Workers are
+    started with `start_method`, not forked from the multithreaded server,
+    where a lock held by another thread would stay locked in the child. Batches
+    smaller than `min_tasks`, or any batch if `max_workers` is 1, run in the
+    calling thread, where starting and feeding workers would cost more than it
+    saves. Either way results are computed by the same `fit` call on the same
+    data, so they match the sequential loop exactly, and a failing fit raises
+    as it would there. Series already in `cache` are not fitted at all.
+
+    Usage:
+    >>> forecasts = forecast_pool.forecast({'Food and Drink': y}, model='Naive')
+    """
+    def __init__(self, max_workers: int = None, timeout: float = 30.0, min_tasks: int = 4,
+                 cache: ForecastCache = None, fit=forecast_series, start_method: str = None):
+        """
+        Args:
+            max_workers (int): worker processes. Defaults to the number of CPUs.
+            timeout (float): seconds a batch may take. On expiry pooled workers
+                are terminated and `ForecastTimeout` is raised. Batches fitted in
+                the calling thread stop before the next series once past it, but
+                a fit already running there cannot be interrupted.
+            min_tasks (int): smallest batch sent to the pool.
+            cache (ForecastCache): forecasts of earlier requests. No caching if None.
+            fit (callable): module-level `fit(y, model, horizon)`, `forecast_series`
+                by default.
+            start_method (str): multiprocessing start method of the workers.
+                'forkserver' where available, 'spawn' otherwise.
+        """
+        if start_method is None:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.start_method = start_method
+        self.timeout = timeout
+        self.min_tasks = min_tasks
+        self.cache = cache
+        self.fit = fit
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'batches': 0,
+            'pooled_tasks': 0,
+            'in_process_tasks': 0,
+            'timeouts': 0,
+            'failures': 0,
+            'restarts': 0
+        }
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context(self.start_method))
+            return self._executor
+
+    def _restart(self, executor, terminate: bool = False):
+        """Drop an executor, so the next batch starts fresh workers.
+
+        Args:
+            terminate (bool): kill its workers, which may still be running a fit.
+        """
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self._stats['restarts'] += 1
+        if terminate:
+            _terminate_workers(executor)
+        executor.shutdown(wait=False)
+
+    def forecast(self, series: dict, model: str = "kNeighbors", horizon: int = 1):
+        """Forecast the next `horizon` months of every series.
+
+        Args:
+            series (dict): name to monthly totals, as `forecast_series` takes them.
+            model (str): forecaster, see `forecast_series`.
+            horizon (int): months to forecast.
+        Returns:
+            dict: name to forecasts, in the order of `series`.
+        Raises:
+            ForecastTimeout: the pooled batch took longer than `timeout`.
+            Exception: whatever a failing fit raised.
+        """
+        if self.cache is None:
+            return self._forecast(series, model, horizon)
+
+        keys = {name: self.cache.key(y, model, horizon) for name, y in series.items()}
+        results = {name: self.cache.get(key) for name, key in keys.items()}
+        missing = {name: series[name] for name, forecasts in results.items() if forecasts is None}
+        if missing:
+            fitted = self._forecast(missing, model, horizon)
+            for name, forecasts in fitted.items():
+                self.cache.put(keys[name], forecasts)
+            results.update(fitted)
+        return results
+
+    def _fit_in_process(self, series: dict, model: str, horizon: int, deadline: float = None):
+        """Fit `series` in the calling thread, raising `ForecastTimeout` before a series started past `deadline`."""
+        self._count('in_process_tasks', len(series))
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout
+        results = {}
+        for name, y in series.items():
+            if time.monotonic() > deadline:
+                self._count('timeouts')
+                raise ForecastTimeout(f"forecasts not done within {self.timeout}s: {name!r} and later series")
+            try:
+                results[name] = self.fit(y, model, horizon)
+            except Exception:
+                self._count('failures')
+                raise
+        return results
+
+    def _forecast(self, series: dict, model: str, horizon: int):
+        self._count('batches')
+        if len(series) < max(self.min_tasks, 2) or self.max_workers <= 1:
+            return self._fit_in_process(series, model, horizon)
+
+        executor = self._pool()
+        try:
+            futures = {name: executor.submit(self.fit, y, model, horizon) for name, y in series.items()}
+        except BrokenProcessPool:
+            self._restart(executor)
+            return self._fit_in_process(series, model, horizon)
+        self._count('pooled_tasks', len(futures))
+
+        # one deadline for the whole batch, not one timeout per series
+        deadline = time.monotonic() + self.timeout
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except TimeoutError:
+                self._count('timeouts')
+                self._restart(executor, terminate=True)
+                raise ForecastTimeout(f"forecasts not done within {self.timeout}s: {name!r} and later series")
+            except BrokenProcessPool:
+                # a worker died, e.g. killed for memory; fit what is left here
+                self._restart(executor)
+                results.update(self._fit_in_process(
+                    {name: series[name] for name in futures if name not in results}, model, horizon, deadline))
+                break
+            except Exception:
+                self._count('failures')
+                raise
+        return {name: results[name] for name in series}
+
+    def statistics(self):
+        """Return pool size and task counters."""
+        with self._lock:
+            return dict(self._stats, max_workers=self.max_workers, timeout=self.timeout,
+                        min_tasks=self.min_tasks, start_method=self.start_method,
+                        started=self._executor is not None)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+forecast_cache = ForecastCache(
+    max_entries=int(os.getenv('SAVERLIFE_FORECAST_CACHE_MAX_ENTRIES', 65536)),
+    max_bytes=int(os.getenv('SAVERLIFE_FORECAST_CACHE_MAX_BYTES', 32 * 2**20)),
+    root=os.getenv('SAVERLIFE_FORECAST_CACHE_DIR') or None
+)
+
+forecast_pool = ForecastPool(
+    max_workers=int(os.getenv('SAVERLIFE_FORECAST_WORKERS', 0)) or None,
+    timeout=float(os.getenv('SAVERLIFE_FORECAST_TIMEOUT', 30)),
+    min_tasks=int(os.getenv('SAVERLIFE_FORECAST_MIN_TASKS', 4)),
+    cache=forecast_cache
+)
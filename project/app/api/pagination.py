@@ -0,0 +1,64 @@
+"""Keyset pagination of a user's transactions, newest first.
+
+Pages are ordered by (date, id) descending and continue strictly after the
+last row of the previous page, so fetching a page costs the same however
+deep it is and however much history the account has. The cursor is an
+opaque URL-safe token holding that last (date, id).
+"""
+import base64
+import json
+
+import pandas as pd
+
+
+# selectable table columns and the transaction feature each is built from
+PAGE_COLUMNS = {
+    'formatted_date': 'date',
+    'amount': 'amount_cents',
+    'category_name': 'category_id',
+    'parent_category_name': 'category_id',
+    'grandparent_category_name': 'category_id',
+    'merchant_city': 'merchant_city',
+    'merchant_state': 'merchant_state',
+    'purpose': 'purpose'
+}
+
+# columns of the full transactions table
+DEFAULT_PAGE_COLUMNS = [
+    'formatted_date',
+    'amount',
+    'category_name',
+    'parent_category_name',
+    'grandparent_category_name'
+]
+
+
+def page_features(columns: list):
+    """Return the transaction features to select for `columns`, starting with the date and id keys."""
+    features = ['date', 'id']
+    for column in columns:
+        if column not in PAGE_COLUMNS:
+            raise ValueError(f"{column} is not a transaction table column.")
+        if PAGE_COLUMNS[column] not in features:
+            features.append(PAGE_COLUMNS[column])
+    return features
+
+
+def encode_cursor(date, transaction_id):
+    """Return the cursor continuing after the transaction dated `date` with id `transaction_id`."""
+    key = json.dumps([pd.Timestamp(date).isoformat(), int(transaction_id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Return the (date, id) of a cursor from `encode_cursor`.
+
+    Raises:
+        ValueError: if `cursor` was not made by `encode_cursor`.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date, transaction_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return pd.Timestamp(date).to_pydatetime(), int(transaction_id)
+    except Exception:
+        raise ValueError(f"{cursor} is not a valid page cursor.")
@@ -0,0 +1,281 @@
+import threading
+import time
+import traceback
+
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection could be checked out in time."""
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """psycopg2 connection carrying per-connection pool bookkeeping."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_created_at = time.monotonic()
+        self.pool_last_used_at = self.pool_created_at
+        self.prepared_statements = set()
+
+
+class ConnectionPool(object):
+    """Thread-safe pool of psycopg2 connections.
+
+    Nothing is opened at construction time. The first checkout warms the pool
+    to `minsize` connections, further connections are opened on demand up to
+    `maxsize`. Every checkout waits at most `timeout` seconds and validates
+    idle connections before handing them out.
+
+    Usage:
+    >>> pool = ConnectionPool(connect=lambda: psycopg2.connect(...), maxsize=10)
+    >>> with pool.connection() as conn:
+    ...     with conn.cursor() as cur:
+    ...         cur.execute("SELECT 1")
+    """
+    def __init__(self, connect, minsize: int = 1, maxsize: int = 10,
+                 timeout: float = 30.0, liveness_interval: float = 30.0,
+                 max_idle: float = 600.0):
+        """
+        Args:
+            connect (callable): zero-argument factory returning a new connection.
+            minsize (int): connections opened on first checkout and kept open while idle.
+            maxsize (int): upper bound of open connections.
+            timeout (float): seconds to wait for a free connection on checkout.
+            liveness_interval (float): idle seconds after which a connection
+                is pinged with `SELECT 1` before reuse.
+            max_idle (float): idle seconds after which connections above
+                `minsize` are closed.
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+        if minsize < 0 or minsize > maxsize:
+            raise ValueError("minsize must be between 0 and maxsize.")
+
+        self._connect = connect
+        self.minsize = minsize
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.liveness_interval = liveness_interval
+        self.max_idle = max_idle
+
+        self._idle = []
+        self._in_use = set()
+        self._opening = 0
+        self._warmed = False
+        self._condition = threading.Condition(threading.Lock())
+        self._closed = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._timeouts = 0
+        self._opened = 0
+        self._discarded = 0
+
+    def _open(self):
+        """Open a new connection through the factory."""
+        conn = self._connect()
+        with self._condition:
+            self._opened += 1
+        if not hasattr(conn, 'pool_last_used_at'):
+            conn.pool_created_at = time.monotonic()
+            conn.pool_last_used_at = conn.pool_created_at
+        return conn
+
+    def _discard(self, conn):
+        """Close a connection that is no longer usable."""
+        with self._condition:
+            self._discarded += 1
+        try:
+            conn.close()
+        except BaseException:
+            pass
+
+    def _is_alive(self, conn):
+        """Check whether an idle connection can be reused."""
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - conn.pool_last_used_at < self.liveness_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except BaseException:
+            return False
+        return True
+
+    def getconn(self, timeout: float = None):
+        """Check out a connection, waiting up to `timeout` seconds."""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        waited = False
+
+        with self._condition:
+            if not self._warmed:
+                self._warmed = True
+                self._opening += self.minsize
+                warm = self.minsize
+            else:
+                warm = 0
+        if warm:
+            self._prefill(warm)
+
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise PoolTimeout("connection pool is closed.")
+                    if self._idle:
+                        conn = self._idle.pop()
+                        self._in_use.add(conn)
+                        break
+                    if len(self._in_use) + self._opening < self.maxsize:
+                        conn = None
+                        self._opening += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"no connection available within {timeout} seconds "
+                            f"({len(self._in_use)} in use, maxsize {self.maxsize}).")
+                    waited = True
+                    self._condition.wait(remaining)
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                except BaseException:
+                    with self._condition:
+                        self._opening -= 1
+                        self._condition.notify()
+                    raise
+                # the reserved slot passes to the checkout in one step, so no waiter can reuse it
+                with self._condition:
+                    self._opening -= 1
+                    self._in_use.add(conn)
+                break
+
+            if self._is_alive(conn):
+                break
+
+            # stale connection: drop it and try again with the freed slot
+            with self._condition:
+                self._in_use.discard(conn)
+            self._discard(conn)
+
+        elapsed = time.monotonic() - started
+        with self._condition:
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._wait_time += elapsed
+            self._max_wait_time = max(self._max_wait_time, elapsed)
+        return conn
+
+    def _prefill(self, count: int):
+        """Open `count` idle connections already reserved in `_opening`."""
+        for _ in range(count):
+            try:
+                conn = self._open()
+            except BaseException:
+                traceback.print_exc()
+                conn = None
+            with self._condition:
+                self._opening -= 1
+                if conn is not None:
+                    self._idle.append(conn)
+                self._condition.notify()
+
+    def putconn(self, conn, discard: bool = False):
+        """Return a connection to the pool."""
+        if not discard and not conn.closed:
+            try:
+                if conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except BaseException:
+                discard = True
+
+        now = time.monotonic()
+        expired = []
+        with self._condition:
+            self._in_use.discard(conn)
+            if discard or conn.closed or self._closed:
+                expired.append(conn)
+            else:
+                conn.pool_last_used_at = now
+                self._idle.append(conn)
+
+            # trim connections idle for longer than max_idle, keeping minsize open
+            while len(self._idle) > self.minsize and now - self._idle[0].pool_last_used_at > self.max_idle:
+                expired.append(self._idle.pop(0))
+            self._condition.notify()
+
+        for stale in expired:
+            self._discard(stale)
+
+    def connection(self, timeout: float = None):
+        """Context manager wrapping `getconn` and `putconn`."""
+        return _PoolCheckout(self, timeout)
+
+    def statistics(self):
+        """Return a snapshot of pool usage counters.
+
+        Returns:
+            dict: in_use, idle, checkouts, waits, timeouts and wait times in seconds.
+        """
+        with self._condition:
+            return {
+                'minsize': self.minsize,
+                'maxsize': self.maxsize,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'opened': self._opened,
+                'discarded': self._discarded,
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'total_wait_time': round(self._wait_time, 6),
+                'mean_wait_time': round(self._wait_time / self._checkouts, 6) if self._checkouts else 0.0,
+                'max_wait_time': round(self._max_wait_time, 6),
+            }
+
+    def close(self):
+        """Close idle connections and refuse further checkouts."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+
+class _PoolCheckout(object):
+    """Context manager returned by `ConnectionPool.connection`."""
+    def __init__(self, pool, timeout):
+        self._pool = pool
+        self._timeout = timeout
+        self._conn = None
+
+    def __enter__(self):
+        self._conn = self._pool.getconn(timeout=self._timeout)
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        broken = exc_type is not None and isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError))
+        if exc_type is not None and not broken:
+            try:
+                self._conn.rollback()
+            except BaseException:
+                traceback.print_exc()
+                broken = True
+        self._pool.putconn(self._conn, discard=broken)
+        self._conn = None
+        return False
@@ -0,0 +1,469 @@
+import re
+import threading
+import time
+
+
+TRANSACTION_FEATURES = [
+    'bank_account_id',
+    'id',
+    'date',
+    'amount_cents',
+    'category_id',
+    'created_at',
+    'plaid_transaction_id',
+    'merchant_city',
+    'merchant_state',
+    'lat',
+    'lon',
+    'purpose'
+]
+
+ACCOUNT_FEATURES = [
+    'id',
+    'current_balance_cents',
+    'created_at',
+    'updated_at',
+    'name',
+    'account_type',
+    'available_balance_cents',
+    'last_balance_update_at',
+    'plaid_state',
+    'initial_balance_cents',
+    'main_saving',
+    'account_subtype'
+]
+
+# column dtypes of the COPY extraction path, dates are parsed separately;
+# integers are nullable, so a NULL does not fail the parse, and cast when wrangled
+TRANSACTION_DTYPES = {
+    'bank_account_id': 'Int64',
+    'id': 'Int64',
+    'amount_cents': 'Int64',
+    'category_id': 'object',
+    'plaid_transaction_id': 'object',
+    'merchant_city': 'object',
+    'merchant_state': 'object',
+    'lat': 'float64',
+    'lon': 'float64',
+    'purpose': 'object'
+}
+
+TRANSACTION_DATES = ['date', 'created_at']
+
+REQUEST_FEATURES = [
+    'description',
+    'state'
+]
+
+
+class Statement(object):
+    """A named SQL statement with positional `$n` parameters."""
+    def __init__(self, name: str, sql: str, types: tuple = ()):
+        """
+        Args:
+            name (str): statement name, used with PREPARE / EXECUTE.
+            sql (str): statement body using $1, $2, ... placeholders.
+            types (tuple): PostgreSQL parameter types, e.g. ('bigint[]',).
+        """
+        self.name = name
+        self.sql = sql
+        self.types = tuple(types)
+
+    @property
+    def prepare_sql(self):
+        types = f" ({', '.join(self.types)})" if self.types else ""
+        return f"PREPARE {self.name}{types} AS {self.sql}"
+
+    @property
+    def bound_sql(self):
+        """Statement body with client-side `%s` placeholders cast to the declared types.
+
+        Used where a prepared statement cannot run, i.e. COPY and server-side cursors.
+        """
+        return re.sub(r'\$(\d+)', lambda match: f"%s::{self.types[int(match.group(1)) - 1]}", self.sql)
+
+    def copy_sql(self, cur, params: tuple = ()):
+        """Render `COPY (<statement>) TO STDOUT` as CSV with a header row."""
+        return cur.mogrify(f"COPY ({self.bound_sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", tuple(params)).decode()
+
+    @property
+    def execute_sql(self):
+        if not self.types:
+            return f"EXECUTE {self.name}"
+        placeholders = ", ".join(["%s"] * len(self.types))
+        return f"EXECUTE {self.name} ({placeholders})"
+
+
+class QueryRegistry(object):
+    """Registry of named statements, prepared once per pooled connection.
+
+    Prepared statement names are tracked on the connection itself
+    (`conn.prepared_statements`), so a connection replaced by the pool is
+    prepared again on first use.
+
+    Usage:
+    >>> with conn.cursor() as cur:
+    ...     statements.execute(cur, 'transactions_by_account', (45153,))
+    ...     rows = cur.fetchall()
+    """
+    def __init__(self):
+        self._statements = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def register(self, name: str, sql: str, types: tuple = ()):
+        """Add a statement to the registry."""
+        statement = Statement(name, sql, types)
+        with self._lock:
+            self._statements[name] = statement
+            self._stats[name] = {
+                'executions': 0,
+                'copies': 0,
+                'prepares': 0,
+                'errors': 0,
+                'total_time': 0.0,
+                'max_time': 0.0
+            }
+        return statement
+
+    def __getitem__(self, name: str):
+        return self._statements[name]
+
+    def __contains__(self, name: str):
+        return name in self._statements
+
+    def _prepare(self, cur, statement):
+        prepared = cur.connection.prepared_statements
+        if statement.name in prepared:
+            return
+        cur.execute(statement.prepare_sql)
+        prepared.add(statement.name)
+        with self._lock:
+            self._stats[statement.name]['prepares'] += 1
+
+    def execute(self, cur, name: str, params: tuple = ()):
+        """Prepare `name` on the cursor's connection if needed and execute it.
+
+        Args:
+            cur: psycopg2 cursor of a pooled connection.
+            name (str): registered statement name.
+            params (tuple): bound parameters. Python lists bind as arrays.
+        """
+        statement = self._statements[name]
+        if len(params) != len(statement.types):
+            raise ValueError(f"{name} expects {len(statement.types)} parameters, got {len(params)}.")
+
+        started = time.perf_counter()
+        try:
+            self._prepare(cur, statement)
+            cur.execute(statement.execute_sql, tuple(params))
+        except BaseException:
+            with self._lock:
+                self._stats[name]['errors'] += 1
+            raise
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            stats = self._stats[name]
+            stats['executions'] += 1
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+
+    def declare(self, cur, name: str, params: tuple = ()):
+        """Execute `name` on a named (server-side) cursor.
+
+        Server-side cursors cannot run EXECUTE, so the statement body is sent
+        with client-bound parameters; rows are then pulled in `cur.itersize` batches.
+        """
+        statement = self._statements[name]
+        if len(params) != len(statement.types):
+            raise ValueError(f"{name} expects {len(statement.types)} parameters, got {len(params)}.")
+
+        started = time.perf_counter()
+        try:
+            cur.execute(statement.bound_sql, tuple(params))
+        except BaseException:
+            with self._lock:
+                self._stats[name]['errors'] += 1
+            raise
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            stats = self._stats[name]
+            stats['executions'] += 1
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+
+    def copy(self, cur, name: str, params: tuple, sink):
+        """Stream the rows of `name` as CSV into the writable file `sink`."""
+        statement = self._statements[name]
+        if len(params) != len(statement.types):
+            raise ValueError(f"{name} expects {len(statement.types)} parameters, got {len(params)}.")
+
+        started = time.perf_counter()
+        try:
+            cur.copy_expert(statement.copy_sql(cur, params), sink)
+        except BaseException:
+            with self._lock:
+                self._stats[name]['errors'] += 1
+            raise
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            stats = self._stats[name]
+            stats['copies'] += 1
+            stats['total_time'] += elapsed
+            stats['max_time'] = max(stats['max_time'], elapsed)
+
+    def statistics(self):
+        """Return per-statement execution counts and timings in seconds."""
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                executions = stats['executions'] + stats['copies']
+                result[name] = dict(
+                    stats,
+                    total_time=round(stats['total_time'], 6),
+                    max_time=round(stats['max_time'], 6),
+                    mean_time=round(stats['total_time'] / executions, 6) if executions else 0.0
+                )
+            return result
+
+
+statements = QueryRegistry()
+
+statements.register(
+    'transactions_by_account',
+    f"""
+    SELECT {", ".join(TRANSACTION_FEATURES)}
+    FROM plaid_main_transactions
+    WHERE bank_account_id = $1
+    """,
+    types=('bigint',)
+)
+
+statements.register(
+    'transactions_by_account_since',
+    f"""
+    SELECT {", ".join(TRANSACTION_FEATURES)}
+    FROM plaid_main_transactions
+    WHERE bank_account_id = $1
+    AND (created_at, id) > ($2, $3)
+    """,
+    types=('bigint', 'timestamp', 'bigint')
+)
+
+statements.register(
+    'transactions_repost_before',
+    """
+    SELECT EXISTS (
+        SELECT 1
+        FROM plaid_main_transactions
+        WHERE bank_account_id = $1
+        AND (created_at IS NULL OR (created_at, id) <= ($2, $3))
+        AND COALESCE(plaid_transaction_id, '') = ANY($4)
+    )
+    """,
+    types=('bigint', 'timestamp', 'bigint', 'text[]')
+)
+
+statements.register(
+    'transactions_by_account_between',
+    f"""
+    SELECT {", ".join(TRANSACTION_FEATURES)}
+    FROM plaid_main_transactions
+    WHERE bank_account_id = $1
+    AND date >= $2
+    AND date < $3
+    """,
+    types=('bigint', 'date', 'date')
+)
+
+statements.register(
+    'transactions_by_accounts',
+    f"""
+    SELECT {", ".join(TRANSACTION_FEATURES)}
+    FROM plaid_main_transactions
+    WHERE bank_account_id = ANY($1)
+    """,
+    types=('bigint[]',)
+)
+
+statements.register(
+    'transactions_by_accounts_between',
+    f"""
+    SELECT {", ".join(TRANSACTION_FEATURES)}
+    FROM plaid_main_transactions
+    WHERE bank_account_id = ANY($1)
+    AND date >= $2
+    AND date < $3
+    """,
+    types=('bigint[]', 'date', 'date')
+)
+
+statements.register(
+    'transactions_stream',
+    f"""
+    SELECT {", ".join(TRANSACTION_FEATURES)}
+    FROM plaid_main_transactions
+    ORDER BY bank_account_id, id
+    """
+)
+
+statements.register(
+    'transactions_stream_by_accounts',
+    f"""
+    SELECT {", ".join(TRANSACTION_FEATURES)}
+    FROM plaid_main_transactions
+    WHERE bank_account_id = ANY($1)
+    ORDER BY bank_account_id, id
+    """,
+    types=('bigint[]',)
+)
+
+statements.register(
+    'transactions_stream_by_range',
+    f"""
+    SELECT {", ".join(TRANSACTION_FEATURES)}
+    FROM plaid_main_transactions
+    WHERE bank_account_id >= $1
+    AND bank_account_id < $2
+    ORDER BY bank_account_id, id
+    """,
+    types=('bigint', 'bigint')
+)
+
+statements.register(
+    'transaction_partition_watermarks',
+    """
+    SELECT bank_account_id / $1 AS partition, max(created_at), count(*)
+    FROM plaid_main_transactions
+    GROUP BY 1
+    ORDER BY 1
+    """,
+    types=('bigint',)
+)
+
+statements.register(
+    'forecast_accounts',
+    """
+    SELECT bank_account_id
+    FROM plaid_main_transactions
+    GROUP BY bank_account_id
+    HAVING date_trunc('month', max(date)) >= date_trunc('month', min(date)) + interval '12 months'
+    ORDER BY bank_account_id
+    """
+)
+
+statements.register(
+    'transaction_account_version',
+    """
+    SELECT max(created_at), max(id), count(*)
+    FROM plaid_main_transactions
+    WHERE bank_account_id = $1
+    """,
+    types=('bigint',)
+)
+
+statements.register(
+    'transaction_account_watermarks',
+    """
+    SELECT DISTINCT ON (bank_account_id) bank_account_id, created_at, id,
+        count(*) OVER (PARTITION BY bank_account_id)
+    FROM plaid_main_transactions
+    ORDER BY bank_account_id, created_at DESC NULLS LAST, id DESC
+    """
+)
+
+statements.register(
+    'transaction_account_index',
+    """
+    SELECT DISTINCT bank_account_id
+    FROM plaid_main_transactions
+    """
+)
+
+statements.register(
+    'account_by_id',
+    f"""
+    SELECT {", ".join(ACCOUNT_FEATURES)}
+    FROM bank_accounts
+    WHERE id = $1
+    """,
+    types=('bigint',)
+)
+
+statements.register(
+    'accounts_by_ids',
+    f"""
+    SELECT {", ".join(ACCOUNT_FEATURES)}
+    FROM bank_accounts
+    WHERE id = ANY($1)
+    """,
+    types=('bigint[]',)
+)
+
+statements.register(
+    'account_index',
+    """
+    SELECT id
+    FROM bank_accounts
+    """
+)
+
+statements.register(
+    'emergency_fund_requests',
+    f"""
+    SELECT {", ".join(REQUEST_FEATURES)}
+    FROM emergency_fund_requests
+    """
+)
+
+
+# all features a transaction page can select, see `app.api.pagination`
+PAGE_FEATURES = ['date', 'id', 'amount_cents', 'category_id', 'merchant_city', 'merchant_state', 'purpose']
+
+_page_lock = threading.Lock()
+
+
+def page_statements(features: list):
+    """Register the keyset page statements selecting `features`, once per feature set.
+
+    Pages are ordered by (date, id) descending; an index on
+    (bank_account_id, date, id) lets both statements read just the page.
+
+    Returns:
+        tuple: the selected features in column order, the name of the first
+            page statement, with parameters (bank_account_id, limit), and of
+            the statement continuing after a row, with (bank_account_id, date, id, limit).
+    """
+    features = [feature for feature in PAGE_FEATURES if feature in features]
+    mask = sum(1 << PAGE_FEATURES.index(feature) for feature in features)
+    first, after = f"transactions_page_{mask}", f"transactions_page_after_{mask}"
+    with _page_lock:
+        if first not in statements:
+            statements.register(
+                first,
+                f"""
+                SELECT {", ".join(features)}
+                FROM plaid_main_transactions
+                WHERE bank_account_id = $1
+                AND date IS NOT NULL
+                ORDER BY date DESC, id DESC
+                LIMIT $2
+                """,
+                types=('bigint', 'integer')
+            )
+            statements.register(
+                after,
+                f"""
+                SELECT {", ".join(features)}
+                FROM plaid_main_transactions
+                WHERE bank_account_id = $1
+                AND (date, id) < ($2, $3)
+                ORDER BY date DESC, id DESC
+                LIMIT $4
+                """,
+                types=('bigint', 'timestamp', 'bigint', 'integer')
+            )
+    return features, first, after
@@ -0,0 +1,64 @@
+import threading
+import time
+
+import numpy as np
+
+
+class AccountSampler(object):
+    """Draw random samples of existing account ids from a cached id index.
+
+    The index is loaded with a single query through `load_index` and kept for
+    `ttl` seconds, so a sample of any size costs no additional round trips
+    beyond fetching the sampled rows themselves.
+
+    Usage:
+    >>> sampler = AccountSampler(load_index=lambda: [1, 5, 9, 12])
+    >>> sampler.sample(2, seed=42)
+    """
+    def __init__(self, load_index, ttl: float = 3600.0):
+        """
+        Args:
+            load_index (callable): zero-argument callable returning an iterable of
+                ids, or None if the load failed.
+            ttl (float): seconds before the index is reloaded.
+        """
+        self._load_index = load_index
+        self.ttl = ttl
+        self._index = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def index(self):
+        """Return the sorted array of known ids, reloading it when stale.
+
+        A failed or empty load is returned but not kept, so the next call
+        tries again instead of sampling nothing until the index expires.
+        """
+        with self._lock:
+            if self._index is None or time.monotonic() - self._loaded_at > self.ttl:
+                ids = self._load_index()
+                index = np.unique(np.fromiter((int(i) for i in ids or ()), dtype=np.int64))
+                if len(index) == 0:
+                    return index
+                self._index = index
+                self._loaded_at = time.monotonic()
+            return self._index
+
+    def invalidate(self):
+        """Drop the cached index so the next sample reloads it."""
+        with self._lock:
+            self._index = None
+
+    def sample(self, sample_size: int, seed: int = None):
+        """Sample distinct ids without replacement.
+
+        Args:
+            sample_size (int): number of ids. Capped at the size of the index.
+            seed (int): seed for a reproducible sample over the same index.
+        Returns:
+            list: sampled ids as Python ints.
+        """
+        index = self.index()
+        sample_size = min(int(sample_size), len(index))
+        rng = np.random.default_rng(seed)
+        return [int(i) for i in rng.choice(index, size=sample_size, replace=False)]
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+
+# dtypes of wrangled transaction frames
+TRANSACTION_SCHEMA = {
+    'bank_account_id': 'int32',
+    'id': 'int64',
+    'date': 'datetime64[ns]',
+    'amount': 'float64',
+    'category_id': 'int32',
+    'created_at': 'datetime64[ns]',
+    'plaid_transaction_id': 'object',
+    'merchant_city': 'category',
+    'merchant_state': 'category',
+    # missing coordinates are NaN; the nullable Float32 dtype needs pandas 1.2
+    'lat': 'float32',
+    'lon': 'float32',
+    'purpose': 'category',
+    'category_name': 'category',
+    'parent_category_name': 'category',
+    'grandparent_category_name': 'category'
+}
+
+
+def _fits(values, dtype):
+    info = np.iinfo(dtype)
+    return len(values) == 0 or (values.min() >= info.min and values.max() <= info.max)
+
+
+def compact_transactions(df):
+    """Cast a wrangled transaction frame to `TRANSACTION_SCHEMA` in place.
+
+    Integer ids that do not fit the schema width are left as int64 rather than
+    wrapped; columns missing from `df` are skipped.
+
+    Returns:
+        pd.DataFrame: `df`.
+    """
+    for column, dtype in TRANSACTION_SCHEMA.items():
+        if column not in df.columns or str(df[column].dtype) == dtype:
+            continue
+        values = df[column]
+        if dtype in ('int32', 'int64'):
+            values = pd.to_numeric(values).astype('int64')
+            if dtype != 'int64' and _fits(values, dtype):
+                values = values.astype(dtype)
+        elif dtype == 'float32':
+            values = pd.to_numeric(values).astype('float32')
+        else:
+            values = values.astype(dtype)
+        df[column] = values
+    return df
+
+
+def concat_transactions(frames):
+    """Concatenate wrangled transaction frames, keeping categorical columns categorical.
+
+    `pd.concat` falls back to object for categoricals whose categories differ,
+    so those columns are unioned first.
+    """
+    frames = [frame for frame in frames if frame is not None]
+    if len(frames) == 0:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+
+    columns = [
+        column for column in frames[0].columns
+        if all(column in frame.columns and isinstance(frame[column].dtype, pd.CategoricalDtype) for frame in frames)
+    ]
+    unioned = {
+        column: union_categoricals([frame[column] for frame in frames], ignore_order=True)
+        for column in columns
+    }
+
+    df = pd.concat([frame.drop(columns=columns) for frame in frames], ignore_index=True)
+    for column in columns:
+        df[column] = unioned[column]
+    return df[frames[0].columns]
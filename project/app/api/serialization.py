@@ -0,0 +1,51 @@
+import json
+
+import numpy as np
+import pandas as pd
+from fastapi import Response
+from plotly.utils import PlotlyJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj):
+    """Convert values orjson does not serialize natively."""
+    if isinstance(obj, np.ndarray):
+        # object arrays, e.g. strings; numeric arrays are native
+        return obj.tolist()
+    if isinstance(obj, (pd.Series, pd.Index, pd.Categorical)):
+        return np.asarray(obj).tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """Serialize `obj` to JSON bytes.
+
+    Uses orjson, which writes NumPy arrays and datetimes without converting
+    them to Python objects first, and falls back to the standard library
+    with Plotly's encoder if orjson is not installed. NaN is written as null.
+
+    Usage:
+    >>> dumps({'x': np.arange(3)})
+    b'{"x":[0,1,2]}'
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, cls=PlotlyJSONEncoder, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(obj, status_code: int = 200, headers: dict = None):
+    """Return `obj` as a raw `application/json` response, skipping FastAPI's encoder.
+
+    Args:
+        obj: value to serialize, or JSON bytes serialized beforehand.
+    """
+    content = obj if isinstance(obj, bytes) else dumps(obj)
+    return Response(content=content, status_code=status_code, headers=headers, media_type='application/json')
@@ -0,0 +1,250 @@
+"""Local columnar snapshot of wrangled transactions.
+
+Transactions are written as uncompressed Arrow IPC (Feather v2) files, one per
+range of `partition_size` bank account ids, each sorted by bank_account_id.
+Reads memory-map the partition file, slice out the requested account with a
+binary search and convert only the projected columns to pandas.
+
+Build or refresh the snapshot from the `project` directory:
+
+    python -m app.api.snapshot build --partition-size 10000
+    python -m app.api.snapshot refresh
+    python -m app.api.snapshot info
+"""
+import argparse
+import datetime
+import json
+import os
+import threading
+from os.path import join, dirname
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app.api.schema import concat_transactions
+
+
+DEFAULT_SNAPSHOT_DIR = join(dirname(__file__), 'data', 'snapshot')
+
+
+class SnapshotStore(object):
+    """Arrow IPC store of wrangled transactions partitioned by bank_account_id ranges.
+
+    Usage:
+    >>> store = SnapshotStore('./app/api/data/snapshot')
+    >>> store.read(bank_account_id=45153, columns=['date', 'amount', 'parent_category_name'])
+    """
+    manifest_name = 'manifest.json'
+
+    def __init__(self, root: str = None):
+        self.root = root or os.getenv('SAVERLIFE_SNAPSHOT_DIR', DEFAULT_SNAPSHOT_DIR)
+        self._manifest = None
+        self._loaded_mtime = None
+        self._lock = threading.Lock()
+
+    @property
+    def manifest(self):
+        """Snapshot manifest: partition size and per-partition file, rows and watermark.
+
+        Reloaded whenever `manifest.json` changes, so a snapshot rebuilt or
+        refreshed by another process is served without a restart.
+        """
+        with self._lock:
+            path = join(self.root, self.manifest_name)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                mtime = None
+            if self._manifest is None or mtime != self._loaded_mtime:
+                if mtime is None:
+                    self._manifest = {'partition_size': None, 'partitions': {}}
+                else:
+                    with open(path) as f:
+                        self._manifest = json.load(f)
+                self._loaded_mtime = mtime
+            return self._manifest
+
+    def exists(self):
+        return bool(self.manifest['partitions'])
+
+    def _write_manifest(self, manifest):
+        os.makedirs(self.root, exist_ok=True)
+        path = join(self.root, self.manifest_name)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(path + '.tmp', path)
+        with self._lock:
+            self._manifest, self._loaded_mtime = manifest, os.stat(path).st_mtime_ns
+
+    def _partition_file(self, partition: int, partition_size: int):
+        start = partition * partition_size
+        return f"transactions_{start:09d}_{start + partition_size - 1:09d}.arrow"
+
+    def write_partition(self, partition: int, partition_size: int, df, watermark=None):
+        """Write the wrangled transactions of one partition, replacing any previous file.
+
+        Args:
+            partition (int): bank_account_id // partition_size.
+            partition_size (int): number of account ids per partition.
+            df (pd.DataFrame): wrangled transactions of the partition.
+            watermark (dict): source state (max created_at, row count) used by refresh.
+        Returns:
+            dict: manifest entry of the partition.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        name = self._partition_file(partition, partition_size)
+        path = join(self.root, name)
+
+        df = df.sort_values('bank_account_id', kind='mergesort').reset_index(drop=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        with pa.OSFile(path + '.tmp', 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(path + '.tmp', path)
+
+        return {'file': name, 'rows': len(df), 'watermark': watermark}
+
+    def commit(self, partition_size: int, partitions: dict, replace: bool = False):
+        """Record written partitions in the manifest.
+
+        Args:
+            partitions (dict): manifest entries keyed by partition number.
+            replace (bool): drop partitions that are not in `partitions`.
+        """
+        manifest = {'partition_size': partition_size, 'partitions': {}}
+        if not replace and self.manifest['partition_size'] == partition_size:
+            manifest['partitions'].update(self.manifest['partitions'])
+        manifest['partitions'].update({str(k): v for k, v in partitions.items()})
+        manifest['updated_at'] = datetime.datetime.utcnow().isoformat()
+        self._write_manifest(manifest)
+
+    def _open(self, manifest: dict, partition: int):
+        entry = manifest['partitions'].get(str(partition))
+        if entry is None:
+            return None
+        source = pa.memory_map(join(self.root, entry['file']), 'r')
+        return pa.ipc.open_file(source).read_all()
+
+    def read(self, bank_account_id=None, columns: list = None):
+        """Read wrangled transactions from the snapshot.
+
+        Args:
+            bank_account_id: account to read. Reads every partition if None.
+            columns (list): columns to convert to pandas. All columns if None.
+        Returns:
+            pd.DataFrame: transactions, empty if the account is not in the snapshot.
+        """
+        # one manifest for the whole read, even if it is rewritten meanwhile
+        manifest = self.manifest
+        partition_size = manifest['partition_size']
+        if not partition_size:
+            return pd.DataFrame(columns=columns)
+
+        if bank_account_id is None:
+            partitions = sorted(int(p) for p in manifest['partitions'])
+        else:
+            bank_account_id = int(bank_account_id)
+            partitions = [bank_account_id // partition_size]
+
+        frames = []
+        for partition in partitions:
+            table = self._open(manifest, partition)
+            if table is None:
+                continue
+            if bank_account_id is not None:
+                # partition files are sorted by bank_account_id: slice without copying
+                ids = table.column('bank_account_id').to_numpy()
+                lo = int(np.searchsorted(ids, bank_account_id, side='left'))
+                hi = int(np.searchsorted(ids, bank_account_id, side='right'))
+                table = table.slice(lo, hi - lo)
+            if columns is not None:
+                table = pa.Table.from_arrays([table.column(c) for c in columns], names=columns)
+            frames.append(table.to_pandas())
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return concat_transactions(frames)
+
+
+def build(store, utility, partition_size: int = 10000, partitions: list = None, chunk_accounts: int = 1000):
+    """Stream transactions from the database into snapshot partitions.
+
+    Args:
+        store (SnapshotStore): target store.
+        utility (SaverlifeUtility): source of wrangled transaction chunks.
+        partition_size (int): number of account ids per partition.
+        partitions (list): partitions to (re)build. Every partition if None.
+        chunk_accounts (int): accounts per streamed chunk.
+    Returns:
+        dict: manifest entries of the written partitions.
+    """
+    watermarks = {
+        int(partition): {'max_created_at': str(max_created_at), 'rows': int(rows)}
+        for partition, max_created_at, rows in utility.handle_statement('transaction_partition_watermarks', (partition_size,)) or []
+    }
+    if partitions is None:
+        partitions = sorted(watermarks)
+
+    written = {}
+    for partition in partitions:
+        start = partition * partition_size
+        chunks = list(utility.iter_transactions(id_range=(start, start + partition_size),
+                                                chunk_accounts=chunk_accounts, chunk_rows=None))
+        if not chunks:
+            continue
+        df = concat_transactions(chunks)
+        written[partition] = store.write_partition(partition, partition_size, df, watermark=watermarks.get(partition))
+        print(f"partition {partition}: {len(df)} rows")
+
+    return written
+
+
+def stale_partitions(store, utility):
+    """Return partitions whose database watermark differs from the snapshot."""
+    manifest = store.manifest
+    partition_size = manifest['partition_size']
+    current = manifest['partitions']
+    stale = []
+    for partition, max_created_at, rows in utility.handle_statement('transaction_partition_watermarks', (partition_size,)) or []:
+        entry = current.get(str(partition))
+        watermark = {'max_created_at': str(max_created_at), 'rows': int(rows)}
+        if entry is None or entry.get('watermark') != watermark:
+            stale.append(int(partition))
+    return stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['build', 'refresh', 'info'])
+    parser.add_argument('--root', default=None, help="snapshot directory (default: SAVERLIFE_SNAPSHOT_DIR)")
+    parser.add_argument('--partition-size', type=int, default=10000)
+    parser.add_argument('--chunk-accounts', type=int, default=1000)
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.root)
+
+    if args.command == 'info':
+        manifest = store.manifest
+        rows = sum(p['rows'] for p in manifest['partitions'].values())
+        print(f"{store.root}: {len(manifest['partitions'])} partitions of "
+              f"{manifest['partition_size']} accounts, {rows} rows, updated {manifest.get('updated_at')}")
+        return
+
+    from app.api.utils import SaverlifeUtility
+
+    if args.command == 'build' or not store.exists():
+        written = build(store, SaverlifeUtility, partition_size=args.partition_size, chunk_accounts=args.chunk_accounts)
+        store.commit(args.partition_size, written, replace=True)
+    else:
+        partition_size = store.manifest['partition_size']
+        stale = stale_partitions(store, SaverlifeUtility)
+        written = build(store, SaverlifeUtility, partition_size=partition_size, partitions=stale,
+                        chunk_accounts=args.chunk_accounts)
+        store.commit(partition_size, written)
+    print(f"wrote {len(written)} partitions to {store.root}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Query, Response
+from fastapi.responses import StreamingResponse
 import pandas as pd
 import numpy as np
 import psycopg2
@@ -7,26 +8,39 @@ from pydantic import BaseModel, Field, validator
 from fastapi.templating import Jinja2Templates
 from typing import Optional
 import json
-import random
+import asyncio
+from datetime import date
 
 import sys
+import threading
+import time
 import traceback
+import uuid
+from functools import cached_property
 
-from sktime.forecasting.model_selection import temporal_train_test_split
-from sktime.performance_metrics.forecasting import smape_loss
-from sktime.utils.plotting.forecasting import plot_ys
-from sktime.forecasting.naive import NaiveForecaster
-from sktime.forecasting.compose import ReducedRegressionForecaster
-from sklearn.neighbors import KNeighborsRegressor
 from sklearn.ensemble import RandomForestRegressor
 
-import plotly.graph_objects as go
 
 from dotenv import load_dotenv
 from os.path import join, dirname
 import os
 
-from app.api.basemodels import User, GraphRequest
+from app.api.basemodels import User, GraphRequest, BatchGraphRequest, TransactionPageRequest
+from app.api.pool import ConnectionPool, PooledConnection
+from app.api.concurrency import io_executor, cpu_executor
+from app.api.sampling import AccountSampler
+from app.api.cache import LRUCache
+from app.api.categories import categories, CATEGORY_LEVELS
+from app.api.schema import compact_transactions, concat_transactions, TRANSACTION_SCHEMA
+from app.api.snapshot import SnapshotStore
+from app.api.cube import MonthlyCube, aggregate, combine, rollup, window
+from app.api.pagination import DEFAULT_PAGE_COLUMNS, page_features, encode_cursor, decode_cursor
+from app.api.figures import monthly_bar_figure, transactions_table_figure
+from app.api.serialization import dumps, json_response
+from app.api.figure_cache import figure_cache, etag_matches
+from app.api.forecasting import forecast_pool, forecast_cache, ForecastTimeout
+from app.api.forecast_table import forecast_table
+from app.api.queries import statements, page_statements, TRANSACTION_FEATURES, TRANSACTION_DTYPES, TRANSACTION_DATES, ACCOUNT_FEATURES, REQUEST_FEATURES
 
 
 dotenv_path = join(dirname(__file__), '.env')
@@ -40,7 +54,40 @@ templates = Jinja2Templates(directory="./app/static/dist")
 class SaverlifeUtility(object):
     """General utility class to handle database cursor objects and other miscellaneous functions."""
     def __init__(self):
-        self._cursor = self._handle_cursor()
+        self._pool = ConnectionPool(
+            connect=self._handle_connection,
+            minsize=int(os.getenv('POSTGRES_POOL_MINSIZE', 1)),
+            maxsize=int(os.getenv('POSTGRES_POOL_MAXSIZE', 10)),
+            timeout=float(os.getenv('POSTGRES_POOL_TIMEOUT', 30)),
+            liveness_interval=float(os.getenv('POSTGRES_POOL_LIVENESS_INTERVAL', 30)),
+            max_idle=float(os.getenv('POSTGRES_POOL_MAX_IDLE', 600))
+        )
+        sampler_ttl = float(os.getenv('SAVERLIFE_SAMPLER_TTL', 3600))
+        self._transaction_account_sampler = AccountSampler(
+            load_index=lambda: self._load_ids('transaction_account_index'),
+            ttl=sampler_ttl
+        )
+        self._account_sampler = AccountSampler(
+            load_index=lambda: self._load_ids('account_index'),
+            ttl=sampler_ttl
+        )
+        self._transaction_cache = LRUCache(
+            max_entries=int(os.getenv('SAVERLIFE_CACHE_MAX_ENTRIES', 1024)),
+            max_bytes=int(os.getenv('SAVERLIFE_CACHE_MAX_BYTES', 256 * 2**20)),
+            ttl=float(os.getenv('SAVERLIFE_CACHE_TTL', 300))
+        )
+        # seconds after a full fetch before a cached account is fetched in full again
+        self._transaction_max_age = float(os.getenv('SAVERLIFE_CACHE_MAX_AGE', 3600))
+        self._snapshot_store = SnapshotStore()
+        self._cube = MonthlyCube(
+            ttl=float(os.getenv('SAVERLIFE_CUBE_TTL', 300)),
+            max_entries=int(os.getenv('SAVERLIFE_CUBE_MAX_ENTRIES', 4096)),
+            max_bytes=int(os.getenv('SAVERLIFE_CUBE_MAX_BYTES', 64 * 2**20))
+        )
+        self._data_versions = LRUCache(
+            max_entries=int(os.getenv('SAVERLIFE_CACHE_MAX_ENTRIES', 1024)),
+            ttl=float(os.getenv('SAVERLIFE_VERSION_TTL', 60))
+        )
 
 
     def _handle_connection(self):
@@ -50,59 +97,554 @@ class SaverlifeUtility(object):
            dbname=os.getenv('POSTGRES_DBNAME_EXTERNAL'),
            user=os.getenv('POSTGRES_USER_EXTERNAL'), 
            password=os.getenv('POSTGRES_PASSWORD_EXTERNAL'), 
-           port=os.getenv('POSTGRES_PORT_EXTERNAL') 
+           port=os.getenv('POSTGRES_PORT_EXTERNAL'),
+           connection_factory=PooledConnection
         )
 
     def _handle_cursor(self):
-        """Create a cursor to perform database operations."""
-        conn = self._handle_connection()
+        """Check out a pooled connection to perform database operations.
 
-        cur = conn.cursor()
+        Usage:
+        >>> with SaverlifeUtility._handle_cursor() as conn:
+        ...     with conn.cursor() as cur:
+        ...         cur.execute(query)
+        """
+        return self._pool.connection()
 
-        return conn, cur
+    def pool_statistics(self):
+        """Return connection pool statistics (in use, idle, wait times)."""
+        return self._pool.statistics()
     
     def handle_query(self, query: str, fetchone: bool = False):
         """Handle simple query operations."""
+        result = None
         try:
-            conn, cur = self._handle_cursor()
-            cur.execute(query)
+            with self._handle_cursor() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(query)
+                    if fetchone is True:
+                        try:
+                            result = cur.fetchone()
+                        except psycopg2.ProgrammingError:
+                            result = None
+                    else:
+                        result = cur.fetchall()
+                conn.commit()
         except BaseException:
             traceback.print_exc()
-        finally:
-            if cur:
-                if fetchone is True:
-                    try:
+        return result
+
+    def handle_statement(self, name: str, params: tuple = (), fetchone: bool = False):
+        """Handle a named statement from the query registry with bound parameters.
+
+        Args:
+            name (str): statement name registered in `app.api.queries.statements`.
+            params (tuple): bound parameters, lists bind as PostgreSQL arrays.
+            fetchone (bool): fetch a single row instead of all rows.
+        """
+        result = None
+        try:
+            with self._handle_cursor() as conn:
+                with conn.cursor() as cur:
+                    statements.execute(cur, name, params)
+                    if fetchone is True:
                         result = cur.fetchone()
-                    except ProgrammingError:
-                        result = None
-                else:
-                    result = cur.fetchall()
-                cur.close()
-                conn.close()
+                    else:
+                        result = cur.fetchall()
+                conn.commit()
+        except BaseException:
+            traceback.print_exc()
         return result
 
-    def _generate_dataframe(self, table: str, bank_account_id: str = None, sample_size: int = 1):
-        """Support utility function to handle database manipulation and other miscellaneous functions."""
+    def _load_ids(self, name: str):
+        """Return the ids in the first column of a named statement, None if it failed."""
+        rows = self.handle_statement(name)
+        return None if rows is None else [row[0] for row in rows]
+
+    def handle_copy(self, name: str, params: tuple = (), dtype: dict = None, parse_dates: list = None):
+        """Stream a named statement through `COPY ... TO STDOUT` into a DataFrame.
+
+        Rows are parsed by `pd.read_csv` with explicit dtypes while the server is
+        still sending them, instead of materializing one Python tuple per row.
+
+        Args:
+            name (str): statement name registered in `app.api.queries.statements`.
+            params (tuple): bound parameters.
+            dtype (dict): column dtypes passed to `pd.read_csv`.
+            parse_dates (list): columns parsed as datetimes.
+        Returns:
+            pd.DataFrame: result rows, empty if the statement failed.
+        """
         df = None
+        try:
+            with self._handle_cursor() as conn:
+                with conn.cursor() as cur:
+                    read_fd, write_fd = os.pipe()
+                    errors = []
+
+                    def produce():
+                        with os.fdopen(write_fd, 'wb') as sink:
+                            try:
+                                statements.copy(cur, name, params, sink)
+                            except BaseException as e:
+                                errors.append(e)
+
+                    producer = threading.Thread(target=produce, daemon=True)
+                    producer.start()
+                    try:
+                        with os.fdopen(read_fd, 'rb') as source:
+                            df = pd.read_csv(source,
+                                             dtype=dtype,
+                                             parse_dates=parse_dates,
+                                             keep_default_na=False,
+                                             na_values=[''])
+                    finally:
+                        producer.join()
+                    if errors:
+                        raise errors[0]
+                conn.commit()
+        except BaseException:
+            traceback.print_exc()
+            df = None
+        return df
+
+    def iter_transactions(self, bank_account_ids: list = None, chunk_rows: int = 100000,
+                          chunk_accounts: int = None, itersize: int = 10000, id_range: tuple = None,
+                          wrangle: bool = True):
+        """Yield wrangled transaction DataFrames chunk by chunk.
+
+        Rows are pulled from a named server-side cursor `itersize` at a time, so
+        peak memory is bounded by the chunk size rather than the population.
+        Chunks always end on an account boundary, which keeps the duplicate
+        removal of `_wrangle_transactions` exact; a chunk therefore closes once it
+        holds `chunk_rows` rows or `chunk_accounts` accounts, whichever comes first.
+
+        The pooled connection stays checked out until the generator is
+        exhausted or closed.
 
-        if table is 'transactions':
-            df = self._configure_transactions_dataframe(bank_account_id=bank_account_id, sample_size=sample_size)
-        if table is 'accounts':
-            df = self._configure_accounts_dataframe(bank_account_id=bank_account_id, sample_size=sample_size)
-        if table is 'requests':
+        Args:
+            bank_account_ids (list): accounts to stream. Streams every account if None.
+            id_range (tuple): stream accounts with start <= bank_account_id < end instead.
+            chunk_rows (int): rows per chunk before it is closed at the next account.
+            chunk_accounts (int): accounts per chunk.
+            itersize (int): rows fetched per network round trip.
+            wrangle (bool): yield wrangled chunks, or the raw rows if False.
+        Usage:
+        >>> for chunk in SaverlifeUtility.iter_transactions(chunk_accounts=1000):
+        ...     cohort_totals.append(chunk.groupby('parent_category_name')['amount'].sum())
+        """
+        if id_range is not None:
+            name, params = 'transactions_stream_by_range', (int(id_range[0]), int(id_range[1]))
+        elif bank_account_ids is None:
+            name, params = 'transactions_stream', ()
+        else:
+            name, params = 'transactions_stream_by_accounts', ([int(i) for i in bank_account_ids],)
+
+        wrangle = self._wrangle_transactions if wrangle else (lambda x: x)
+
+        with self._handle_cursor() as conn:
+            with conn.cursor(name=f"transactions_{uuid.uuid4().hex}") as cur:
+                cur.itersize = itersize
+                statements.declare(cur, name, params)
+
+                buffer = []
+                accounts = 0
+                last_account = None
+                for row in cur:
+                    if row[0] != last_account:
+                        full_rows = chunk_rows is not None and len(buffer) >= chunk_rows
+                        full_accounts = chunk_accounts is not None and accounts >= chunk_accounts
+                        if buffer and (full_rows or full_accounts):
+                            yield wrangle(pd.DataFrame(buffer, columns=TRANSACTION_FEATURES))
+                            buffer = []
+                            accounts = 0
+                        accounts += 1
+                        last_account = row[0]
+                    buffer.append(row)
+
+                if buffer:
+                    yield wrangle(pd.DataFrame(buffer, columns=TRANSACTION_FEATURES))
+            conn.commit()
+
+    def statement_statistics(self):
+        """Return per-statement execution counts and timings."""
+        return statements.statistics()
+
+    def sample_bank_account_ids(self, sample_size: int, table: str = 'transactions', seed: int = None):
+        """Sample distinct, existing account ids.
+
+        Args:
+            sample_size (int): number of accounts to draw.
+            table (str): 'transactions' samples accounts that have transactions,
+                'accounts' samples rows of bank_accounts.
+            seed (int): seed for a reproducible sample.
+        Returns:
+            list: sampled bank account ids.
+        """
+        if table == 'accounts':
+            return self._account_sampler.sample(sample_size, seed=seed)
+        return self._transaction_account_sampler.sample(sample_size, seed=seed)
+
+    def _generate_dataframe(self, table: str, bank_account_id: str = None, sample_size: int = 1, seed: int = None,
+                            extraction: str = 'tuple', use_cache: bool = True, incremental: bool = True,
+                            source: str = None, columns: list = None, refresh: bool = False, months: tuple = None):
+        """Support utility function to handle database manipulation and other miscellaneous functions.
+
+        Args:
+            extraction (str): 'tuple' fetches transaction rows through the cursor,
+                'copy' streams them through COPY into typed columns.
+            use_cache (bool): serve single-account transactions from the
+                transaction cache. Cached frames are shared, treat them as read-only.
+            incremental (bool): refresh an expired cache entry by fetching only
+                transactions created after its watermark. Entries fetched in full
+                more than SAVERLIFE_CACHE_MAX_AGE seconds ago, or whose row count
+                shows deleted or backdated transactions, are fetched in full
+                again; that also picks up edited transactions.
+            refresh (bool): refresh a cached entry even if it has not expired.
+            source (str): 'database', or 'snapshot' to read transactions from the
+                local snapshot store. Defaults to SAVERLIFE_TRANSACTION_SOURCE.
+            columns (list): columns to read from the snapshot store.
+            months (tuple): (start_month, end_month) as 'YYYY-MM', either may be
+                None, to fetch the transactions of one account dated within
+                those months only. Bounded requests are cached separately.
+        """
+        df = None
+
+        source = self.transaction_source(source)
+
+        if table == 'transactions' and source == 'snapshot':
+            df = self._configure_snapshot_transactions_dataframe(bank_account_id=bank_account_id, sample_size=sample_size,
+                                                                 seed=seed, columns=columns)
+            if months is not None:
+                df = self._select_months(df, months)
+        elif table == 'transactions':
+            df = self._configure_transactions_dataframe(bank_account_id=bank_account_id, sample_size=sample_size, seed=seed,
+                                                        extraction=extraction, use_cache=use_cache,
+                                                        incremental=incremental, refresh=refresh, months=months)
+        if table == 'accounts':
+            df = self._configure_accounts_dataframe(bank_account_id=bank_account_id, sample_size=sample_size, seed=seed)
+        if table == 'requests':
             df = self._configure_requests_dataframe()
         
         return df
 
-    def _configure_transactions_dataframe(self, bank_account_id: str, sample_size: int = 1):
-        df = self._fetch_transactions_dataframe(bank_account_id=bank_account_id, sample_size=sample_size)
+    def transaction_source(self, source: str = None):
+        """Return `source`, or SAVERLIFE_TRANSACTION_SOURCE if None: 'database' or 'snapshot'."""
+        return source or os.getenv('SAVERLIFE_TRANSACTION_SOURCE', 'database')
+
+    def _configure_transactions_dataframe(self, bank_account_id: str, sample_size: int = 1, seed: int = None,
+                                          extraction: str = 'tuple', use_cache: bool = True, incremental: bool = True,
+                                          refresh: bool = False, months: tuple = None):
+        use_cache = use_cache and bool(bank_account_id)
+        months = tuple(months) if bank_account_id and months is not None and any(months) else None
+        key = str(bank_account_id) if months is None else (str(bank_account_id),) + months
+
+        if use_cache:
+            cached, fresh = self._transaction_cache.lookup(key)
+            if cached is not None:
+                df, watermark, rows, fetched_at = cached
+                if fresh and not refresh:
+                    return df.copy(deep=False)
+                # month ranges are bounded, so they are simply fetched again
+                if (incremental and watermark is not None and rows is not None
+                        and time.monotonic() - fetched_at <= self._transaction_max_age):
+                    df = self._sync_transactions(bank_account_id, df, watermark, rows, fetched_at,
+                                                 extraction=extraction)
+                    if df is not None:
+                        return df
+
+        fetched_at = time.monotonic()
+        df = self._fetch_transactions_dataframe(bank_account_id=bank_account_id, sample_size=sample_size, seed=seed,
+                                                extraction=extraction, months=months)
         
+        watermark = self._transactions_watermark(df)
+        rows = len(df) if months is None else None
+
         df = self._wrangle_transactions(df)
 
+        if use_cache and len(df) > 0:
+            self._transaction_cache.put(key, (df, watermark, rows, fetched_at))
+            df = df.copy(deep=False)
+
         return df
+
+    def _month_dates(self, months: tuple):
+        """Return the [start, end) dates of (start_month, end_month), open bounds as the widest dates."""
+        start_month, end_month = months
+        start = np.datetime64(start_month, 'M').astype('datetime64[D]').item() if start_month else date.min
+        end = (np.datetime64(end_month, 'M') + 1).astype('datetime64[D]').item() if end_month else date.max
+        return start, end
+
+    def _select_months(self, df, months: tuple):
+        """Keep the transactions dated within (start_month, end_month), as the bounded query does."""
+        start_month, end_month = months
+        dated = pd.to_datetime(df['date']).to_numpy().astype('datetime64[M]')
+        keep = ~np.isnat(dated)
+        if start_month:
+            keep &= dated >= np.datetime64(start_month, 'M')
+        if end_month:
+            keep &= dated <= np.datetime64(end_month, 'M')
+        return df.loc[keep]
+
+    def _configure_snapshot_transactions_dataframe(self, bank_account_id: str, sample_size: int = 1, seed: int = None,
+                                                   columns: list = None):
+        """Read wrangled transactions from the local snapshot store instead of the database."""
+        if bank_account_id:
+            return self._snapshot_store.read(bank_account_id=bank_account_id, columns=columns)
+
+        frames = [self._snapshot_store.read(bank_account_id=i, columns=columns)
+                  for i in self.sample_bank_account_ids(sample_size, table='transactions', seed=seed)]
+
+        return concat_transactions(frames) if frames else pd.DataFrame(columns=columns)
+
+    def _transactions_watermark(self, x):
+        """Return the (created_at, id) high-water mark of raw transaction rows, None if empty."""
+        if len(x) == 0:
+            return None
+
+        created_at = pd.to_datetime(x['created_at'])
+        latest = created_at.max()
+        if pd.isnull(latest):
+            return None
+
+        latest_id = x.loc[created_at == latest, 'id'].max()
+
+        return latest.to_pydatetime(), int(latest_id)
+
+    def _sync_transactions(self, bank_account_id: str, df, watermark: tuple, rows: int, fetched_at: float,
+                           extraction: str = 'tuple'):
+        """Append transactions created after `watermark` to a cached wrangled frame.
+
+        Only rows with (created_at, id) beyond the watermark are fetched, so the
+        cost follows new activity rather than account age. The account's row
+        count must then equal the cached rows plus the new ones; otherwise rows
+        were deleted, or inserted with an older created_at, and None is
+        returned so the account is fetched in full. Rows edited in place are
+        picked up once the entry is fetched in full again: after
+        SAVERLIFE_CACHE_MAX_AGE seconds, or once evicted or invalidated.
+
+        Args:
+            rows (int): raw rows of the account up to `watermark`.
+            fetched_at (float): `time.monotonic()` of the entry's last full fetch.
+        Returns:
+            pd.DataFrame: the updated frame, None if it must be fetched in full.
+        """
+        x = self._fetch_transactions_dataframe(bank_account_id=bank_account_id, extraction=extraction, since=watermark)
+
+        version = self.data_version(bank_account_id, refresh=True)
+        if version is None or version[2] != rows + len(x):
+            return None
+
+        if len(x) > 0:
+            watermark = max(watermark, self._transactions_watermark(x))
+            X = self._wrangle_transactions(x)
+
+            # keep the first occurrence, as _wrangle_transactions does for a full fetch
+            df = concat_transactions([df, X])
+            df = df.drop_duplicates(subset='plaid_transaction_id').reset_index(drop=True)
+
+        self._transaction_cache.put(str(bank_account_id), (df, watermark, rows + len(x), fetched_at))
+
+        return df.copy(deep=False)
+
+    def transactions_by_accounts(self, bank_account_ids: list, months: tuple = None, use_cache: bool = True):
+        """Return the wrangled transactions of many accounts, fetched in one query.
+
+        Accounts with a fresh transaction cache entry are served from it; the
+        rest are fetched together, split by bank_account_id in memory and
+        wrangled account by account, exactly as a single-account fetch, then
+        cached.
+
+        Args:
+            bank_account_ids (list): accounts to load.
+            months (tuple): (start_month, end_month) as in `_generate_dataframe`.
+            use_cache (bool): read and fill the transaction cache.
+        Returns:
+            dict: bank account id (str) to wrangled transactions, empty for
+                accounts without transactions.
+        """
+        months = tuple(months) if months is not None and any(months) else None
+        frames = {}
+        missing = []
+        for bank_account_id in dict.fromkeys(str(i) for i in bank_account_ids):
+            key = bank_account_id if months is None else (bank_account_id,) + months
+            cached, fresh = self._transaction_cache.lookup(key) if use_cache else (None, False)
+            if cached is not None and fresh:
+                frames[bank_account_id] = cached[0].copy(deep=False)
+            elif bank_account_id.isdigit():
+                missing.append(bank_account_id)
+            else:
+                frames[bank_account_id] = self._wrangle_transactions(pd.DataFrame(columns=TRANSACTION_FEATURES))
+
+        if not missing:
+            return frames
+
+        fetched_at = time.monotonic()
+        x = self._fetch_transactions_dataframe(bank_account_ids=[int(i) for i in missing], months=months)
+        positions = x.groupby(x['bank_account_id'].astype('int64'), sort=False).indices
+
+        for bank_account_id in missing:
+            rows = x.take(positions.get(int(bank_account_id), []))
+            watermark = self._transactions_watermark(rows)
+            df = self._wrangle_transactions(rows)
+            if use_cache and len(df) > 0:
+                key = bank_account_id if months is None else (bank_account_id,) + months
+                self._transaction_cache.put(key, (df, watermark, len(rows) if months is None else None, fetched_at))
+                df = df.copy(deep=False)
+            frames[bank_account_id] = df
+
+        return frames
+
+    def transactions_page(self, bank_account_id: str, page_size: int = 50, cursor: str = None,
+                          columns: list = DEFAULT_PAGE_COLUMNS):
+        """Return one page of an account's transactions, newest first.
+
+        Only the page, plus one row telling whether another page follows, and
+        only the features behind `columns` are fetched; see `app.api.pagination`.
+        Transactions of unknown categories are left out, so a page can be
+        shorter than `page_size` while more pages follow.
+
+        Args:
+            bank_account_id (str): account to page through.
+            page_size (int): transactions per page.
+            cursor (str): `next_cursor` of the previous page, None for the first page.
+            columns (list): `app.api.pagination.PAGE_COLUMNS` to return.
+        Returns:
+            tuple: the page as a DataFrame of `columns`, whether more pages
+                follow, and the cursor of the next page (None on the last page).
+        """
+        features, first, after = page_statements(page_features(columns))
+        if cursor is None:
+            name, params = first, (bank_account_id, page_size + 1)
+        else:
+            name, params = after, (bank_account_id,) + decode_cursor(cursor) + (page_size + 1,)
+
+        x = pd.DataFrame(self.handle_statement(name, params) or [], columns=features)
+
+        has_more = len(x) > page_size
+        x = x.iloc[:page_size]
+        next_cursor = encode_cursor(x['date'].iloc[-1], x['id'].iloc[-1]) if has_more else None
+
+        positions = categories.positions(x['category_id']) if 'category_id' in features else None
+        if positions is not None:
+            x = x.loc[positions >= 0]
+            positions = positions[positions >= 0]
+
+        page = {}
+        for column in columns:
+            if column == 'formatted_date':
+                dates = pd.to_datetime(x['date']).to_numpy().astype('datetime64[D]')
+                page[column] = np.datetime_as_string(dates, unit='D')
+            elif column == 'amount':
+                page[column] = (x['amount_cents'] / 100).round(2).astype(int).to_numpy()
+            elif column in CATEGORY_LEVELS:
+                page[column] = categories.take(positions, column)
+            else:
+                page[column] = self._handle_missing_values(x[column], categorical=True)
+
+        return pd.DataFrame(page, columns=columns), has_more, next_cursor
+
+    def monthly_aggregates(self, bank_account_id: str, incremental: bool = True, refresh: bool = False):
+        """Return the monthly aggregate cube cells of an account.
+
+        Accounts missing from the cube are aggregated from a full fetch. Stale
+        accounts, or every account if `refresh`, get the transactions created
+        after their watermark added, as in `_sync_transactions`. The account is
+        rebuilt instead if one of them repeats the plaid_transaction_id of an
+        earlier transaction, so it is counted once as in a full fetch, or if
+        the account's row count shows deleted rows or rows inserted with an
+        older created_at. Rows edited in place are only reflected after the
+        next `python -m app.api.cube build`.
+
+        Args:
+            bank_account_id (str): account to aggregate.
+            incremental (bool): refresh stale accounts incrementally instead of rebuilding them.
+            refresh (bool): refresh even if the account is fresh.
+        Returns:
+            pd.DataFrame: cells as returned by `app.api.cube.aggregate`, empty
+                for a non-numeric bank_account_id.
+        """
+        if not str(bank_account_id).isdigit():
+            return combine()
+
+        cells, watermark, rows, fresh = self._cube.lookup(bank_account_id)
+        if cells is not None and fresh and not refresh:
+            return cells
+
+        if cells is not None and incremental and watermark is not None and rows is not None:
+            x = self._fetch_transactions_dataframe(bank_account_id=bank_account_id, since=watermark)
+            version = self.data_version(bank_account_id, refresh=True)
+            if version is not None and version[2] == rows + len(x):
+                if len(x) == 0:
+                    return self._cube.put(bank_account_id, cells, watermark, rows)
+                if not self._reposted(bank_account_id, x, watermark):
+                    watermark = max(watermark, self._transactions_watermark(x))
+                    cells = combine(cells, aggregate(self._wrangle_transactions(x)))
+                    return self._cube.put(bank_account_id, cells, watermark, rows + len(x))
+
+        x = self._fetch_transactions_dataframe(bank_account_id=bank_account_id)
+        watermark = self._transactions_watermark(x)
+        cells = aggregate(self._wrangle_transactions(x))
+        if watermark is None:
+            return cells
+        return self._cube.put(bank_account_id, cells, watermark, len(x))
+
+    def _reposted(self, bank_account_id: str, x, watermark: tuple):
+        """Return True if new rows `x` repeat a plaid_transaction_id of the account's rows up to `watermark`.
+
+        Missing ids count as one id, as in the duplicate removal of
+        `_wrangle_transactions`. True if the check failed.
+        """
+        plaid_ids = self._handle_missing_values(x['plaid_transaction_id']).fillna('').astype(str).unique().tolist()
+        row = self.handle_statement('transactions_repost_before',
+                                    (bank_account_id, watermark[0], watermark[1], plaid_ids), fetchone=True)
+        return row is None or bool(row[0])
+
+    def data_version(self, bank_account_id: str, refresh: bool = False):
+        """Return a version of an account's transactions, None if it has none or is not numeric.
+
+        The version is the latest created_at, the highest id and the row count,
+        so inserts and deletes change it, but rows edited in place do not.
+        Versions are memoized for SAVERLIFE_VERSION_TTL seconds, which bounds
+        how long an account with new or deleted rows can keep serving cached
+        figures.
+
+        Args:
+            refresh (bool): query the version even if it is memoized.
+        """
+        key = str(bank_account_id)
+        if not key.isdigit():
+            return None
+        version = None if refresh else self._data_versions.get(key)
+        if version is None:
+            row = self.handle_statement('transaction_account_version', (bank_account_id,), fetchone=True)
+            if row is None:
+                return None
+            created_at, latest_id, rows = row
+            version = (str(created_at), int(latest_id), int(rows)) if rows else ()
+            self._data_versions.put(key, version)
+        return version or None
+
+    def cube_statistics(self):
+        """Return monthly aggregate cube size and lookup counters."""
+        return self._cube.statistics()
+
+    def invalidate_transactions(self, bank_account_id: str = None):
+        """Drop cached transactions of one account, or of every account if None."""
+        if bank_account_id is None:
+            self._transaction_cache.clear()
+        else:
+            # the full history and every month range of the account
+            bank_account_id = str(bank_account_id)
+            self._transaction_cache.invalidate_matching(
+                lambda key: key == bank_account_id or (isinstance(key, tuple) and key[0] == bank_account_id))
+
+    def cache_statistics(self):
+        """Return transaction cache hit, miss and eviction counters."""
+        return self._transaction_cache.statistics()
     
-    def _configure_accounts_dataframe(self, bank_account_id: str, sample_size: int = 1):
-        df = self._fetch_accounts_dataframe(bank_account_id=bank_account_id, sample_size=sample_size)
+    def _configure_accounts_dataframe(self, bank_account_id: str, sample_size: int = 1, seed: int = None):
+        df = self._fetch_accounts_dataframe(bank_account_id=bank_account_id, sample_size=sample_size, seed=seed)
         
         df = self._wrangle_accounts(df)
 
@@ -116,190 +658,136 @@ class SaverlifeUtility(object):
         return df
     
     def _handle_category_features(self, debug: bool = False):
-        """Parse user category features from lists to a nested list for dataframe.
-        
+        """Return the Plaid category hierarchy as a DataFrame.
+
+        The hierarchy is loaded once from `data/plaid_categories.csv` into
+        `app.api.categories.categories`; transaction wrangling joins against
+        that lookup directly and does not call this method.
+
         Args:
             debug (bool): debug mode. Prints the result if TRUE else returns the result.
         Returns:
-            list: nested list of features.
-            
-                [
-                    [category_id], [category_name], [parent_category_name], [grandparent_category_name]
-                ]
+            pd.DataFrame: category_id, category_name, parent_category_name, grandparent_category_name.
         """
-        category_id = [
-            '18001001', '18001002', '18001003', '18001004', '18001005', '18001006', '18001007', '18001008', '18001009', '18001010', '18073001', '18073002', '18073003', '18073004', '22001000', '22002000', '17001001', '17001002', '17001003', '17001004', '17001005', '17001006', '17001007', '17001008', '17001009', '17001010', '17001011', '17001012', '17001013', '17001014', '17001015', '17001016', '17001017', '17001018', '17001019', '17001000', '18020013', '21012002', '21007001', '21007002', '10002000', '22013000', '22017000', '22009000', '18006001', '18006002', '18006003', '18006004', '18006005', '18006006', '18006007', '18006008', '18006009', '19005001', '19005002', '19005003', '19005004', '19005005', '19005006', '19005007', '18006000', '10001000', '10003000', '10004000', '10005000', '10007000', '10008000', '10009000', '18008001', '22006001', '22006000', '22011000', '22016000', '21012001', '19012001', '19012002', '19012003', '19012004', '19012005', '19012006', '19012007', '19012008', '12002001', '12002002', '12001000', '12002000', '12003000', '12005000', '12006000', '12007000', '12015000', '12018000', '12019000', '12015001', '12015002', '12015003', '12019001', '18012001', '18012002', '16001000', '12008000', '12008001', '12008002', '12008003', '12008004', '12008005', '12008006', '12008007', '12008008', '12008009', '12008010', '12008011', '19013001', '19013002', '19013003', '18018001', '18020003', '18020005', '18020006', '18020007', '18020008', '18020009', '18020010', '18020011', '18020012', '18020014', '18021000', '18021001', '18021002', '19025000', '19025001', '19025002', '19025003', '19025004', '19047000', '12004000', '12010000', '12011000', '12012000', '12013000', '12014000', '12016000', '12017000', '12012001', '12012002', '12012003', '12009000', '21009001', '14001000', '14002000', '14001001', '14001002', '14001003', '14001004', '14001005', '14001006', '14001007', '14001008', '14001009', '14001010', '14001011', '14001012', '14001013', '14001014', '14001015', '14001016', '14001017', '14002001', '14002002', '14002003', '14002004', '14002005', '14002006', '14002007', '14002008', '14002009', '14002010', '14002011', '14002012', '14002013', '14002014', '14002015', '14002016', '14002017', '14002018', '14002019', '14002020', '18013001', '18013002', '18013003', '18013004', '18013005', '18013006', '18013007', '18013008', '18013009', '18013010', '18024001', '18024002', '18024003', '18024004', '18024005', '18024006', '18024007', '18024008', '18024009', '18024010', '18024011', '18024012', '18024013', '18024014', '18024015', '18024016', '18024017', '18024018', '18024019', '18024020', '18024021', '18024022', '18024023', '18024024', '18024025', '18024026', '18024027', '15001000', '15002000', '18020004', '16003000', '22012001', '22012002', '22012003', '22012004', '22012005', '22012006', '22012000', '18037001', '18037002', '18037003', '18037004', '18037005', '18037006', '18037007', '18037008', '18037009', '18037010', '18037011', '18037012', '18037013', '18037014', '18037015', '18037016', '18037017', '18037018', '18037019', '18037020', '18040001', '18040002', '18040003', '13001001', '13001002', '13001003', '13001000', '13002000', '13003000', '13004000', '13004001', '13004002', '13004003', '13004004', '13004005', '13004006', '22003000', '22004000', '22005000', '22007000', '22008000', '22010000', '22015000', '19040001', '19040002', '19040003', '19040004', '19040005', '19040006', '19040007', '19040008', '17023001', '17023002', '17023003', '17023004', '17025001', '17025002', '17025003', '17025004', '17025005', '17027001', '17027002', '17027003', '17027000', '21009000', '18045001', '18045002', '18045003', '18045004', '18045005', '18045006', '18045007', '18045008', '18045009', '18045010', '22014000', '22018000', '18050001', '18050002', '18050003', '18050004', '18050005', '18050006', '18050007', '18050008', '18050009', '18050010', '17002000', '17003000', '17004000', '17005000', '17006000', '17007000', '17008000', '17009000', '17010000', '17011000', '17012000', '17013000', '17014000', '17015000', '17016000', '17017000', '17018000', '17019000', '17020000', '17021000', '17022000', '17023000', '17024000', '17025000', '17026000', '17028000', '17029000', '17030000', '17031000', '17032000', '17033000', '17034000', '17035000', '17036000', '17037000', '17038000', '17039000', '17040000', '17041000', '17042000', '17043000', '17044000', '17045000', '17046000', '17047000', '17048000', '12018001', '12018002', '12018003', '12018004', '16002000', '13005000', '13005001', '13005002', '13005003', '13005004', '13005005', '13005006', '13005007', '13005008', '13005009', '13005010', '13005011', '13005012', '13005013', '13005014', '13005015', '13005016', '13005017', '13005018', '13005019', '13005020', '13005021', '13005022', '13005023', '13005024', '13005025', '13005026', '13005027', '13005028', '13005029', '13005030', '13005031', '13005032', '13005033', '13005034', '13005035', '13005036', '13005037', '13005038', '13005039', '13005040', '13005041', '13005042', '13005043', '13005044', '13005045', '13005046', '13005047', '13005048', '13005049', '13005050', '13005051', '13005052', '13005053', '13005054', '13005055', '13005056', '13005057', '13005058', '13005059', '18001000', '18003000', '18004000', '18005000', '18007000', '18008000', '18009000', '18010000', '18011000', '18012000', '18013000', '18014000', '18015000', '18016000', '18017000', '18018000', '18019000', '18020000', '18022000', '18023000', '18024000', '18025000', '18026000', '18027000', '18028000', '18029000', '18030000', '18031000', '18032000', '18033000', '18034000', '18035000', '18036000', '18037000', '18038000', '18039000', '18040000', '18041000', '18042000', '18043000', '18044000', '18045000', '18046000', '18047000', '18048000', '18049000', '18050000', '18051000', '18052000', '18053000', '18054000', '18055000', '18056000', '18057000', '18058000', '18059000', '18060000', '18061000', '18062000', '18063000', '18064000', '18065000', '18066000', '18067000', '18068000', '18069000', '18070000', '18071000', '18072000', '18073000', '18074000', '19001000', '19002000', '19003000', '19004000', '19005000', '19006000', '19007000', '19008000', '19009000', '19010000', '19011000', '19012000', '19013000', '19014000', '19015000', '19016000', '19017000', '19018000', '19019000', '19020000', '19021000', '19022000', '19023000', '19024000', '19026000', '19027000', '19028000', '19029000', '19030000', '19031000', '19032000', '19033000', '19034000', '19035000', '19036000', '19037000', '19038000', '19039000', '19040000', '19041000', '19042000', '19043000', '19044000', '19045000', '19046000', '19048000', '19049000', '19050000', '19051000', '19052000', '19053000', '19054000', '18020002', '18020001', '20001000', '20002000', '10006000', '21010001', '21010002', '21010003', '21010004', '21010005', '21010006', '21010007', '21010008', '21010009', '21010010', '21010011', '21001000', '21002000', '21003000', '21004000', '21005000', '21006000', '21007000', '21008000', '21010000', '21011000', '21012000', '21013000', '18068001', '18068002', '18068003', '18068004', '18068005'
-            ]
-        
-        category_name = [
-            'Writing, Copywriting and Technical Writing', 'Search Engine Marketing and Optimization', 'Public Relations', 'Promotional Items', 'Print, TV, Radio and Outdoor Advertising', 'Online Advertising', 'Market Research and Consulting', 'Direct Mail and Email Marketing Services', 'Creative Services', 'Advertising Agencies and Media Buyers', 'Crop Production', 'Forestry', 'Livestock and Animals', 'Services', 'Airlines and Aviation Services', 'Airports', 'Theatrical Productions', 'Symphony and Opera', 'Sports Venues', 'Social Clubs', 'Psychics and Astrologers', 'Party Centers', 'Music and Show Venues', 'Museums', 'Movie Theatres', 'Fairgrounds and Rodeos', 'Entertainment', 'Dance Halls and Saloons', 'Circuses and Carnivals', 'Casinos and Gaming', 'Bowling', 'Billiards and Pool', 'Art Dealers and Galleries', 'Arcades and Amusement Parks', 'Aquarium', 'Arts and Entertainment', 'ATMs', 'ATM', 'Check', 'ATM', 'ATM', 'Parking', 'Tolls and Fees', 'Gas Stations', 'Towing', 'Motorcycle, Moped and Scooter Repair', 'Maintenance and Repair', 'Car Wash and Detail', 'Car Appraisers', 'Auto Transmission', 'Auto Tires', 'Auto Smog Check', 'Auto Oil and Lube', 'Used Car Dealers', 'Salvage Yards', 'RVs and Motor Homes', 'Motorcycles, Mopeds and Scooters', 'Classic and Antique Car', 'Car Parts and Accessories', 'Car Dealers and Leasing', 'Automotive', 'Overdraft', 'Late Payment', 'Fraud Dispute', 'Foreign Transaction', 'Insufficient Funds', 'Cash Advance', 'Excess Activity', 'Printing and Publishing', 'Ride Share', 'Car Service', 'Limos and Chauffeurs', 'Taxi', 'Check', "Women's Store", 'Swimwear', 'Shoe Store', "Men's Store", 'Lingerie Store', "Kids' Store", 'Boutique', 'Accessories Store', 'Facilities and Nursing Homes', 'Caretakers', 'Animal Shelter', 'Assisted Living Services', 'Cemetery', 'Day Care and Preschools', 'Disabled Persons Services', 'Drug and Alcohol Services', 'Organizations and Associations', 'Religious', 'Senior Citizen Services', 'Youth Organizations', 'Environmental', 'Charities and Non-Profits', 'Retirement', 'Maintenance and Repair', 'Software Development', 'Credit Card', 'Education', 'Vocational Schools', 'Tutoring and Educational Services', 'Primary and Secondary Schools', 'Fraternities and Sororities', 'Driving Schools', 'Dance Schools', 'Culinary Lessons and Schools', 'Computer Training', 'Colleges and Universities', 'Art School', 'Adult Education', 'Video Games', 'Mobile Phones', 'Cameras', 'Media', 'Stock Brokers', 'Holding and Investment Offices', 'Fund Raising', 'Financial Planning and Investments', 'Credit Reporting', 'Collections', 'Check Cashing', 'Business Brokers and Franchises', 'Banking and Finance', 'Accounting and Bookkeeping', 'Food and Beverage', 'Distribution', 'Catering', 'Food and Beverage Store', 'Specialty', 'Health Food', 'Farmers Markets', 'Beer, Wine and Spirits', 'Supermarkets and Groceries', 'Courts', 'Government Lobbyists', 'Housing Assistance and Shelters', 'Law Enforcement', 'Libraries', 'Military', 'Post Offices', 'Public and Social Services', 'Police Stations', 'Fire Stations', 'Correctional Institutions', 'Government Departments and Agencies', 'Benefits', 'Healthcare Services', 'Physicians', 'Psychologists', 'Pregnancy and Sexual Health', 'Podiatrists', 'Physical Therapy', 'Optometrists', 'Nutritionists', 'Nurses', 'Mental Health', 'Medical Supplies and Labs', 'Hospitals, Clinics and Medical Centers', 'Emergency Services', 'Dentists', 'Counseling and Therapy', 'Chiropractors', 'Blood Banks and Centers', 'Alternative Medicine', 'Acupuncture', 'Urologists', 'Respiratory', 'Radiologists', 'Psychiatrists', 'Plastic Surgeons', 'Pediatricians', 'Pathologists', 'Orthopedic Surgeons', 'Ophthalmologists', 'Oncologists', 'Obstetricians and Gynecologists', 'Neurologists', 'Internal Medicine', 'General Surgery', 'Gastroenterologists', 'Family Medicine', 'Ear, Nose and Throat', 'Dermatologists', 'Cardiologists', 'Anesthesiologists', 'Specialty', 'Roofers', 'Painting', 'Masonry', 'Infrastructure', 'Heating, Ventilating and Air Conditioning', 'Electricians', 'Contractors', 'Carpet and Flooring', 'Carpenters', 'Upholstery', 'Tree Service', 'Swimming Pool Maintenance and Services', 'Storage', 'Roofers', 'Pools and Spas', 'Plumbing', 'Pest Control', 'Painting', 'Movers', 'Mobile Homes', 'Lighting Fixtures', 'Landscaping and Gardeners', 'Kitchens', 'Interior Design', 'Housewares', 'Home Inspection Services', 'Home Appliances', 'Heating, Ventilation and Air Conditioning', 'Hardware and Services', 'Fences, Fireplaces and Garage Doors', 'Electricians', 'Doors and Windows', 'Contractors', 'Carpet and Flooring', 'Carpenters', 'Architects', 'Interest Earned', 'Interest Charged', 'Loans and Mortgages', 'Loan', 'Resorts', 'Lodges and Vacation Rentals', 'Hotels and Motels', 'Hostels', 'Cottages and Cabins', 'Bed and Breakfasts', 'Lodging', 'Apparel and Fabric Products', 'Chemicals and Gasses', 'Computers and Office Machines', 'Electrical Equipment and Components', 'Food and Beverage', 'Furniture and Fixtures', 'Glass Products', 'Industrial Machinery and Equipment', 'Leather Goods', 'Metal Products', 'Nonmetallic Mineral Products', 'Paper Products', 'Petroleum', 'Plastic Products', 'Rubber Products', 'Service Instruments', 'Textiles', 'Tobacco', 'Transportation Equipment', 'Wood Products', 'Coal', 'Metal', 'Non-Metallic Minerals', 'Wine Bar', 'Sports Bar', 'Hotel Lounge', 'Bar', 'Breweries', 'Internet Cafes', 'Nightlife', 'Strip Club', 'Night Clubs', 'Karaoke', 'Jazz and Blues Cafe', 'Hookah Lounges', 'Adult Entertainment', 'Boat', 'Bus Stations', 'Car and Truck Rentals', 'Charter Buses', 'Cruises', 'Heliports', 'Rail', "Women's Store", 'Swimwear', 'Shoe Store', "Men's Store", 'Lingerie Store', "Kids' Store", 'Boutique', 'Accessories Store', 'Monuments and Memorials', 'Historic Sites', 'Gardens', 'Buildings and Structures', 'Rivers', 'Mountains', 'Lakes', 'Forests', 'Beaches', 'Playgrounds', 'Picnic Areas', 'Natural Parks', 'Parks', 'Payroll', 'Tattooing', 'Tanning Salons', 'Spas', 'Skin Care', 'Piercing', 'Massage Clinics and Therapists', 'Manicures and Pedicures', 'Laundry and Garment Services', 'Hair Salons and Barbers', 'Hair Removal', 'Public Transportation Services', 'Transportation Centers', 'Real Estate Development and Title Companies', 'Real Estate Appraiser', 'Real Estate Agents', 'Property Management', 'Corporate Housing', 'Commercial Real Estate', 'Building and Land Surveyors', 'Boarding Houses', 'Apartments, Condos and Houses', 'Rent', 'Athletic Fields', 'Baseball', 'Basketball', 'Batting Cages', 'Boating', 'Campgrounds and RV Parks', 'Canoes and Kayaks', 'Combat Sports', 'Cycling', 'Dance', 'Equestrian', 'Football', 'Go Carts', 'Golf', 'Gun Ranges', 'Gymnastics', 'Gyms and Fitness Centers', 'Hiking', 'Hockey', 'Hot Air Balloons', 'Hunting and Fishing', 'Landmarks', 'Miniature Golf', 'Outdoors', 'Paintball', 'Personal Trainers', 'Race Tracks', 'Racquet Sports', 'Racquetball', 'Rafting', 'Recreation Centers', 'Rock Climbing', 'Running', 'Scuba Diving', 'Skating', 'Skydiving', 'Snow Sports', 'Soccer', 'Sports and Recreation Camps', 'Sports Clubs', 'Stadiums and Arenas', 'Swimming', 'Tennis', 'Water Sports', 'Yoga and Pilates', 'Zoo', 'Temple', 'Synagogues', 'Mosques', 'Churches', 'Rent', 'Restaurants', 'Winery', 'Vegan and Vegetarian', 'Turkish', 'Thai', 'Swiss', 'Sushi', 'Steakhouses', 'Spanish', 'Seafood', 'Scandinavian', 'Portuguese', 'Pizza', 'Moroccan', 'Middle Eastern', 'Mexican', 'Mediterranean', 'Latin American', 'Korean', 'Juice Bar', 'Japanese', 'Italian', 'Indonesian', 'Indian', 'Ice Cream', 'Greek', 'German', 'Gastropub', 'French', 'Food Truck', 'Fish and Chips', 'Filipino', 'Fast Food', 'Falafel', 'Ethiopian', 'Eastern European', 'Donuts', 'Distillery', 'Diners', 'Dessert', 'Delis', 'Cupcake Shop', 'Cuban', 'Coffee Shop', 'Chinese', 'Caribbean', 'Cajun', 'Cafe', 'Burrito', 'Burgers', 'Breakfast Spot', 'Brazilian', 'Barbecue', 'Bakery', 'Bagel Shop', 'Australian', 'Asian', 'American', 'African', 'Afghan', 'Advertising and Marketing', 'Art Restoration', 'Audiovisual', 'Automation and Control Systems', 'Business and Strategy Consulting', 'Business Services', 'Cable', 'Chemicals and Gasses', 'Cleaning', 'Computers', 'Construction', 'Credit Counseling and Bankruptcy Services', 'Dating and Escort', 'Employment Agencies', 'Engineering', 'Entertainment', 'Events and Event Planning', 'Financial', 'Funeral Services', 'Geological', 'Home Improvement', 'Household', 'Human Resources', 'Immigration', 'Import and Export', 'Industrial Machinery and Vehicles', 'Insurance', 'Internet Services', 'Leather', 'Legal', 'Logging and Sawmills', 'Machine Shops', 'Management', 'Manufacturing', 'Media Production', 'Metals', 'Mining', 'News Reporting', 'Oil and Gas', 'Packaging', 'Paper', 'Personal Care', 'Petroleum', 'Photography', 'Plastics', 'Rail', 'Real Estate', 'Refrigeration and Ice', 'Renewable Energy', 'Repair Services', 'Research', 'Rubber', 'Scientific', 'Security and Safety', 'Shipping and Freight', 'Software Development', 'Storage', 'Subscription', 'Tailors', 'Telecommunication Services', 'Textiles', 'Tourist Information and Services', 'Transportation', 'Travel Agents and Tour Operators', 'Utilities', 'Veterinarians', 'Water and Waste Management', 'Web Design and Development', 'Welding', 'Agriculture and Forestry', 'Art and Graphic Design', 'Adult', 'Antiques', 'Arts and Crafts', 'Auctions', 'Automotive', 'Beauty Products', 'Bicycles', 'Boat Dealers', 'Bookstores', 'Cards and Stationery', 'Children', 'Clothing and Accessories', 'Computers and Electronics', 'Construction Supplies', 'Convenience Stores', 'Costumes', 'Dance and Music', 'Department Stores', 'Digital Purchase', 'Discount Stores', 'Electrical Equipment', 'Equipment Rental', 'Flea Markets', 'Florists', 'Fuel Dealer', 'Furniture and Home Decor', 'Gift and Novelty', 'Glasses and Optometrist', 'Hardware Store', 'Hobby and Collectibles', 'Industrial Supplies', 'Jewelry and Watches', 'Luggage', 'Marine Supplies', 'Music, Video and DVD', 'Musical Instruments', 'Newsstands', 'Office Supplies', 'Outlet', 'Pawn Shops', 'Pets', 'Pharmacies', 'Photos and Frames', 'Shopping Centers and Malls', 'Sporting Goods', 'Tobacco', 'Toys', 'Vintage and Thrift', 'Warehouses and Wholesale Stores', 'Wedding and Bridal', 'Wholesale', 'Lawn and Garden', 'Student Aid and Grants', 'Taxes', 'Refund', 'Payment', 'Wire Transfer', 'Venmo', 'Square Cash', 'Square', 'PayPal', 'Dwolla', 'Coinbase', 'Chase QuickPay', 'Acorns', 'Digit', 'Betterment', 'Plaid', 'Internal Account Transfer', 'ACH', 'Billpay', 'Check', 'Credit', 'Debit', 'Deposit', 'Keep the Change Savings Program', 'Third Party', 'Wire', 'Withdrawal', 'Save As You Go', 'Water', 'Sanitary and Waste Management', 'Heating, Ventilating, and Air Conditioning', 'Gas', 'Electric'
-            ]
-
-        parent_category_name = [
-            'Advertising and Marketing', 'Advertising and Marketing', 'Advertising and Marketing', 'Advertising and Marketing', 'Advertising and Marketing', 'Advertising and Marketing', 'Advertising and Marketing', 'Advertising and Marketing', 'Advertising and Marketing', 'Advertising and Marketing', 'Agriculture and Forestry', 'Agriculture and Forestry', 'Agriculture and Forestry', 'Agriculture and Forestry', 'Air Travel', 'Air Travel', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'Arts and Entertainment', 'ATM', 'ATM', 'ATM', 'ATM', 'ATM', 'Auto Transportation', 'Auto Transportation', 'Auto Transportation', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Automotive', 'Bank Fees', 'Bank Fees', 'Bank Fees', 'Bank Fees', 'Bank Fees', 'Bank Fees', 'Bank Fees', 'Business Services', 'Car Service', 'Car Service', 'Car Service', 'Car Service', 'Check', 'Clothing and Accessories', 'Clothing and Accessories', 'Clothing and Accessories', 'Clothing and Accessories', 'Clothing and Accessories', 'Clothing and Accessories', 'Clothing and Accessories', 'Clothing and Accessories', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Community Services', 'Computers', 'Computers', 'Credit Card', 'Education', 'Education', 'Education', 'Education', 'Education', 'Education', 'Education', 'Education', 'Education', 'Education', 'Education', 'Education', 'Electronics', 'Electronics', 'Electronics', 'Entertainment', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Food Delivery Services', 'Food and Beverage Store', 'Food and Beverage Store', 'Food and Beverage Store', 'Food and Beverage Store', 'Food and Beverage Store', 'Food and Beverage Store', 'Food and Beverage Store', 'Food and Beverage Store', 'Government Departments and Agencies', 'Government Departments and Agencies', 'Government Departments and Agencies', 'Government Departments and Agencies', 'Government Departments and Agencies', 'Government Departments and Agencies', 'Government Departments and Agencies', 'Government Departments and Agencies', 'Government Departments and Agencies', 'Government Departments and Agencies', 'Government Departments and Agencies', 'Government Support', 'Government Support', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Home Improvement', 'Interest', 'Interest', 'Loans and Mortgages', 'Loans and Mortgages', 'Lodging', 'Lodging', 'Lodging', 'Lodging', 'Lodging', 'Lodging', 'Lodging', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Manufacturing', 'Mining', 'Mining', 'Mining', 'Nightlife', 'Nightlife', 'Nightlife', 'Nightlife', 'Nightlife', 'Nightlife', 'Nightlife', 'Nightlife', 'Nightlife', 'Nightlife', 'Nightlife', 'Nightlife', 'Nightlife', 'Other Travel', 'Other Travel', 'Other Travel', 'Other Travel', 'Other Travel', 'Other Travel', 'Other Travel', 'Outlet', 'Outlet', 'Outlet', 'Outlet', 'Outlet', 'Outlet', 'Outlet', 'Outlet', 'Parks', 'Parks', 'Parks', 'Parks', 'Parks', 'Parks', 'Parks', 'Parks', 'Parks', 'Parks', 'Parks', 'Parks', 'Parks', 'Payroll', 'Personal Care', 'Personal Care', 'Personal Care', 'Personal Care', 'Personal Care', 'Personal Care', 'Personal Care', 'Personal Care', 'Personal Care', 'Personal Care', 'Public Transit', 'Public Transit', 'Real Estate', 'Real Estate', 'Real Estate', 'Real Estate', 'Real Estate', 'Real Estate', 'Real Estate', 'Real Estate', 'Real Estate', 'Real Estate', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Religious', 'Religious', 'Religious', 'Religious', 'Rent', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Restaurants', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Service', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Shops', 'Student Aid and Grants', 'Taxes', 'Taxes', 'Taxes', 'Third Party', 'Third Party', 'Third Party', 'Third Party', 'Third Party', 'Third Party', 'Third Party', 'Third Party', 'Savings Apps', 'Savings Apps', 'Savings Apps', 'Third Party', 'Transfer', 'Transfer', 'Transfer', 'Transfer', 'Transfer', 'Transfer', 'Transfer', 'Transfer', 'Transfer', 'Transfer', 'Transfer', 'Transfer', 'Utilities', 'Utilities', 'Utilities', 'Utilities', 'Utilities'
-            ]
-
-        grandparent_category_name = [
-            'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Travel', 'Travel', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Transportation', 'Transportation', 'Transportation', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Auto', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Other', 'Transportation', 'Transportation', 'Transportation', 'Transportation', 'Financial', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Financial', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Shopping', 'Shopping', 'Shopping', 'Recreation', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Govt Agencies', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Healthcare', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Financial', 'Financial', 'Financial', 'Financial', 'Travel', 'Travel', 'Travel', 'Travel', 'Travel', 'Travel', 'Travel', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Travel', 'Travel', 'Travel', 'Travel', 'Travel', 'Travel', 'Travel', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Payroll', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Transportation', 'Transportation', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Recreation', 'Other', 'Other', 'Other', 'Other', 'Financial', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Food', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Other', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Shopping', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Financial', 'Transfers', 'Transfers', 'Transfers', 'Transfers', 'Transfers', 'Transfers', 'Transfers', 'Transfers', 'Transfers', 'Transfers', 'Transfers', 'Transfers', 'Utilities', 'Utilities', 'Utilities', 'Utilities', 'Utilities'
-            ]
-        
-        cache = {
-            'category_id': category_id,
-            'category_name': category_name,
-            'parent_category_name': parent_category_name,
-            'grandparent_category_name': grandparent_category_name
-        }
-        
-        df = pd.DataFrame(cache)
+        df = categories.frame()
             
         if debug is True:
             print(df)
         else:
             return df
 
-    def _fetch_transactions_dataframe(self, bank_account_id: str = None, sample_size: int = 1):
-        random_list = []
-        feature_list = []
-
-        primary_features = [
-            'bank_account_id',
-            'id', 
-            'date', 
-            'amount_cents',
-            'category_id',
-            'created_at',
-        ]
-
-        secondary_features = [
-            'plaid_transaction_id',
-            'merchant_city',
-            'merchant_state',
-            'lat', 
-            'lon',
-            'purpose'
-        ]
-
-        feature_list = primary_features + secondary_features
-
-        feature_query = ", ".join(feature_list)
-
-        if bank_account_id:
-            query_operation = f"""
-            SELECT {feature_query}
-            FROM plaid_main_transactions
-            WHERE bank_account_id = {bank_account_id}
-            """
+    def _fetch_transactions_dataframe(self, bank_account_id: str = None, sample_size: int = 1, seed: int = None,
+                                      extraction: str = 'tuple', since: tuple = None, months: tuple = None,
+                                      bank_account_ids: list = None):
+        if bank_account_id and since:
+            name, params = 'transactions_by_account_since', (bank_account_id, since[0], since[1])
+        elif bank_account_id and months:
+            name, params = 'transactions_by_account_between', (bank_account_id,) + self._month_dates(months)
+        elif bank_account_id:
+            name, params = 'transactions_by_account', (bank_account_id,)
         else:
-            while len(random_list) != sample_size:
-                random_number = random.randrange(1, 257603)
-                
-                query_operation = f"""
-                SELECT {feature_query}
-                FROM plaid_main_transactions
-                WHERE bank_account_id = {random_number}
-                """
-                
-                query_fetch = self.handle_query(query_operation, fetchone=True)
-                
-                if query_fetch is None:
-                    pass
-                else:
-                    if random_number in random_list:
-                        pass
-                    else:
-                        random_list.append(random_number)
+            if bank_account_ids is None:
+                bank_account_ids = self.sample_bank_account_ids(sample_size, table='transactions', seed=seed)
 
-            random_query = ", ".join(repr(i) for i in random_list)
+            if months:
+                name, params = 'transactions_by_accounts_between', (list(bank_account_ids),) + self._month_dates(months)
+            else:
+                name, params = 'transactions_by_accounts', (list(bank_account_ids),)
 
-            query_operation = f"""
-            SELECT {feature_query}
-            FROM plaid_main_transactions
-            WHERE bank_account_id IN ({random_query})
-            """
+        if extraction == 'copy':
+            df = self.handle_copy(name, params, dtype=TRANSACTION_DTYPES, parse_dates=TRANSACTION_DATES)
+            if df is None:
+                df = pd.DataFrame(columns=TRANSACTION_FEATURES)
+            return df
 
-        query_fetch = self.handle_query(query_operation)
+        query_fetch = self.handle_statement(name, params)
 
-        df = pd.DataFrame(query_fetch, columns=feature_list)
+        df = pd.DataFrame(query_fetch, columns=TRANSACTION_FEATURES)
 
         return df
 
     def _wrangle_transactions(self, x):
-        """Wrangle incoming transaction data."""
-        # Prevent SettingWithCopyWarning
-        X = x.copy()
-
-        # remove empty or 'None' values
-        X.replace('', np.nan, inplace=True)
-        X = X.fillna(value=np.nan)
-
-        # test datetime features
-        datetime_features = ['date', 'created_at']
-
-        for i in datetime_features:
-            X[i] = pd.to_datetime(X[i],
-                                format="%m/%d/%Y, %H:%M:%S",
-                                errors='raise') 
+        """Wrangle incoming transaction data.
 
+        Rows to keep are selected up front and every output column is built
+        once from its input column, so no intermediate full-size frame is
+        allocated and `x` is left unchanged.
+        """
         # remove duplicate entries !WARNING (may affect resulting table)
-        X = X.drop_duplicates(subset='plaid_transaction_id').reset_index(drop=True)
-        
-        X.rename(columns={'amount_cents':'amount'}, inplace=True)
-        X['amount'] = (X['amount'] / 100).round(2)
-        
-        # insert category data
-        df = self._handle_category_features()
-        
-        X = pd.merge(X, df, on='category_id')
+        keep = ~self._handle_missing_values(x['plaid_transaction_id']).duplicated().to_numpy()
+
+        # drop transactions of unknown categories
+        positions = categories.positions(x['category_id'])
+        keep &= positions >= 0
+
+        rows = None
+        if not keep.all():
+            rows = np.flatnonzero(keep)
+            positions = positions[rows]
+
+        data = {}
+        for column in x.columns:
+            values = x[column]
+
+            if TRANSACTION_SCHEMA.get(column) == 'category':
+                # categorize before selecting rows, so only the codes are copied
+                values = self._handle_missing_values(values, categorical=True)
+            if rows is not None and column != 'category_id':
+                values = values.take(rows)
+
+            if column in TRANSACTION_DATES:
+                if not pd.api.types.is_datetime64_dtype(values):
+                    values = pd.to_datetime(values, format="%m/%d/%Y, %H:%M:%S", errors='raise')
+            elif column == 'amount_cents':
+                # float first, so NULL amounts of either extraction path become NaN
+                column, values = 'amount', (values.astype('float64') / 100).round(2)
+            elif column == 'category_id':
+                # parsed once by the category lookup
+                values = categories.ids(positions)
+            elif TRANSACTION_SCHEMA.get(column) != 'category':
+                # remove empty or 'None' values
+                values = self._handle_missing_values(values)
+
+            if isinstance(values, pd.Series):
+                # nullable integers of the COPY path stay extension arrays until compacted
+                values = values.array if pd.api.types.is_extension_array_dtype(values.dtype) else np.asarray(values)
+            data[column] = values
 
-        return X
-
-    def _fetch_accounts_dataframe(self, bank_account_id: str = None, sample_size: int = 1):
-        random_list = []
-        feature_list = []
-        
-        primary_features = [
-            'id',
-            'current_balance_cents',
-            'created_at',
-            'updated_at',
-            'name',
-            'account_type',
-            'available_balance_cents',
-            'last_balance_update_at',
-            'plaid_state',
-            'initial_balance_cents',
-            'main_saving'
-        ]
+        # insert category data
+        for level in CATEGORY_LEVELS:
+            data[level] = categories.take(positions, level)
 
-        secondary_features = [
-            'account_subtype'
-        ]
-        
-        feature_list = primary_features + secondary_features
+        return compact_transactions(pd.DataFrame(data, copy=False))
 
-        feature_query = ", ".join(feature_list)
+    def _handle_missing_values(self, values, categorical: bool = False):
+        """Treat empty strings and None in object `values` as missing values.
 
+        Args:
+            values (pd.Series): column of raw transaction data.
+            categorical (bool): return a Categorical without an empty string category.
+        """
+        if categorical:
+            values = pd.Categorical(values)
+            if '' in values.categories:
+                values = values.remove_categories([''])
+            return values
+
+        if values.dtype != object:
+            return values
+        missing = values.isna().to_numpy() | (values == '').to_numpy()
+        if not missing.any():
+            return values
+        return values.mask(missing, np.nan)
+
+    def _fetch_accounts_dataframe(self, bank_account_id: str = None, sample_size: int = 1, seed: int = None):
         if bank_account_id:
-            query_operation = f"""
-            SELECT {feature_query}
-            FROM bank_accounts
-            WHERE id = {bank_account_id}
-            """
+            query_fetch = self.handle_statement('account_by_id', (bank_account_id,))
         else:
-            for _ in range(sample_size):
-                random_list.append(random.randrange(1, 257603))
+            random_list = self.sample_bank_account_ids(sample_size, table='accounts', seed=seed)
 
-            random_query = ", ".join(repr(i) for i in random_list)
+            query_fetch = self.handle_statement('accounts_by_ids', (random_list,))
 
-            query_operation = f"""
-            SELECT {feature_query}
-            FROM bank_accounts
-            WHERE id IN ({random_query})
-            """
-
-        query_fetch = self.handle_query(query_operation)
-
-        df = pd.DataFrame(query_fetch, columns=feature_list)
+        df = pd.DataFrame(query_fetch, columns=ACCOUNT_FEATURES)
 
         return df
     
@@ -309,25 +797,9 @@ class SaverlifeUtility(object):
         return X
 
     def _fetch_requests_dataframe(self):
-        feature_list = []
-        
-        primary_features = [
-            'description',
-            'state'
-        ]
-        
-        feature_list = primary_features
-        
-        feature_query = ", ".join(primary_features)
-
-        query_operation = f"""
-        SELECT {feature_query}
-        FROM emergency_fund_requests
-        """
+        query_fetch = self.handle_statement('emergency_fund_requests')
 
-        query_fetch = self.handle_query(query_operation)
-
-        df = pd.DataFrame(query_fetch, columns=feature_list)
+        df = pd.DataFrame(query_fetch, columns=REQUEST_FEATURES)
 
         return df
     
@@ -344,27 +816,106 @@ class Visualize():
     Visualize different aspects of user data 
     for SaverLife C Lambda School Labs project
     """
-    def __init__(self, user_id: str):
+    # snapshot columns used by the charts and forecasts
+    snapshot_columns = [
+        'bank_account_id',
+        'id',
+        'date',
+        'amount',
+        'category_id',
+        'lat',
+        'lon',
+        'category_name',
+        'parent_category_name',
+        'grandparent_category_name'
+    ]
+
+    def __init__(self, user_id: str, source: str = None, refresh: bool = False,
+                 start_month: str = None, end_month: str = None, transactions=None):
+        """
+        Args:
+            refresh (bool): refresh cached transactions and cube cells of the
+                user even if they have not expired.
+            start_month (str): first month to load, 'YYYY-MM'. No lower bound if None.
+            end_month (str): last month to load, 'YYYY-MM'. No upper bound if None.
+            transactions (pd.DataFrame): wrangled transactions of the user, fetched
+                beforehand, e.g. by `SaverlifeUtility.transactions_by_accounts`.
+                Charts are then built from them without database access.
+        """
         self.user_id = user_id
-        self.user_transactions_df = self.handle_user_transaction_data()
-        self.transaction_time_series_df = self.handle_transaction_timeseries_data()
+        self.source = source
+        self.refresh = refresh
+        self.start_month = start_month
+        self.end_month = end_month
+        self.transactions = transactions
+
+    @cached_property
+    def user_transactions_df(self):
+        """Wrangled transactions of the user, fetched on first use."""
+        if self.transactions is not None:
+            return self.transactions
+        return self.handle_user_transaction_data()
+
+    @cached_property
+    def transaction_time_series_df(self):
+        """Transactions newest first with a formatted_date column, built on first use."""
+        return self.handle_transaction_timeseries_data()
+
+    @property
+    def transactions_time_series_df(self):
+        return self.transaction_time_series_df
+
+    @cached_property
+    def transaction_amounts_df(self):
+        """Date, category names and whole-dollar amounts, shared by every resample."""
+        df = self.user_transactions_df[["date", "category_name", "parent_category_name", "amount"]]
+        return df.assign(amount=df["amount"].astype(int)).set_index("date")
+
+    @cached_property
+    def monthly_aggregates_df(self):
+        """Monthly aggregate cube cells of the user within the requested months, see `app.api.cube`."""
+        if SaverlifeUtility.transaction_source(self.source) == 'snapshot' or self.transactions is not None:
+            return aggregate(self.user_transactions_df)
+        cells = SaverlifeUtility.monthly_aggregates(self.user_id, refresh=self.refresh)
+        return window(cells, self.start_month, self.end_month)
+
+    @cached_property
+    def monthly_category_sums(self):
+        """Monthly sum of amounts per category_name, rolled up from the aggregate cube."""
+        return rollup(self.monthly_aggregates_df, "category_name")[["category_name", "date", "amount"]]
+
+    @cached_property
+    def monthly_parent_category_sums(self):
+        """Monthly sum of amounts per parent_category_name, rolled up from the aggregate cube."""
+        return rollup(self.monthly_aggregates_df, "parent_category_name")[["parent_category_name", "date", "amount"]]
+
+    def is_empty(self, dataset: str = "user_transactions_df"):
+        """Load `dataset` if needed and return True if it has no rows.
+
+        Lets the routes load data on the I/O executor and reject unknown users early.
+        """
+        return len(getattr(self, dataset)) == 0
 
     def handle_user_transaction_data(self):
         """
         Helper method to filter user data from SaverLife DB 
         """
-        df = SaverlifeUtility._generate_dataframe(bank_account_id=self.user_id, table='transactions')
+        df = SaverlifeUtility._generate_dataframe(bank_account_id=self.user_id, table='transactions',
+                                                  source=self.source, columns=self.snapshot_columns,
+                                                  refresh=self.refresh, months=(self.start_month, self.end_month))
         return df
 
     def handle_transaction_timeseries_data(self):
         """
         Helper method to clean transaction time series data
         """
-        self.transactions_time_series_df = self.user_transactions_df.sort_values("date")
-        self.transactions_time_series_df["amount"] = self.transactions_time_series_df["amount"].astype(int)
-        self.transactions_time_series_df["formatted_date"] = self.transactions_time_series_df.date.dt.strftime('%Y-%m-%d')
-        self.transactions_time_series_df.sort_values("formatted_date", ascending=False, inplace=True)
-        return self.transactions_time_series_df
+        # one stable sort, newest first; ties keep their original order
+        df = self.user_transactions_df.sort_values("date", ascending=False, kind="mergesort")
+        df["amount"] = df["amount"].astype(int)
+        # format each distinct day once; missing dates have code -1
+        codes, days = pd.factorize(df["date"].to_numpy().astype("datetime64[D]"))
+        df["formatted_date"] = pd.Categorical.from_codes(codes, categories=np.datetime_as_string(days, unit="D"))
+        return df
 
     def handle_resampling_transaction_timeseries_df(self, offset_string):
         """
@@ -375,15 +926,12 @@ class Visualize():
                 See https://pandas.pydata.org/pandas-docs/stable/user_guide/timeseries.html#dateoffset-objects 
                 for more on dateoffset strings
         Returns:
-            resampled_transaction_timeseries
+            resampled_transaction_timeseries: category_name, date and amount
         Usage:
         # Resample to weekly sum
         >>> resampled_data = self.handle_resampling_transaction_timeseries_df(offset_string="W")
         """
-        self.resampled_transaction_timeseries = self.transactions_time_series_df.copy()
-        self.resampled_transaction_timeseries["date"] = pd.to_datetime(self.resampled_transaction_timeseries["date"])
-        self.resampled_transaction_timeseries.set_index("date", inplace=True)
-        return self.resampled_transaction_timeseries.groupby("category_name").resample(offset_string).sum().reset_index()
+        return self.transaction_amounts_df.groupby("category_name", observed=True)["amount"].resample(offset_string).sum().reset_index()
     
     def handle_resampling_transaction_timeseries_df_parent_categories(self, offset_string):
             """
@@ -394,15 +942,12 @@ class Visualize():
                     See https://pandas.pydata.org/pandas-docs/stable/user_guide/timeseries.html#dateoffset-objects 
                     for more on dateoffset strings
             Returns:
-                resampled_transaction_timeseries
+                resampled_transaction_timeseries: parent_category_name, date and amount
             Usage:
             # Resample to weekly sum
             >>> resampled_data = self.handle_resampling_transaction_timeseries_df(offset_string="W")
             """
-            self.resampled_transaction_timeseries = self.transactions_time_series_df.copy()
-            self.resampled_transaction_timeseries["date"] = pd.to_datetime(self.resampled_transaction_timeseries["date"])
-            self.resampled_transaction_timeseries.set_index("date", inplace=True)
-            return self.resampled_transaction_timeseries.groupby("parent_category_name").resample(offset_string).sum().reset_index()[["parent_category_name","date","amount"]]
+            return self.transaction_amounts_df.groupby("parent_category_name", observed=True)["amount"].resample(offset_string).sum().reset_index()
 
     def return_all_transactions_for_user(self):
         """
@@ -414,23 +959,8 @@ class Visualize():
         # Plotly table of all transactions for a single user
         >>> visualize.return_all_transactions_for_user()
         """
-        fig = go.Figure(data=[go.Table(header=dict(values=["Date", 
-                                                           "Amount", 
-                                                           "Category",
-                                                           "Parent Category",
-                                                           "Grandparent Category"],
-                                                   fill_color='lightgray',
-                                                   align='left'),
-                                       cells=dict(values=[self.transaction_time_series_df.formatted_date, 
-                                                          self.transaction_time_series_df.amount, 
-                                                          self.transaction_time_series_df.category_name,
-                                                          self.transaction_time_series_df.parent_category_name,
-                                                          self.transaction_time_series_df.grandparent_category_name],
-                                                  fill_color='whitesmoke',
-                                                  align='left'))])
-        fig.update_layout(title_text="Transactions: User {}".format(self.user_id),
-                          title_font_size=30)
-        return fig.to_json()
+        return transactions_table_figure(self.transaction_time_series_df,
+                                         title="Transactions: User {}".format(self.user_id))
 
     def categorized_bar_chart_per_month(self):
         """
@@ -442,56 +972,7 @@ class Visualize():
         # Plotly bar chart of monthly sum transactions
         >>> visualize.categorized_bar_chart_per_month()
         """
-        def helper_function_for_trace_visibility(len_array, i):
-            intermediate_array = [False] * len_array
-            intermediate_array[i] = True
-            return intermediate_array
-        self.monthly_sum_transactions_time_series_df = self.handle_resampling_transaction_timeseries_df("M").sort_values("date")
-        self.monthly_sum_transactions_time_series_df.drop(columns=["bank_account_id","id","lat","lon"], inplace=True)
-        self.monthly_sum_transactions_time_series_df = self.monthly_sum_transactions_time_series_df.loc[self.monthly_sum_transactions_time_series_df['amount'] != 0]
-        months_of_interest = self.monthly_sum_transactions_time_series_df.date.dt.strftime('%Y-%m').unique().tolist()
-        
-        self.monthly_sum_transactions_time_series_df['label'] = self.monthly_sum_transactions_time_series_df['amount'].apply(lambda x: 'outflow' if x >= 0 else 'inflow')
-        self.monthly_sum_transactions_time_series_df = self.monthly_sum_transactions_time_series_df.sort_values(['amount'], ascending=True)
-        colorsIdx = {'inflow': '#C01089', 'outflow': '#4066B0'}
-        
-        length_of_interest = len(months_of_interest)
-        list_of_monthly_dfs = []
-        for month in months_of_interest:
-            list_of_monthly_dfs.append(self.monthly_sum_transactions_time_series_df[self.monthly_sum_transactions_time_series_df.date.dt.strftime('%Y-%m') == month])
-
-        fig = go.Figure()
-
-        for i in range(len(list_of_monthly_dfs)-1):
-            cols = list_of_monthly_dfs[i]['label'].map(colorsIdx)
-            fig.add_trace(go.Bar(y=list(list_of_monthly_dfs[i].category_name), 
-                                 x=list(list_of_monthly_dfs[i].amount), 
-                                 name=str(list_of_monthly_dfs[i].date.dt.strftime('%Y-%m').iloc[0]), 
-                                 visible=False, 
-                                 orientation='h',
-                                 marker=dict(color=cols)))
-        cols = list_of_monthly_dfs[-1]['label'].map(colorsIdx)
-        fig.add_trace(go.Bar(y=list(list_of_monthly_dfs[-1].category_name), 
-                             x=list(list_of_monthly_dfs[-1].amount), 
-                             name=str(list_of_monthly_dfs[-1].date.dt.strftime('%Y-%m').iloc[0]), 
-                             visible=True, 
-                             orientation='h',
-                             marker=dict(color=cols)))
-
-        fig.update_layout(
-            font_family='Arial',
-            template='simple_white',
-            height=800)
-        
-        fig.update_layout(
-            updatemenus=[
-                dict(active=length_of_interest-1, buttons=list([
-                        dict(label=months_of_interest[i],
-                             method="update",
-                             args=[{"visible": helper_function_for_trace_visibility(length_of_interest, i)},
-                                   {"annotations": []}]) for i in range(length_of_interest)]))])
-
-        return fig.to_json()
+        return monthly_bar_figure(self.monthly_category_sums, name_column="category_name")
     
     def next_month_forecast(self, model="kNeighbors"):
         """
@@ -510,32 +991,108 @@ class Visualize():
         # Forecast transactiosn for next month
         >>> visualize.next_month_forecast()
         """
+        forecasts = self.horizon_forecast(model=model, horizon=1)
+        self.forecasting_results = {parent_cat: y_pred[0] for parent_cat, y_pred in forecasts.items()}
+        return self.forecasting_results
+
+    def horizon_forecast(self, model="kNeighbors", horizon=1):
+        """
+        Forecast the next `horizon` months of transactions based on historical transactions
+        Only the requested months are predicted, so the cost does not grow
+        with the length of the history.
+        Caveats:
+            Only forecasts for parent_categories for which 
+            there are at least 12 months of observations available
+        Returns:
+            Dictionary of forecasts, with parent_category_name 
+            as key and an array of `horizon` forecasted amounts as value
+        
+        Usage:
+            # Instantiate the class
+        >>> visualize = Visualize(user_id=45153)
+    
+        # Forecast transactions for the next three months
+        >>> visualize.horizon_forecast(horizon=3)
+        """
+        # Fit and forecast the horizon per parent category, in parallel on the forecast pool
+        return forecast_pool.forecast(self.forecast_series(), model=model, horizon=horizon)
+
+    def forecast_series(self):
+        """
+        Monthly totals of each parent category with more than 12 months of data,
+        the training data of the forecasts
+        Returns:
+            Dictionary with parent_category_name as key and the monthly
+            amounts, oldest first, as value
+        """
         # Resample to monthly sum per parent_category_name
-        self.monthly_parent_category_total = self.handle_resampling_transaction_timeseries_df_parent_categories("M")
+        self.monthly_parent_category_total = self.monthly_parent_category_sums
         # Filter for parent_categories with at least 12 months of data
         self.df12 = self.monthly_parent_category_total[self.monthly_parent_category_total['parent_category_name'].map(self.monthly_parent_category_total['parent_category_name'].value_counts()) > 12]
-        # Container to store forecasting results
-        self.forecasting_results = {}
-        # Loop through each parent category and forecast month ahead with Naive Baseline
-        for parent_cat in self.df12.parent_category_name.unique().tolist():
-            # Select relevant transaction data for training the model
-            y = self.df12[self.df12.parent_category_name == parent_cat]["amount"]
-            # Set forecasting horizon
-            fh = np.arange(len(y)) + 1 
-            # Initialize a forecaster, seasonal periodicity of 12 (months per year)   
-            if model == "Naive":
-                forecaster = NaiveForecaster(strategy="seasonal_last", sp=12)
-            else:
-                regressor = KNeighborsRegressor(n_neighbors=1)
-                forecaster = ReducedRegressionForecaster(regressor=regressor, window_length=12, strategy="recursive")        
-            # Fit forecaster to training data
-            forecaster.fit(y)
-            # Forecast prediction to match size of forecasting horizon
-            y_pred = forecaster.predict(fh)
-            # Store results in a dictionary
-            self.forecasting_results[parent_cat] = y_pred.values[0]
-        # Return the results for use in other parts of app
-        return self.forecasting_results
+        # Select relevant transaction data of each parent category for training the model
+        return {
+            parent_cat: self.df12[self.df12.parent_category_name == parent_cat]["amount"]
+            for parent_cat in self.df12.parent_category_name.unique().tolist()
+        }
+
+
+# dataset each graph type is drawn from, loaded on the I/O executor
+GRAPH_DATASETS = {
+    'TransactionTable': 'user_transactions_df',
+    'CategoryBarMonth': 'monthly_aggregates_df'
+}
+
+
+# returned instead of a figure when the user has no data
+def render_error(e: Exception):
+    """Return the `details` of a graph that failed to render."""
+    return {
+        'details': [
+            {
+                'loc': [
+                    'internal',
+                    'render'
+                ],
+                'msg': f"{type(e).__name__}: {e}",
+                'type': 'internal'
+            }
+        ]
+    }
+
+
+EMPTY_DATAFRAME_ERROR = {
+    'details': [
+        {
+            'loc': [
+                'internal',
+                'dataframe'
+            ],
+            'msg': 'dataframe size 0, possible invalid user_id',
+            'type': 'internal'
+        }
+    ]
+}
+
+
+@router.get('/dev/stats', tags=['Stats'])
+async def return_stats():
+    """
+    Returns runtime statistics of the data access layer.
+    """
+    return {
+        'pool': SaverlifeUtility.pool_statistics(),
+        'statements': SaverlifeUtility.statement_statistics(),
+        'transaction_cache': SaverlifeUtility.cache_statistics(),
+        'cube': SaverlifeUtility.cube_statistics(),
+        'figure_cache': figure_cache.statistics(),
+        'forecast_pool': forecast_pool.statistics(),
+        'forecast_cache': forecast_cache.statistics(),
+        'forecast_table': forecast_table.statistics(),
+        'executors': {
+            'io': io_executor.statistics(),
+            'cpu': cpu_executor.statistics()
+        }
+    }
 
 
 @router.post('/dev/requesttesting', tags=["Graph"])
@@ -561,27 +1118,46 @@ async def read_user(payload: GraphRequest):
 
 
 @router.post('/dev/requestvisual', tags=["Graph"])
-async def read_user(payload: GraphRequest):
+async def read_user(payload: GraphRequest, legacy: bool = False, if_none_match: Optional[str] = Header(None)):
     """
     Returns a visual table or graph according to input parameters.
+
+    The Plotly figure is the JSON response body. With `legacy=true` the
+    figure is returned as a JSON-encoded string, as in earlier versions.
+
+    Rendered figures are cached under the request and the version of the
+    user's transactions, until rows are added to or deleted from them; rows
+    edited in place show once the figure expires after
+    SAVERLIFE_FIGURE_CACHE_TTL seconds. Responses carry an ETag hashed from
+    the figure; a request whose If-None-Match holds the ETag of the cached
+    figure gets an empty 304 response.
+
+    `start_month` and `end_month` ('YYYY-MM') limit the figure to the
+    transactions of those months; only those are fetched.
     """
-    SaverlifeVisual = Visualize(user_id=payload.user_id)
+    version = await io_executor.run(SaverlifeUtility.data_version, payload.user_id)
+    if version is not None:
+        key = figure_cache.key(payload.user_id, payload.graph_type, payload.start_month,
+                               payload.end_month, legacy, version)
+        cached = figure_cache.get(key)
+        if cached is not None:
+            content, etag = cached
+            if etag_matches(if_none_match, etag):
+                figure_cache.record_not_modified()
+                return Response(status_code=304, headers={'ETag': etag})
+            return json_response(content, headers={'ETag': etag})
+
+    start_month, end_month = payload.month_range()
+
+    # the version changed or the figure was evicted; catch up on new transactions
+    # incrementally, or fetch the user in full again if rows were deleted
+    SaverlifeVisual = Visualize(user_id=payload.user_id, refresh=version is not None,
+                                start_month=start_month, end_month=end_month)
     
-    if SaverlifeVisual.user_transactions_df.size > 0:
+    if not await io_executor.run(SaverlifeVisual.is_empty, GRAPH_DATASETS[payload.graph_type]):
         pass
     else: 
-        return {
-            'details': [
-                {
-                    'loc': [
-                        'internal',
-                        'dataframe'
-                    ],
-                    'msg': 'dataframe size 0, possible invalid user_id',
-                    'type': 'internal'
-                }
-            ]
-        }
+        return EMPTY_DATAFRAME_ERROR
     
     def _parse_graph(graph_type=payload.graph_type):
         if graph_type == 'TransactionTable':
@@ -589,26 +1165,136 @@ async def read_user(payload: GraphRequest):
         if graph_type == 'CategoryBarMonth':
             fig = SaverlifeVisual.categorized_bar_chart_per_month()
         
-        return fig
+        content = dumps(fig)
+        if legacy:
+            # the figure as a JSON string
+            content = dumps(content.decode('utf-8'))
+        return content, figure_cache.etag(content)
+
+    content, etag = await cpu_executor.run(_parse_graph)
 
-    return _parse_graph()
+    if version is None:
+        return json_response(content)
+    figure_cache.put(key, content, etag)
+    return json_response(content, headers={'ETag': etag})
+
+
+@router.post('/dev/requestvisual/batch', tags=["Graph"])
+async def read_users(payload: BatchGraphRequest):
+    """
+    Returns the requested graphs of many users as JSON lines.
+
+    Transactions of all users are fetched in one query and each user's
+    figures are rendered as a task on the CPU executor threads. Figure
+    building is mostly Python code holding the GIL, so these renders share
+    one core; the tasks let lines stream as they finish rather than adding
+    cores. Every line is one user's graph,
+    `{"user_id": ..., "graph_type": ..., "figure": {...}}`, or its `details`
+    if the user has no data or the graph failed to render; lines are
+    streamed in completion order, not request order.
+    """
+    start_month, end_month = payload.month_range()
+    frames = await io_executor.run(SaverlifeUtility.transactions_by_accounts, payload.user_ids,
+                                   months=(start_month, end_month))
+
+    def _render_user(user_id):
+        SaverlifeVisual = Visualize(user_id=user_id, start_month=start_month, end_month=end_month,
+                                    transactions=frames[user_id])
+        lines = []
+        for graph_type in payload.graph_types:
+            line = {'user_id': user_id, 'graph_type': graph_type}
+            try:
+                if SaverlifeVisual.is_empty(GRAPH_DATASETS[graph_type]):
+                    line.update(EMPTY_DATAFRAME_ERROR)
+                elif graph_type == 'TransactionTable':
+                    line['figure'] = SaverlifeVisual.return_all_transactions_for_user()
+                elif graph_type == 'CategoryBarMonth':
+                    line['figure'] = SaverlifeVisual.categorized_bar_chart_per_month()
+            except Exception as e:
+                # one failing graph must not end the stream of the others
+                traceback.print_exc()
+                line.pop('figure', None)
+                line.update(render_error(e))
+            lines.append(dumps(line) + b'\n')
+        return b''.join(lines)
+
+    async def _stream():
+        renders = [asyncio.ensure_future(cpu_executor.run(_render_user, user_id)) for user_id in frames]
+        try:
+            for render in asyncio.as_completed(renders):
+                yield await render
+        finally:
+            for render in renders:
+                render.cancel()
+
+    return StreamingResponse(_stream(), media_type='application/x-ndjson')
+
+
+@router.post('/dev/requestvisual/transactions', tags=["Graph"])
+async def read_transactions_page(payload: TransactionPageRequest):
+    """
+    Returns one page of a user's transaction table, newest first.
+
+    The response holds the table `figure` of the page and `page` with
+    `has_more` and `next_cursor`; send `next_cursor` as `cursor` to get the
+    following page. Only the page and the requested `columns` are fetched.
+    """
+    page, has_more, next_cursor = await io_executor.run(SaverlifeUtility.transactions_page, payload.user_id,
+                                                        page_size=payload.page_size, cursor=payload.cursor,
+                                                        columns=payload.columns)
+
+    if len(page) == 0 and payload.cursor is None and not has_more:
+        return EMPTY_DATAFRAME_ERROR
+
+    figure = transactions_table_figure(page, title="Transactions: User {}".format(payload.user_id),
+                                       columns=payload.columns)
+
+    return json_response({
+        'figure': figure,
+        'page': {
+            'page_size': payload.page_size,
+            'rows': len(page),
+            'has_more': has_more,
+            'next_cursor': next_cursor
+        }
+    })
 
 
 @router.get('/dev/forecast/', tags=['Forecast'])
-async def return_forecast(payload: Optional[User] = None, user_id: Optional[str] = None):
+async def return_forecast(payload: Optional[User] = None, user_id: Optional[str] = None,
+                          horizon: int = Query(1, ge=1, le=36)):
     """
     Returns a dictionary forecast.
+
+    With `horizon` above 1, each category holds a list of forecasts for
+    the next `horizon` months, next month first.
+
+    Next month's forecasts are served from the nightly forecast table
+    (`python -m app.api.forecast_table run`) while it is fresh, and
+    computed on demand otherwise.
     """
     if payload:
-        SaverlifeVisual = Visualize(user_id=payload.user_id)
+        user_id = payload.user_id
+
+    precomputed = None
+    if horizon == 1 and str(user_id).isdigit():
+        # the first lookup after a nightly run loads the whole table
+        precomputed = await io_executor.run(forecast_table.lookup, user_id)
+    if precomputed is not None:
+        forecast = {parent_cat: [amount] for parent_cat, amount in precomputed.items()}
     else:
         SaverlifeVisual = Visualize(user_id=user_id)
 
-    forecast = SaverlifeVisual.next_month_forecast()
+        await io_executor.run(SaverlifeVisual.is_empty, "monthly_aggregates_df")
+
+        try:
+            forecast = await cpu_executor.run(SaverlifeVisual.horizon_forecast, horizon=horizon)
+        except ForecastTimeout as e:
+            raise HTTPException(status_code=504, detail=str(e))
 
     cache = {}
     for key, value in forecast.items():
-        cache[str(key)] = int(value)
+        cache[str(key)] = int(value[0]) if horizon == 1 else [int(x) for x in value]
         
     if forecast:
         return cache
@@ -0,0 +1,23 @@
+import pytest
+from pydantic import ValidationError
+
+from app.api.basemodels import BatchGraphRequest, GraphRequest
+
+
+def test_month_range_of_unset_bounds_is_none():
+    request = GraphRequest(user_id='1', graph_type='TransactionTable', start_month='2020-06')
+
+    assert request.month_range() == ('2020-06', None)
+
+
+def test_months_must_be_year_and_month():
+    with pytest.raises(ValidationError):
+        GraphRequest(user_id='1', graph_type='TransactionTable', end_month='2020-13')
+
+
+def test_batch_request_validates_every_graph_type():
+    request = BatchGraphRequest(user_ids=['1', '2'], graph_types=['TransactionTable', 'CategoryBarMonth'])
+    assert request.month_range() == (None, None)
+
+    with pytest.raises(ValidationError):
+        BatchGraphRequest(user_ids=['1'], graph_types=['TransactionTable', 'Pie'])
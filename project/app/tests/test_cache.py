@@ -0,0 +1,67 @@
+import time
+
+from app.api.cache import LRUCache
+
+
+def test_hit_and_miss_counters():
+    """Count hits and misses."""
+    cache = LRUCache()
+    cache.put('a', b'1')
+
+    assert cache.get('a') == b'1'
+    assert cache.get('b') is None
+
+    stats = cache.statistics()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_evicts_least_recently_used_over_budget():
+    """Evict the least recently used entry once the byte budget is exceeded."""
+    cache = LRUCache(max_bytes=10)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    cache.get('a')
+    cache.put('c', b'1234')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1234'
+    assert cache.get('c') == b'1234'
+    assert cache.statistics()['evictions'] == 1
+    assert cache.statistics()['bytes'] == 8
+
+
+def test_expired_entries_are_misses():
+    """Treat entries older than the TTL as missing."""
+    cache = LRUCache(ttl=0.01)
+    cache.put('a', b'1')
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert cache.statistics()['expirations'] == 1
+
+
+def test_invalidate():
+    """Drop single keys and keys matching a predicate."""
+    cache = LRUCache()
+    cache.put(('1', 'x'), b'1')
+    cache.put(('1', 'y'), b'1')
+    cache.put(('2', 'x'), b'1')
+
+    cache.invalidate_matching(lambda key: key[0] == '1')
+    cache.invalidate(('2', 'x'))
+
+    assert len(cache) == 0
+    assert cache.statistics()['invalidations'] == 3
+
+
+def test_lookup_returns_stale_entries():
+    """Return entries past their TTL from lookup, flagged as not fresh."""
+    cache = LRUCache(ttl=0.01)
+    cache.put('a', b'1')
+
+    assert cache.lookup('a') == (b'1', True)
+    time.sleep(0.02)
+    assert cache.lookup('a') == (b'1', False)
+    assert cache.lookup('b') == (None, False)
+    assert cache.statistics()['stale_hits'] == 1
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from app.api.categories import CategoryLookup, categories
+
+
+FRAME = pd.DataFrame({
+    'category_id': ['20', '10', '30'],
+    'category_name': ['Coffee', 'Rent', 'Coffee'],
+    'parent_category_name': ['Food', 'Housing', 'Food'],
+    'grandparent_category_name': ['Spending', 'Bills', 'Spending'],
+})
+
+
+def test_positions_match_ids_and_flag_unknown():
+    """Map ids to lookup positions, -1 for unknown or missing ids."""
+    lookup = CategoryLookup(FRAME)
+    positions = lookup.positions(['10', '30', '99', None, 20])
+
+    assert list(positions[positions >= 0]) == [0, 2, 1]
+    assert list(positions < 0) == [False, False, True, True, False]
+
+
+def test_take_returns_categorical_names():
+    """Return the names of a level as a Categorical."""
+    lookup = CategoryLookup(FRAME)
+    names = lookup.take(lookup.positions(['30', '10']), 'parent_category_name')
+
+    assert isinstance(names, pd.Categorical)
+    assert list(names) == ['Food', 'Housing']
+
+
+def test_bundled_hierarchy_loads():
+    """Load the bundled Plaid hierarchy with unique ids."""
+    frame = categories.frame()
+
+    assert len(categories) == len(frame) > 0
+    assert frame['category_id'].is_unique
+    assert np.all(categories.positions(frame['category_id']) >= 0)
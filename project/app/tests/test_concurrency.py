@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+from app.api.concurrency import BoundedExecutor
+
+
+def test_runs_blocking_calls_concurrently():
+    """Overlap blocking calls up to max_workers without blocking the loop."""
+    executor = BoundedExecutor(name='test', max_workers=4)
+
+    async def main():
+        started = time.monotonic()
+        results = await asyncio.gather(*[executor.run(time.sleep, 0.2) for _ in range(4)])
+        return results, time.monotonic() - started
+
+    results, elapsed = asyncio.run(main())
+
+    assert results == [None] * 4
+    assert elapsed < 0.6
+    stats = executor.statistics()
+    assert stats['completed'] == 4
+    assert stats['active'] == 0
+    executor.shutdown()
@@ -0,0 +1,129 @@
+import datetime
+
+import pandas as pd
+
+from app.api.categories import categories
+from app.api.cube import MonthlyCube, aggregate, combine, month_ordinal, rollup, window
+
+
+def transactions(rows):
+    """Wrangled-shape transactions from (account, date, category id, amount) rows."""
+    df = pd.DataFrame(rows, columns=['bank_account_id', 'date', 'category_id', 'amount'])
+    df['date'] = pd.to_datetime(df['date'])
+    return df
+
+
+def some_category_ids(n):
+    return categories.frame()['category_id'].astype(int).tolist()[:n]
+
+
+def test_aggregate_sums_whole_dollars_and_cents():
+    """Sum per account, month and category, truncating each amount to whole dollars."""
+    (category,) = some_category_ids(1)
+    cells = aggregate(transactions([
+        (1, '2020-01-03', category, 10.75),
+        (1, '2020-01-20', category, 5.50),
+        (1, '2020-02-01', category, -2.25),
+    ]))
+
+    assert cells['amount'].tolist() == [15, -2]
+    assert cells['amount_cents'].tolist() == [1625, -225]
+    assert cells['count'].tolist() == [2, 1]
+
+
+def test_combine_adds_matching_cells():
+    """Add increments to existing cells of the same month and category."""
+    (category,) = some_category_ids(1)
+    first = aggregate(transactions([(1, '2020-01-03', category, 10.0)]))
+    second = aggregate(transactions([(1, '2020-01-09', category, 4.0), (1, '2020-03-01', category, 1.0)]))
+
+    cells = combine(first, second)
+
+    assert cells['amount'].tolist() == [14, 1]
+    assert cells['count'].tolist() == [2, 1]
+
+
+def test_rollup_matches_resample():
+    """Roll up to the same zero-filled monthly totals as groupby().resample('M').sum()."""
+    a, b = some_category_ids(2)
+    df = transactions([
+        (1, '2020-01-03', a, 10.0),
+        (1, '2020-04-20', a, 5.0),
+        (1, '2020-02-11', b, -3.0),
+        (1, '2020-02-15', b, -1.0),
+    ])
+    positions = categories.positions(df['category_id'])
+    df['category_name'] = categories.take(positions, 'category_name')
+
+    expected = (df.set_index('date').groupby('category_name', observed=True)['amount']
+                .resample('M').sum().reset_index())
+    result = rollup(aggregate(df), 'category_name')
+
+    expected = expected.sort_values(['category_name', 'date'], key=lambda s: s.astype(str)).reset_index(drop=True)
+    result = result.sort_values(['category_name', 'date'], key=lambda s: s.astype(str)).reset_index(drop=True)
+    assert result['category_name'].astype(str).tolist() == expected['category_name'].astype(str).tolist()
+    assert result['date'].tolist() == expected['date'].tolist()
+    assert result['amount'].tolist() == expected['amount'].astype(int).tolist()
+
+
+def test_cube_persists_cells_and_watermarks(tmp_path):
+    """Write updated accounts and read them back from a new cube."""
+    (category,) = some_category_ids(1)
+    cells = aggregate(transactions([(7, '2020-01-03', category, 10.0)]))
+    watermark = (datetime.datetime(2020, 1, 3, 12), 42)
+
+    cube = MonthlyCube(root=str(tmp_path))
+    assert cube.lookup(7) == (None, None, None, False)
+    cube.put(7, cells, watermark, 3)
+    assert cube.lookup(7)[3] is True
+    cube.save()
+
+    reloaded = MonthlyCube(root=str(tmp_path))
+    stored, stored_watermark, rows, fresh = reloaded.lookup(7)
+    assert stored.equals(cells)
+    assert stored_watermark == watermark
+    assert rows == 3
+    assert fresh is False
+    assert reloaded.watermarks() == {7: (watermark, 3)}
+
+
+def test_window_keeps_months_within_bounds():
+    """Keep cells from the start month through the end month, open bounds unbounded."""
+    cells = pd.DataFrame({'bank_account_id': 1, 'month': [month_ordinal(m) for m in ('2020-01', '2020-02', '2020-03')],
+                          'category_id': 1, 'amount': [1, 2, 3], 'amount_cents': [100, 200, 300], 'count': 1})
+
+    assert window(cells, '2020-02', '2020-02')['amount'].tolist() == [2]
+    assert window(cells, '2020-02', None)['amount'].tolist() == [2, 3]
+    assert window(cells, None, '2020-02')['amount'].tolist() == [1, 2]
+    assert window(cells) is cells
+
+
+def test_cube_bounds_updated_accounts(tmp_path):
+    """Evict the least recently updated account once over `max_entries`."""
+    (category,) = some_category_ids(1)
+    watermark = (datetime.datetime(2020, 1, 3, 12), 42)
+    cube = MonthlyCube(root=str(tmp_path), max_entries=2)
+    for account in (1, 2, 3):
+        cube.put(account, aggregate(transactions([(account, '2020-01-03', category, 10.0)])), watermark)
+
+    assert cube.lookup(1) == (None, None, None, False)
+    assert cube.lookup(3)[3] is True
+    assert cube.statistics()['pending_accounts'] == 2
+
+
+def test_cube_reloads_rewritten_files(tmp_path):
+    """Pick up a cube saved by another process on the next lookup."""
+    (category,) = some_category_ids(1)
+    watermark = (datetime.datetime(2020, 1, 3, 12), 42)
+    server = MonthlyCube(root=str(tmp_path))
+    assert server.lookup(7) == (None, None, None, False)
+
+    builder = MonthlyCube(root=str(tmp_path))
+    cells = aggregate(transactions([(7, '2020-01-03', category, 10.0)]))
+    builder.put(7, cells, watermark)
+    builder.save()
+
+    stored, stored_watermark, _, fresh = server.lookup(7)
+    assert stored.equals(cells)
+    assert stored_watermark == watermark
+    assert server.statistics()['reloads'] == 1
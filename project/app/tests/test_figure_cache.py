@@ -0,0 +1,50 @@
+from app.api.figure_cache import FigureCache, etag_matches
+
+
+def test_key_depends_on_every_part():
+    """Change the key when the request or the data version changes."""
+    cache = FigureCache()
+    key = cache.key('1', 'CategoryBarMonth', 'optional field', 'optional field', False, ('2020-01-01', 9, 3))
+
+    assert key == cache.key('1', 'CategoryBarMonth', 'optional field', 'optional field', False, ('2020-01-01', 9, 3))
+    assert key != cache.key('1', 'CategoryBarMonth', 'optional field', 'optional field', False, ('2020-01-01', 10, 4))
+    assert key != cache.key('1', 'TransactionTable', 'optional field', 'optional field', False, ('2020-01-01', 9, 3))
+
+
+def test_etag_follows_the_payload():
+    """Hash the payload, so a changed figure under the same key gets a new ETag."""
+    cache = FigureCache(ttl=0)
+    key = cache.key('1', 'CategoryBarMonth')
+    etag = cache.etag(b'{"data": [1]}')
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == cache.etag(b'{"data": [1]}')
+    assert etag != cache.etag(b'{"data": [2]}')
+
+    cache.put(key, b'{"data": [1]}', etag)
+    # an expired payload is not served, nor is its ETag answered with a 304
+    assert cache.get(key) is None
+
+
+def test_etag_matches():
+    """Match single and listed ETags, weak ETags and the wildcard."""
+    assert etag_matches('"a"', '"a"')
+    assert etag_matches('"b", W/"a"', '"a"')
+    assert etag_matches('*', '"a"')
+    assert not etag_matches('"b"', '"a"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_statistics_count_hits_and_not_modified():
+    cache = FigureCache(max_entries=1)
+    first, second = cache.key('1', 'TransactionTable'), cache.key('2', 'TransactionTable')
+    cache.put(first, b'{}', cache.etag(b'{}'))
+    cache.put(second, b'[]', cache.etag(b'[]'))
+    cache.record_not_modified()
+
+    assert cache.get(first) is None
+    assert cache.get(second) == (b'[]', cache.etag(b'[]'))
+    statistics = cache.statistics()
+    assert statistics['not_modified'] == 1
+    assert statistics['hits'] == 1
+    assert statistics['evictions'] == 1
@@ -0,0 +1,37 @@
+import json
+
+import pandas as pd
+import plotly.graph_objects as go
+
+from app.api.figures import monthly_bar_figure, template
+
+
+MONTHLY = pd.DataFrame({
+    'category_name': ['Rent', 'Coffee', 'Payroll', 'Rent', 'Coffee', 'Payroll'],
+    'date': pd.to_datetime(['2020-01-31'] * 3 + ['2020-02-29'] * 3),
+    'amount': [900, 12, -1500, 900, 0, -1500]
+})
+
+
+def test_monthly_bar_figure_matches_plotly_figure():
+    """Serialize to the same JSON as the chart built with go.Bar traces."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(y=['Payroll', 'Coffee', 'Rent'], x=[-1500, 12, 900], name='2020-01', visible=False,
+                         orientation='h', marker=dict(color=['#C01089', '#4066B0', '#4066B0'])))
+    fig.add_trace(go.Bar(y=['Payroll', 'Rent'], x=[-1500, 900], name='2020-02', visible=True,
+                         orientation='h', marker=dict(color=['#C01089', '#4066B0'])))
+    fig.update_layout(font_family='Arial', template='simple_white', height=800)
+    fig.update_layout(updatemenus=[dict(active=1, buttons=[
+        dict(label=label, method='update', args=[{'visible': visible}, {'annotations': []}])
+        for label, visible in (('2020-01', [True, False]), ('2020-02', [False, True]))
+    ])])
+
+    assert monthly_bar_figure(MONTHLY) == json.loads(fig.to_json())
+
+
+def test_template_is_a_fresh_copy():
+    """Return an independent dict on every call."""
+    first = template('simple_white')
+    first['layout'] = None
+
+    assert template('simple_white')['layout'] is not None
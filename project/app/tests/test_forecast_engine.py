@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.api.categories import categories
+from app.api.forecast_engine import forecast_batch, knn_recursive, seasonal_naive, series_matrix
+from app.api.forecasting import forecast_series
+
+try:
+    from sktime.forecasting.compose import ReducedRegressionForecaster
+except ImportError:
+    # the sktime reduction API of requirements.txt is not installed
+    ReducedRegressionForecaster = None
+
+
+def synthetic_series(n: int, seed: int = 0):
+    """Right-aligned series of 13 to 40 months with seasonality and noise."""
+    rng = np.random.RandomState(seed)
+    lengths = rng.randint(13, 41, size=n)
+    Y = np.full((n, lengths.max()), np.nan)
+    for i, length in enumerate(lengths):
+        months = np.arange(length)
+        Y[i, -length:] = np.round(100 * np.sin(2 * np.pi * months / 12) + rng.normal(0, 40, length))
+    return Y, lengths
+
+
+def test_seasonal_naive_repeats_last_season():
+    Y = np.arange(24, dtype=float)[None, :]
+
+    assert seasonal_naive(Y, np.array([24]), horizon=14).tolist() == [list(range(12, 24)) + [12, 13]]
+
+
+def test_knn_recursive_skips_padding_and_short_series():
+    """Never match windows reaching into the padding; leave series too short for a window NaN."""
+    Y, lengths = synthetic_series(2)
+    Y[1, :-12] = np.nan
+    lengths[1] = 12
+
+    forecasts = knn_recursive(Y, lengths, horizon=2)
+
+    assert not np.isnan(forecasts[0]).any()
+    assert np.isnan(forecasts[1]).all()
+    assert set(forecasts[0]) <= set(Y[0, -lengths[0] + 12:])
+
+
+def test_series_matrix_zero_fills_between_first_and_last_month():
+    category_id = categories.ids(np.array([0]))[0]
+    cells = pd.DataFrame({'bank_account_id': [7, 7], 'month': [600, 603], 'category_id': category_id,
+                          'amount': [5, 9], 'amount_cents': [500, 900], 'count': [1, 1]})
+
+    keys, Y, lengths = series_matrix(cells)
+
+    assert keys['last_month'].tolist() == [603]
+    assert lengths.tolist() == [4]
+    assert Y.tolist() == [[5.0, 0.0, 0.0, 9.0]]
+    assert forecast_batch(cells, min_months=13).empty
+
+
+@pytest.mark.skipif(ReducedRegressionForecaster is None, reason="sktime 0.4 is not installed")
+@pytest.mark.parametrize('model', ['kNeighbors', 'Naive'])
+def test_parity_with_sktime(model):
+    """Match the per-series sktime forecasts of next_month_forecast."""
+    Y, lengths = synthetic_series(25)
+
+    if model == 'Naive':
+        forecasts = seasonal_naive(Y, lengths, horizon=3)
+    else:
+        forecasts = knn_recursive(Y, lengths, horizon=3)
+
+    expected = [forecast_series(pd.Series(Y[i, -length:]), model, horizon=3) for i, length in enumerate(lengths)]
+    np.testing.assert_array_equal(forecasts, expected)
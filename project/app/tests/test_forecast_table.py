@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.api import forecast_table
+from app.api.forecast_table import ForecastTable
+from app.api.forecasting import ForecastPool
+from app.api.utils import Visualize
+
+
+def results(rows):
+    return pd.DataFrame({
+        'bank_account_id': np.array([row[0] for row in rows], dtype=np.int64),
+        'parent_category_name': [row[1] for row in rows],
+        'amount': np.array([row[2] for row in rows], dtype=np.float64)
+    })
+
+
+def test_lookup_serves_completed_run(tmp_path):
+    table = ForecastTable(root=str(tmp_path))
+    manifest = table.start('kNeighbors')
+    table.write_part(manifest, results([(7, 'Food', -20.0), (7, 'Income', 500.0)]), last_account=7, accounts=1)
+    table.write_part(manifest, results([(3, 'Food', -5.0), (9, None, np.nan)]), last_account=9, accounts=2)
+
+    # incomplete runs are never served
+    assert table.lookup(7) is None
+
+    table.complete(manifest)
+    assert table.lookup(7) == {'Food': -20.0, 'Income': 500.0}
+    assert table.lookup(3) == {'Food': -5.0}
+    assert table.lookup(9) == {}
+    assert table.lookup(4) is None
+    assert table.lookup(7, model='Naive') is None
+
+
+def test_interrupted_run_resumes(tmp_path):
+    table = ForecastTable(root=str(tmp_path))
+    manifest = table.start('kNeighbors')
+    table.write_part(manifest, results([(1, 'Food', -1.0)]), last_account=1, accounts=1)
+
+    resumed = ForecastTable(root=str(tmp_path)).start('kNeighbors')
+    assert resumed['run'] == manifest['run']
+    assert resumed['last_account'] == 1
+    assert resumed['parts'] == manifest['parts']
+
+    # another model, or a restart, starts a new run
+    assert table.start('Naive')['run'] != manifest['run']
+    assert table.start('kNeighbors', restart=True)['parts'] == []
+
+
+def test_stale_run_is_not_served(tmp_path):
+    table = ForecastTable(root=str(tmp_path), max_age=0.0)
+    manifest = table.start('kNeighbors')
+    table.write_part(manifest, results([(1, 'Food', -1.0)]), last_account=1, accounts=1)
+    table.complete(manifest)
+
+    assert table.lookup(1) is None
+    assert table.statistics()['stale'] == 1
+
+
+def test_completed_run_prunes_older_runs(tmp_path):
+    """Keep the current run, the one before it and newer runs in progress."""
+    table = ForecastTable(root=str(tmp_path))
+    runs = []
+    for _ in range(3):
+        manifest = table.start('kNeighbors', restart=True)
+        table.write_part(manifest, results([(1, 'Food', -1.0)]), last_account=1, accounts=1)
+        runs.append(manifest['run'])
+    in_progress = table.start('Naive')['run']
+
+    table.complete(manifest)
+
+    assert sorted(os.listdir(str(tmp_path))) == sorted(runs[1:] + [in_progress, 'current.json'])
+    assert table.lookup(1) == {'Food': -1.0}
+
+
+def fit_fails_on_two(y, model, horizon):
+    if y.iloc[0] == 2:
+        raise ValueError("too few observations")
+    return np.full(horizon, float(y.iloc[0]))
+
+
+class FakeUtility(object):
+    def handle_statement(self, name, params=()):
+        assert name == 'forecast_accounts'
+        return [(1,), (2,), (3,)]
+
+    def iter_transactions(self, bank_account_ids, **kwargs):
+        yield pd.DataFrame({'bank_account_id': bank_account_ids})
+
+
+def test_run_skips_series_that_fail(tmp_path, monkeypatch):
+    """Forecast the other accounts of a chunk when one of its fits fails."""
+    monkeypatch.setattr(forecast_table, 'forecast_pool', ForecastPool(max_workers=1, fit=fit_fails_on_two))
+    monkeypatch.setattr(Visualize, 'forecast_series', lambda self: {'Food': pd.Series([float(self.user_id)] * 13)})
+
+    table = ForecastTable(root=str(tmp_path))
+    manifest = forecast_table.run(table, FakeUtility(), chunk_accounts=3)
+
+    assert manifest['accounts'] == 3
+    assert table.lookup(1) == {'Food': 1.0}
+    assert table.lookup(2) == {}
+    assert table.lookup(3) == {'Food': 3.0}
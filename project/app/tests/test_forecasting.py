@@ -0,0 +1,126 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.api.forecasting import ForecastCache, ForecastPool, ForecastTimeout
+
+
+def series(n: int = 24, seed: int = 0):
+    return pd.Series(np.random.RandomState(seed).randint(-300, 300, size=n))
+
+
+# module-level fits, so worker processes can unpickle them
+def fit_total(y, model, horizon):
+    return np.full(horizon, float(np.sum(y)))
+
+
+def fit_fails(y, model, horizon):
+    raise ValueError("too few observations")
+
+
+def fit_hangs(y, model, horizon):
+    time.sleep(60)
+
+
+def fit_slow(y, model, horizon):
+    time.sleep(0.3)
+    return fit_total(y, model, horizon)
+
+
+def test_key_depends_on_content_model_and_horizon():
+    cache = ForecastCache()
+    y = series()
+
+    assert cache.key(y, 'kNeighbors', 1) == cache.key(y.reset_index(drop=True).copy(), 'kNeighbors', 1)
+    assert cache.key(y, 'kNeighbors', 1) != cache.key(series(seed=1), 'kNeighbors', 1)
+    assert cache.key(y, 'kNeighbors', 1) != cache.key(y, 'Naive', 1)
+    assert cache.key(y, 'kNeighbors', 1) != cache.key(y, 'kNeighbors', 2)
+
+
+def test_forecasts_persist_on_disk(tmp_path):
+    cache = ForecastCache(root=str(tmp_path))
+    key = cache.key(series(), 'Naive', 2)
+    cache.put(key, [1.0, 2.0])
+
+    restarted = ForecastCache(root=str(tmp_path))
+
+    assert restarted.get(key).tolist() == [1.0, 2.0]
+    assert restarted.statistics()['disk_hits'] == 1
+
+
+def test_pool_does_not_refit_cached_series():
+    pool = ForecastPool(max_workers=1, cache=ForecastCache(), fit=fit_total)
+    batch = {'Food and Drink': series(), 'Shops': series(seed=1)}
+
+    first = pool.forecast(batch, model='Naive')
+    second = pool.forecast(batch, model='Naive')
+
+    assert {name: forecasts.tolist() for name, forecasts in first.items()} == \
+        {name: forecasts.tolist() for name, forecasts in second.items()}
+    assert pool.statistics()['in_process_tasks'] == 2
+
+
+def test_pooled_batch_matches_in_process():
+    batch = {name: series(seed=seed) for seed, name in enumerate(['a', 'b', 'c', 'd'])}
+
+    pooled = ForecastPool(max_workers=2, min_tasks=2, fit=fit_total)
+    try:
+        results = pooled.forecast(batch, horizon=2)
+    finally:
+        pooled.shutdown()
+    in_process = ForecastPool(max_workers=1, fit=fit_total).forecast(batch, horizon=2)
+
+    assert list(results) == list(batch)
+    assert {name: y.tolist() for name, y in results.items()} == {name: y.tolist() for name, y in in_process.items()}
+    assert pooled.statistics()['pooled_tasks'] == 4
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_failed_fit_raises(max_workers):
+    pool = ForecastPool(max_workers=max_workers, min_tasks=2, fit=fit_fails)
+    try:
+        with pytest.raises(ValueError):
+            pool.forecast({'a': series(), 'b': series(seed=1)})
+    finally:
+        pool.shutdown()
+    assert pool.statistics()['failures'] == 1
+
+
+def test_timeout_terminates_workers():
+    pool = ForecastPool(max_workers=2, min_tasks=2, timeout=0.5, fit=fit_hangs)
+    batch = {name: series(seed=seed) for seed, name in enumerate(['a', 'b', 'c', 'd'])}
+
+    started = time.monotonic()
+    with pytest.raises(ForecastTimeout):
+        pool.forecast(batch)
+    # one deadline for the batch, not one timeout per series
+    assert time.monotonic() - started < 5
+
+    assert pool.statistics()['timeouts'] == 1
+    assert pool.statistics()['restarts'] == 1
+    assert pool.statistics()['started'] is False
+
+    # fresh workers are started, not forked, so give them time to import
+    pool.fit, pool.timeout = fit_total, 30.0
+    try:
+        assert pool.forecast(batch)['a'].tolist() == [float(series().sum())]
+    finally:
+        pool.shutdown()
+
+
+def test_in_process_batch_stops_past_its_deadline():
+    pool = ForecastPool(max_workers=1, timeout=0.5, fit=fit_slow)
+
+    with pytest.raises(ForecastTimeout):
+        pool.forecast({name: series(seed=seed) for seed, name in enumerate(['a', 'b', 'c', 'd'])})
+    assert pool.statistics()['in_process_tasks'] == 4
+    assert pool.statistics()['timeouts'] == 1
+
+
+def test_workers_are_not_forked():
+    pool = ForecastPool()
+
+    assert pool.start_method in ('forkserver', 'spawn')
+    assert pool.statistics()['start_method'] == pool.start_method
@@ -0,0 +1,35 @@
+import datetime
+
+import pytest
+
+from app.api.pagination import decode_cursor, encode_cursor, page_features
+from app.api.queries import page_statements, statements
+
+
+def test_cursor_round_trip():
+    date = datetime.datetime(2020, 9, 23, 7, 0)
+
+    assert decode_cursor(encode_cursor(date, 27579)) == (date, 27579)
+
+
+def test_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor('zz')
+
+
+def test_page_features_select_only_the_columns_sources():
+    """Always select the keys, each source feature once, and reject unknown columns."""
+    assert page_features(['amount', 'category_name', 'parent_category_name']) == \
+        ['date', 'id', 'amount_cents', 'category_id']
+
+    with pytest.raises(ValueError):
+        page_features(['lat'])
+
+
+def test_page_statements_are_shared_by_column_order():
+    """Register one pair of statements per feature set, whatever the column order."""
+    features, first, after = page_statements(['date', 'id', 'purpose', 'amount_cents'])
+
+    assert features == ['date', 'id', 'amount_cents', 'purpose']
+    assert page_statements(['date', 'id', 'amount_cents', 'purpose']) == (features, first, after)
+    assert 'LIMIT $4' in statements[after].sql
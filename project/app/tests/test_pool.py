@@ -0,0 +1,140 @@
+import threading
+import time
+
+import psycopg2.extensions
+import pytest
+
+from app.api.pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor(object):
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, query):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+def test_reuses_connections():
+    """Return the same connection on sequential checkouts."""
+    pool = ConnectionPool(connect=FakeConnection, minsize=1, maxsize=2)
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    stats = pool.statistics()
+    assert stats['opened'] == 1
+    assert stats['checkouts'] == 2
+    assert stats['in_use'] == 0
+    assert stats['idle'] == 1
+
+
+def test_checkout_timeout():
+    """Raise PoolTimeout when maxsize connections are already checked out."""
+    pool = ConnectionPool(connect=FakeConnection, minsize=0, maxsize=1)
+    conn = pool.getconn()
+
+    with pytest.raises(PoolTimeout):
+        pool.getconn(timeout=0.05)
+
+    pool.putconn(conn)
+    assert pool.statistics()['timeouts'] == 1
+
+
+def test_waiter_receives_returned_connection():
+    """Hand a returned connection to a blocked checkout."""
+    pool = ConnectionPool(connect=FakeConnection, minsize=0, maxsize=1)
+    conn = pool.getconn()
+    received = []
+
+    worker = threading.Thread(target=lambda: received.append(pool.getconn(timeout=5)))
+    worker.start()
+    pool.putconn(conn)
+    worker.join()
+
+    assert received == [conn]
+    assert pool.statistics()['waits'] == 1
+
+
+def test_dead_connection_replaced():
+    """Replace an idle connection that fails the liveness check."""
+    pool = ConnectionPool(connect=FakeConnection, minsize=0, maxsize=1, liveness_interval=0)
+    with pool.connection() as first:
+        pass
+    first.broken = True
+
+    with pool.connection() as second:
+        pass
+
+    assert second is not first
+    assert first.closed
+    assert pool.statistics()['discarded'] == 1
+
+
+class YieldingCondition(threading.Condition):
+    """Lets waiting threads take the lock right after every notify, forcing interleavings."""
+    def notify(self, n=1):
+        super().notify(n)
+        self.wait(0.1)
+
+
+def test_opened_connection_is_checked_out_atomically():
+    """Never let a waiter open another connection in the slot of one being checked out."""
+    opening, release = threading.Event(), threading.Event()
+
+    def connect():
+        opening.set()
+        release.wait(5)
+        return FakeConnection()
+
+    pool = ConnectionPool(connect=connect, minsize=0, maxsize=1)
+    pool._condition = YieldingCondition(threading.Lock())
+    timeouts = []
+
+    def wait_for_connection():
+        try:
+            pool.getconn(timeout=0.5)
+        except PoolTimeout as e:
+            timeouts.append(e)
+
+    first = threading.Thread(target=pool.getconn)
+    first.start()
+    opening.wait(5)
+    waiter = threading.Thread(target=wait_for_connection)
+    waiter.start()
+    time.sleep(0.05)
+    release.set()
+    first.join()
+    waiter.join()
+
+    assert len(timeouts) == 1
+    assert pool.statistics()['opened'] == 1
+    assert pool.statistics()['in_use'] == 1
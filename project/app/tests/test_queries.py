@@ -0,0 +1,48 @@
+from app.api.queries import QueryRegistry
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.prepared_statements = set()
+
+
+class FakeCursor(object):
+    def __init__(self, connection):
+        self.connection = connection
+        self.executed = []
+
+    def execute(self, query, params=None):
+        self.executed.append((query, params))
+
+
+def test_prepares_once_per_connection():
+    """PREPARE a statement on first use only, then EXECUTE with bound parameters."""
+    registry = QueryRegistry()
+    registry.register('by_ids', "SELECT id FROM t WHERE id = ANY($1)", types=('bigint[]',))
+    cur = FakeCursor(FakeConnection())
+
+    registry.execute(cur, 'by_ids', ([1, 2],))
+    registry.execute(cur, 'by_ids', ([3],))
+
+    assert cur.executed == [
+        ("PREPARE by_ids (bigint[]) AS SELECT id FROM t WHERE id = ANY($1)", None),
+        ("EXECUTE by_ids (%s)", ([1, 2],)),
+        ("EXECUTE by_ids (%s)", ([3],)),
+    ]
+    stats = registry.statistics()['by_ids']
+    assert stats['executions'] == 2
+    assert stats['prepares'] == 1
+
+
+def test_new_connection_is_prepared_again():
+    """PREPARE again on a connection that has not seen the statement."""
+    registry = QueryRegistry()
+    registry.register('all_rows', "SELECT id FROM t")
+
+    registry.execute(FakeCursor(FakeConnection()), 'all_rows')
+    cur = FakeCursor(FakeConnection())
+    registry.execute(cur, 'all_rows')
+
+    assert cur.executed[0] == ("PREPARE all_rows AS SELECT id FROM t", None)
+    assert cur.executed[1] == ("EXECUTE all_rows", ())
+    assert registry.statistics()['all_rows']['prepares'] == 2
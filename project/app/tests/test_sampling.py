@@ -0,0 +1,45 @@
+from app.api.sampling import AccountSampler
+
+
+def test_sample_is_distinct_and_from_index():
+    """Return distinct ids drawn from the index."""
+    sampler = AccountSampler(load_index=lambda: range(0, 1000, 7))
+
+    sample = sampler.sample(50)
+
+    assert len(set(sample)) == 50
+    assert all(i % 7 == 0 for i in sample)
+
+
+def test_seeded_sample_is_reproducible():
+    """Return the same sample for the same seed."""
+    sampler = AccountSampler(load_index=lambda: [9, 3, 27, 81, 1, 243])
+
+    assert sampler.sample(3, seed=7) == sampler.sample(3, seed=7)
+
+
+def test_index_loaded_once_and_sample_capped():
+    """Load the index once and cap the sample at its size."""
+    calls = []
+
+    def load_index():
+        calls.append(1)
+        return [1, 2, 3]
+
+    sampler = AccountSampler(load_index=load_index)
+
+    assert sorted(sampler.sample(10)) == [1, 2, 3]
+    sampler.sample(2)
+    assert len(calls) == 1
+
+
+def test_failed_or_empty_index_is_not_kept():
+    """Reload the index on the next sample after a failed or empty load."""
+    loads = [None, [], [4, 5]]
+
+    sampler = AccountSampler(load_index=lambda: loads.pop(0))
+
+    assert sampler.sample(2) == []
+    assert sampler.sample(2) == []
+    assert sorted(sampler.sample(2)) == [4, 5]
+    assert loads == []
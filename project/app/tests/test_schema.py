@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from app.api.schema import compact_transactions, concat_transactions
+
+
+def frame(ids, cities):
+    return pd.DataFrame({
+        'bank_account_id': ids,
+        'category_id': ['21002002'] * len(ids),
+        'merchant_city': cities,
+        'lat': [40.5, None][:len(ids)],
+    })
+
+
+def test_compact_transactions_applies_schema():
+    """Downcast ids, categorize strings and keep missing coordinates as NaN."""
+    df = compact_transactions(frame([45153, 45154], ['Houston', None]))
+
+    assert df['bank_account_id'].dtype == np.int32
+    assert df['category_id'].dtype == np.int32
+    assert isinstance(df['merchant_city'].dtype, pd.CategoricalDtype)
+    assert df['lat'].dtype == np.float32
+    assert df['lat'].isna().tolist() == [False, True]
+
+
+def test_compact_transactions_keeps_wide_ids():
+    """Keep int64 where an id does not fit the schema width."""
+    df = compact_transactions(frame([2**40], ['Houston']))
+
+    assert df['bank_account_id'].dtype == np.int64
+    assert df['bank_account_id'].iloc[0] == 2**40
+
+
+def test_concat_transactions_keeps_categoricals():
+    """Union categories instead of falling back to object."""
+    df = concat_transactions([
+        compact_transactions(frame([1], ['Houston'])),
+        compact_transactions(frame([2], ['Miami'])),
+    ])
+
+    assert isinstance(df['merchant_city'].dtype, pd.CategoricalDtype)
+    assert df['merchant_city'].tolist() == ['Houston', 'Miami']
+    assert df['bank_account_id'].tolist() == [1, 2]
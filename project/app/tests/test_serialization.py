@@ -0,0 +1,37 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from app.api import serialization
+from app.api.serialization import dumps, json_response
+
+
+VALUE = {
+    'ints': np.arange(3),
+    'floats': np.array([1.5, np.nan]),
+    'names': pd.Series(['Rent', 'Coffee'], dtype='category').to_numpy(),
+    'series': pd.Series([4, 5]),
+    'scalar': np.int64(7),
+}
+EXPECTED = {'ints': [0, 1, 2], 'floats': [1.5, None], 'names': ['Rent', 'Coffee'], 'series': [4, 5], 'scalar': 7}
+
+
+def test_dumps_serializes_numpy_and_pandas_values():
+    """Write arrays, object arrays, Series and NumPy scalars; NaN as null."""
+    assert json.loads(dumps(VALUE)) == EXPECTED
+
+
+def test_dumps_without_orjson(monkeypatch):
+    """Fall back to the standard library encoder."""
+    monkeypatch.setattr(serialization, 'orjson', None)
+
+    assert json.loads(dumps(VALUE)) == EXPECTED
+
+
+def test_json_response_passes_bytes_through():
+    """Send pre-serialized bytes unchanged as application/json."""
+    response = json_response(b'{"a":1}')
+
+    assert response.body == b'{"a":1}'
+    assert response.media_type == 'application/json'
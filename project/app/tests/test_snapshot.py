@@ -0,0 +1,83 @@
+import datetime
+
+import pandas as pd
+
+from app.api.snapshot import SnapshotStore, stale_partitions
+
+
+def transactions(rows):
+    """Wrangled-shape transactions from (account, plaid_transaction_id, amount) rows."""
+    df = pd.DataFrame(rows, columns=['bank_account_id', 'plaid_transaction_id', 'amount'])
+    df['date'] = datetime.datetime(2020, 1, 3)
+    return df
+
+
+class FakeUtility(object):
+    """Answers `transaction_partition_watermarks` with fixed (partition, max created_at, rows) rows."""
+    def __init__(self, watermarks):
+        self.watermarks = watermarks
+
+    def handle_statement(self, name, params=()):
+        assert name == 'transaction_partition_watermarks'
+        return self.watermarks
+
+
+def test_read_slices_one_account_from_sorted_partition(tmp_path):
+    """Sort a partition by account on write and read back only the requested account."""
+    store = SnapshotStore(str(tmp_path))
+    df = transactions([(3, 'a', 1.0), (1, 'b', 2.0), (3, 'c', 3.0), (2, 'd', 4.0), (1, 'e', 5.0)])
+    entry = store.write_partition(0, 10, df, watermark={'max_created_at': '2020-01-03 00:00:00', 'rows': 5})
+    assert entry['rows'] == 5
+    store.commit(10, {0: entry})
+
+    assert store.read(1)['plaid_transaction_id'].tolist() == ['b', 'e']
+    assert store.read(3, columns=['amount']).to_dict('list') == {'amount': [1.0, 3.0]}
+    assert store.read(4).empty
+    assert store.read(25).empty
+    assert store.read()['bank_account_id'].tolist() == [1, 1, 2, 3, 3]
+
+
+def test_commit_merges_or_replaces_partitions(tmp_path):
+    """Keep earlier partitions of the same size unless replacing them."""
+    store = SnapshotStore(str(tmp_path))
+    first = store.write_partition(0, 10, transactions([(1, 'a', 1.0)]))
+    second = store.write_partition(1, 10, transactions([(12, 'b', 2.0)]))
+
+    store.commit(10, {0: first})
+    store.commit(10, {1: second})
+    assert sorted(store.manifest['partitions']) == ['0', '1']
+    assert store.read()['plaid_transaction_id'].tolist() == ['a', 'b']
+
+    store.commit(10, {1: second}, replace=True)
+    assert sorted(store.manifest['partitions']) == ['1']
+    assert store.read(1).empty
+
+    # another partition size drops every earlier partition
+    store.commit(20, {0: store.write_partition(0, 20, transactions([(12, 'b', 2.0)]))})
+    assert sorted(store.manifest['partitions']) == ['0']
+    assert store.read(12)['amount'].tolist() == [2.0]
+
+
+def test_stale_partitions_compare_watermarks(tmp_path):
+    """Report partitions that are new or whose max created_at or row count changed."""
+    store = SnapshotStore(str(tmp_path))
+    at = datetime.datetime(2020, 1, 3)
+    store.commit(10, {
+        p: store.write_partition(p, 10, transactions([(p * 10, 'a', 1.0)]), watermark={'max_created_at': str(at), 'rows': 1})
+        for p in (0, 1, 2)
+    })
+
+    utility = FakeUtility([(0, at, 1), (1, at, 2), (2, at + datetime.timedelta(days=1), 1), (3, at, 1)])
+    assert stale_partitions(store, utility) == [1, 2, 3]
+
+
+def test_manifest_reloads_rewritten_file(tmp_path):
+    """Serve a snapshot built by another process without a restart."""
+    server = SnapshotStore(str(tmp_path))
+    assert not server.exists()
+
+    builder = SnapshotStore(str(tmp_path))
+    builder.commit(10, {0: builder.write_partition(0, 10, transactions([(1, 'a', 1.0)]))})
+
+    assert server.exists()
+    assert server.read(1)['plaid_transaction_id'].tolist() == ['a']
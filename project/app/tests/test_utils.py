@@ -0,0 +1,310 @@
+import contextlib
+import datetime
+import json
+
+import numpy as np
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.api.categories import categories
+from app.api.cube import MonthlyCube
+from app.api.queries import TRANSACTION_DATES, TRANSACTION_DTYPES, TRANSACTION_FEATURES
+from app.api.schema import compact_transactions
+from app.api.snapshot import SnapshotStore
+from app.api.utils import SaverlifeUtility, Visualize
+from app.main import app
+
+
+class FakeCursor(object):
+    def __init__(self, csv: str = '', rows: list = ()):
+        self.csv = csv
+        self.rows = rows
+        self.itersize = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def mogrify(self, query, params=None):
+        return query.encode()
+
+    def copy_expert(self, sql, sink):
+        sink.write(self.csv.encode())
+
+    def execute(self, query, params=None):
+        pass
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class FakeConnection(object):
+    def __init__(self, csv: str = '', rows: list = ()):
+        self.csv = csv
+        self.rows = rows
+
+    def cursor(self, name: str = None):
+        return FakeCursor(self.csv, self.rows)
+
+    def commit(self):
+        pass
+
+
+class FakePool(object):
+    def __init__(self, csv: str = '', rows: list = ()):
+        self.csv = csv
+        self.rows = rows
+
+    @contextlib.contextmanager
+    def connection(self):
+        yield FakeConnection(self.csv, self.rows)
+
+
+def utility(csv: str = '', rows: list = ()):
+    """A SaverlifeUtility reading from a fake connection instead of the database."""
+    utility = type(SaverlifeUtility)()
+    utility._pool = FakePool(csv, rows)
+    return utility
+
+
+def some_category_id():
+    return str(categories.frame()['category_id'].iloc[0])
+
+
+def test_handle_copy_parses_null_integers():
+    """Parse a NULL amount_cents instead of failing the whole frame."""
+    category = some_category_id()
+    csv = (','.join(TRANSACTION_FEATURES) + '\n'
+           f'7,1,2020-01-03,1250,{category},2020-01-04 10:00:00,p1,Oakland,CA,37.8,-122.2,\n'
+           f'7,2,2020-01-05,,{category},2020-01-06 10:00:00,p2,,,,,\n')
+
+    x = utility(csv).handle_copy('transactions_by_account', (7,), dtype=TRANSACTION_DTYPES,
+                                 parse_dates=TRANSACTION_DATES)
+    assert len(x) == 2
+    assert pd.isna(x['amount_cents'].iloc[1])
+
+    df = SaverlifeUtility._wrangle_transactions(x)
+    assert df['id'].dtype == np.int64
+    assert df['amount'].iloc[0] == 12.5
+    assert np.isnan(df['amount'].iloc[1])
+
+
+def transaction_rows(accounts: dict):
+    """Raw transaction rows, ordered by account, from {account: [plaid_transaction_id, ...]}."""
+    category = some_category_id()
+    rows = []
+    for account, plaid_ids in accounts.items():
+        for plaid_id in plaid_ids:
+            at = datetime.datetime(2020, 1, 1 + len(rows))
+            rows.append((account, len(rows) + 1, at, -100 * len(rows), category, at, plaid_id, '', '', None, None, None))
+    return rows
+
+
+def test_iter_transactions_closes_chunks_on_account_boundaries():
+    """Close a chunk at the first account boundary after a limit, never within an account."""
+    rows = transaction_rows({1: ['a', 'b', 'c'], 2: ['d', 'e'], 3: ['f'], 4: ['g', 'h', 'i', 'j']})
+    source = utility(rows=rows)
+
+    def edges(**kwargs):
+        return [chunk['bank_account_id'].tolist() for chunk in source.iter_transactions(wrangle=False, **kwargs)]
+
+    assert edges(chunk_rows=4) == [[1, 1, 1, 2, 2], [3, 4, 4, 4, 4]]
+    assert edges(chunk_rows=None, chunk_accounts=3) == [[1, 1, 1, 2, 2, 3], [4, 4, 4, 4]]
+    assert edges(chunk_rows=1) == [[1, 1, 1], [2, 2], [3], [4, 4, 4, 4]]
+    assert edges(chunk_rows=None) == [[1, 1, 1, 2, 2, 3, 4, 4, 4, 4]]
+
+
+def test_iter_transactions_removes_duplicates_as_one_frame():
+    """Drop the same duplicates chunk by chunk as from the whole frame."""
+    rows = transaction_rows({1: ['a', 'a', 'b'], 2: ['c', 'c'], 3: ['d', 'e', 'd']})
+    source = utility(rows=rows)
+
+    chunks = list(source.iter_transactions(chunk_rows=2))
+    expected = SaverlifeUtility._wrangle_transactions(pd.DataFrame(rows, columns=TRANSACTION_FEATURES))
+
+    assert [chunk['bank_account_id'].unique().tolist() for chunk in chunks] == [[1], [2], [3]]
+    assert pd.concat(chunks)['id'].tolist() == expected['id'].tolist() == [1, 3, 4, 6, 7]
+
+
+def step_by_step_wrangle(x):
+    """The wrangling pipeline `_wrangle_transactions` replaced, one full-size frame per step."""
+    X = x.copy()
+    X.replace('', np.nan, inplace=True)
+    X = X.fillna(value=np.nan)
+    for i in ['date', 'created_at']:
+        X[i] = pd.to_datetime(X[i], format="%m/%d/%Y, %H:%M:%S", errors='raise')
+    X = X.drop_duplicates(subset='plaid_transaction_id').reset_index(drop=True)
+    X.rename(columns={'amount_cents': 'amount'}, inplace=True)
+    X['amount'] = (X['amount'] / 100).round(2)
+    X = pd.merge(X, categories.frame(), on='category_id')
+    X = compact_transactions(X)
+
+    X = X.sort_values("date")
+    X["amount"] = X["amount"].astype(int)
+    X["formatted_date"] = X.date.dt.strftime('%Y-%m-%d')
+    X.sort_values("formatted_date", ascending=False, inplace=True)
+    return X
+
+
+def test_single_pass_wrangle_matches_step_by_step():
+    """Match the previous pipeline on empty strings, duplicates and unknown category ids."""
+    known = categories.frame()['category_id'].tolist()
+    rows = [
+        (1, 1, datetime.datetime(2020, 1, 3), -1250, known[0], datetime.datetime(2020, 1, 3), 'a', 'Oakland', 'CA', 37.8, -122.2, 'checking'),
+        (1, 2, datetime.datetime(2020, 1, 3), 4000, known[1], datetime.datetime(2020, 1, 4), 'b', '', '', None, None, ''),
+        (1, 3, datetime.datetime(2020, 2, 1), -99, known[0], datetime.datetime(2020, 2, 1), 'a', 'Oakland', 'CA', 37.8, -122.2, 'checking'),
+        (1, 4, datetime.datetime(2020, 2, 9), -5, '99999999', datetime.datetime(2020, 2, 9), 'c', 'Fresno', 'CA', 36.7, -119.8, 'savings'),
+        (2, 5, datetime.datetime(2020, 3, 9), 12345, known[2], datetime.datetime(2020, 3, 9), 'd', 'Fresno', '', None, None, 'savings'),
+        (2, 6, datetime.datetime(2020, 1, 9), -700, known[1], datetime.datetime(2020, 1, 9), 'e', '', 'NV', 39.5, -119.8, ''),
+    ]
+    x = pd.DataFrame(rows, columns=TRANSACTION_FEATURES)
+
+    visualize = Visualize.__new__(Visualize)
+    visualize.user_transactions_df = SaverlifeUtility._wrangle_transactions(x)
+    single = visualize.handle_transaction_timeseries_data()
+    legacy = step_by_step_wrangle(x)
+
+    key = ['plaid_transaction_id']
+    legacy = legacy.sort_values(key).reset_index(drop=True)
+    single = single.sort_values(key).reset_index(drop=True)
+    single = single[legacy.columns].astype({'formatted_date': object})
+    assert single['plaid_transaction_id'].tolist() == ['a', 'b', 'd', 'e']
+    pd.testing.assert_frame_equal(legacy, single, check_categorical=False)
+
+
+def test_cached_transactions_are_fetched_in_full_after_max_age():
+    """Catch up on expired entries incrementally, but fetch in full once past the max age."""
+    source = utility()
+    source._transaction_cache.ttl = 0
+    fetches = []
+
+    rows = transaction_rows({7: ['a', 'b', 'c']})[:2]
+
+    def fetch(bank_account_id=None, since=None, **kwargs):
+        fetches.append('since' if since else 'full')
+        return pd.DataFrame([row for row in rows if not since or row[1] > since[1]], columns=TRANSACTION_FEATURES)
+
+    source._fetch_transactions_dataframe = fetch
+    source.handle_statement = lambda name, params, fetchone=False: (None, rows[-1][1], len(rows))
+
+    source._generate_dataframe('transactions', bank_account_id='7', source='database')
+    rows.append(transaction_rows({7: ['a', 'b', 'c']})[2])
+    source._generate_dataframe('transactions', bank_account_id='7', source='database')
+    source._transaction_max_age = 0
+    df = source._generate_dataframe('transactions', bank_account_id='7', source='database')
+
+    assert fetches == ['full', 'since', 'full']
+    assert df['plaid_transaction_id'].tolist() == ['a', 'b', 'c']
+
+
+def test_reposted_transaction_rebuilds_cube_cells(tmp_path):
+    """Rebuild an account whose new rows repeat an earlier plaid_transaction_id, instead of adding them."""
+    source = utility()
+    source._cube = MonthlyCube(root=str(tmp_path), ttl=0)
+    rows = transaction_rows({7: ['a', 'b']})
+    reposted = rows[0][:1] + (3,) + rows[0][2:5] + (datetime.datetime(2020, 2, 1),) + rows[0][6:]
+    fetches = []
+
+    def fetch(bank_account_id=None, since=None, **kwargs):
+        fetches.append('since' if since else 'full')
+        new = [reposted] if fetches.count('since') else []
+        return pd.DataFrame(new if since else rows + new, columns=TRANSACTION_FEATURES)
+
+    source._fetch_transactions_dataframe = fetch
+
+    def handle_statement(name, params, fetchone=False):
+        if name == 'transaction_account_version':
+            return None, 3, 2 + fetches.count('since')
+        return (params[3] == ['a'],)
+
+    source.handle_statement = handle_statement
+
+    first = source.monthly_aggregates('7')
+    second = source.monthly_aggregates('7')
+
+    assert fetches == ['full', 'since', 'full']
+    assert second['amount'].sum() == first['amount'].sum()
+    assert second['count'].sum() == 2
+
+
+def test_monthly_aggregates_follow_the_configured_source(tmp_path, monkeypatch):
+    """Aggregate snapshot transactions when SAVERLIFE_TRANSACTION_SOURCE is 'snapshot'."""
+    monkeypatch.setenv('SAVERLIFE_TRANSACTION_SOURCE', 'snapshot')
+    store = SnapshotStore(str(tmp_path))
+    transactions = SaverlifeUtility._wrangle_transactions(
+        pd.DataFrame(transaction_rows({7: ['a', 'b']}), columns=TRANSACTION_FEATURES))
+    store.commit(10, {0: store.write_partition(0, 10, transactions)})
+    monkeypatch.setattr(SaverlifeUtility, '_snapshot_store', store)
+    monkeypatch.setattr(SaverlifeUtility, 'monthly_aggregates', None)
+
+    visualize = Visualize(user_id='7')
+
+    assert visualize.monthly_aggregates_df['count'].sum() == 2
+    assert visualize.monthly_category_sums['amount'].sum() == int(transactions['amount'].sum())
+    assert visualize.categorized_bar_chart_per_month()['data']
+
+
+def test_non_numeric_accounts_have_no_cube_cells():
+    """Return empty cells for a user id that is not an account id, without touching the database."""
+    source = utility()
+    source._fetch_transactions_dataframe = None
+
+    assert source.monthly_aggregates('abc').empty
+    assert source.monthly_aggregates(None).empty
+    assert Visualize(user_id='abc', source='database').is_empty('monthly_aggregates_df')
+
+
+def test_deleted_transactions_are_fetched_in_full(tmp_path):
+    """Fetch an account in full, and rebuild its cube cells, once its row count drops."""
+    rows = transaction_rows({7: ['a', 'b', 'c']})
+    fetches = []
+
+    def fetch(bank_account_id=None, since=None, **kwargs):
+        fetches.append('since' if since else 'full')
+        return pd.DataFrame([] if since else rows, columns=TRANSACTION_FEATURES)
+
+    source = utility()
+    source._transaction_cache.ttl = 0
+    source._cube = MonthlyCube(root=str(tmp_path), ttl=0)
+    source._fetch_transactions_dataframe = fetch
+    source.handle_statement = lambda name, params, fetchone=False: (None, rows[-1][1], len(rows))
+
+    source._generate_dataframe('transactions', bank_account_id='7', source='database')
+    source.monthly_aggregates('7')
+    del rows[1]
+    df = source._generate_dataframe('transactions', bank_account_id='7', source='database')
+    cells = source.monthly_aggregates('7')
+
+    assert fetches == ['full', 'full', 'since', 'full', 'since', 'full']
+    assert df['plaid_transaction_id'].tolist() == ['a', 'c']
+    assert cells['count'].sum() == 2
+
+
+def test_batch_render_reports_failed_graphs_and_continues(monkeypatch):
+    """Stream a details line for a graph that fails to render, and the other users' graphs."""
+    frames = {
+        user_id: SaverlifeUtility._wrangle_transactions(
+            pd.DataFrame(transaction_rows({int(user_id): ['a', 'b']}), columns=TRANSACTION_FEATURES))
+        for user_id in ('7', '8')
+    }
+    monkeypatch.setattr(SaverlifeUtility, 'transactions_by_accounts', lambda user_ids, months=None: frames)
+    chart = Visualize.categorized_bar_chart_per_month
+
+    def fails_for_eight(self):
+        if self.user_id == '8':
+            raise ValueError("no bars")
+        return chart(self)
+
+    monkeypatch.setattr(Visualize, 'categorized_bar_chart_per_month', fails_for_eight)
+
+    response = TestClient(app).post('/dev/requestvisual/batch', json={
+        'user_ids': ['7', '8'], 'graph_types': ['CategoryBarMonth', 'TransactionTable']})
+    lines = {(line['user_id'], line['graph_type']): line for line in map(json.loads, response.text.splitlines())}
+
+    assert response.status_code == 200
+    assert len(lines) == 4
+    assert 'figure' in lines[('7', 'CategoryBarMonth')]
+    assert lines[('8', 'CategoryBarMonth')]['details'][0]['msg'] == 'ValueError: no bars'
+    assert 'figure' in lines[('8', 'TransactionTable')]
@@ -0,0 +1,98 @@
+"""Compare building the monthly bar chart with one `go.Bar` per month against `monthly_bar_figure`.
+
+Runs on synthetic monthly category sums; both figures are checked to
+serialize to the same JSON. Run from the `project` directory:
+
+    python -m benchmarks.bar_chart --months 60 --categories 80
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from app.api.categories import categories
+from app.api.figures import monthly_bar_figure
+
+
+def synthetic_monthly_sums(months: int, n_categories: int, seed: int = 0):
+    """Return zero-filled monthly sums per category_name, as `Visualize.monthly_category_sums`."""
+    rng = np.random.default_rng(seed)
+    names = categories.frame()['category_name'].drop_duplicates().sample(n_categories, random_state=seed).tolist()
+    dates = pd.date_range('2016-01-31', periods=months, freq='M')
+    df = pd.DataFrame({
+        'category_name': np.repeat(names, months),
+        'date': np.tile(dates, n_categories),
+        'amount': rng.integers(-500, 500, months * n_categories) * (rng.random(months * n_categories) < 0.4)
+    })
+    return df
+
+
+def legacy_bar_chart(monthly):
+    """The per-month `go.Bar` construction, with one strftime pass per month."""
+    def helper_function_for_trace_visibility(len_array, i):
+        intermediate_array = [False] * len_array
+        intermediate_array[i] = True
+        return intermediate_array
+    df = monthly.sort_values("date")
+    df = df.loc[df['amount'] != 0]
+    months_of_interest = df.date.dt.strftime('%Y-%m').unique().tolist()
+    df['label'] = df['amount'].apply(lambda x: 'outflow' if x >= 0 else 'inflow')
+    df = df.sort_values(['amount'], ascending=True)
+    colorsIdx = {'inflow': '#C01089', 'outflow': '#4066B0'}
+
+    length_of_interest = len(months_of_interest)
+    list_of_monthly_dfs = [df[df.date.dt.strftime('%Y-%m') == month] for month in months_of_interest]
+
+    fig = go.Figure()
+    for i in range(len(list_of_monthly_dfs)):
+        cols = list_of_monthly_dfs[i]['label'].map(colorsIdx)
+        fig.add_trace(go.Bar(y=list(list_of_monthly_dfs[i].category_name),
+                             x=list(list_of_monthly_dfs[i].amount),
+                             name=str(list_of_monthly_dfs[i].date.dt.strftime('%Y-%m').iloc[0]),
+                             visible=i == length_of_interest - 1,
+                             orientation='h',
+                             marker=dict(color=cols)))
+    fig.update_layout(font_family='Arial', template='simple_white', height=800)
+    fig.update_layout(
+        updatemenus=[
+            dict(active=length_of_interest-1, buttons=list([
+                    dict(label=months_of_interest[i],
+                         method="update",
+                         args=[{"visible": helper_function_for_trace_visibility(length_of_interest, i)},
+                               {"annotations": []}]) for i in range(length_of_interest)]))])
+    return fig.to_json()
+
+
+def single_pass_bar_chart(monthly):
+    return pio.to_json(monthly_bar_figure(monthly), validate=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--months', type=int, default=60)
+    parser.add_argument('--categories', type=int, default=80)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    monthly = synthetic_monthly_sums(args.months, args.categories)
+
+    print(f"{'builder':<14}{'seconds':>12}")
+    results = {}
+    for name, build in (('go.Bar', legacy_bar_chart), ('figure dict', single_pass_bar_chart)):
+        best = float('inf')
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            results[name] = build(monthly)
+            best = min(best, time.perf_counter() - started)
+        print(f"{name:<14}{best:>12.4f}")
+
+    assert json.loads(results['go.Bar']) == json.loads(results['figure dict'])
+    print("outputs match")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Compare the tuple and COPY extraction paths of `_fetch_transactions_dataframe`.
+
+Runs against the database configured through the POSTGRES_*_EXTERNAL
+environment variables. Run from the `project` directory:
+
+    python -m benchmarks.extraction --bank-account-id 45153
+    python -m benchmarks.extraction --sample-size 500 --seed 1 --repeat 3
+"""
+import argparse
+import time
+import tracemalloc
+
+from app.api.utils import SaverlifeUtility
+
+
+def measure(extraction: str, repeat: int, **kwargs):
+    """Return best wall time, peak traced memory and the last frame."""
+    best = float('inf')
+    peak = 0
+    df = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        started = time.perf_counter()
+        df = SaverlifeUtility._fetch_transactions_dataframe(extraction=extraction, **kwargs)
+        elapsed = time.perf_counter() - started
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        best = min(best, elapsed)
+    return best, peak, df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bank-account-id', default=None)
+    parser.add_argument('--sample-size', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    kwargs = {'bank_account_id': args.bank_account_id, 'sample_size': args.sample_size, 'seed': args.seed}
+
+    print(f"{'extraction':<12}{'rows':>10}{'seconds':>12}{'peak MiB':>12}{'frame MiB':>12}")
+    for extraction in ('tuple', 'copy'):
+        seconds, peak, df = measure(extraction, args.repeat, **kwargs)
+        frame = df.memory_usage(deep=True).sum()
+        print(f"{extraction:<12}{len(df):>10}{seconds:>12.4f}{peak / 2**20:>12.2f}{frame / 2**20:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
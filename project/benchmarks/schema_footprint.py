@@ -0,0 +1,69 @@
+"""Report bytes per row of wrangled transaction frames before and after `compact_transactions`.
+
+Builds a synthetic frame with the columns and value distribution of a
+wrangled transaction frame, stored the way `_wrangle_transactions` used to
+store it (object strings, int64 ids, float64 coordinates). Run from the
+`project` directory:
+
+    python -m benchmarks.schema_footprint --rows 1000000 --accounts 5000
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from app.api.categories import categories, CATEGORY_LEVELS
+from app.api.schema import compact_transactions
+
+
+CITIES = ['Los Angeles', 'Houston', 'Phoenix', 'Chicago', 'Atlanta', 'Miami', 'Dallas', 'Denver', 'Seattle', 'Boston']
+STATES = ['CA', 'TX', 'AZ', 'IL', 'GA', 'FL', 'CO', 'WA', 'MA', 'NY']
+PURPOSES = ['checking', 'savings', 'credit', 'other']
+
+
+def synthetic_transactions(rows: int, accounts: int, seed: int = 0):
+    """Return a wrangled-shape transaction frame with object string columns."""
+    rng = np.random.default_rng(seed)
+    frame = categories.frame()
+    positions = rng.integers(0, len(frame), rows)
+    missing = rng.random(rows) < 0.3
+
+    df = pd.DataFrame({
+        'bank_account_id': np.sort(rng.integers(1, accounts * 10, rows)),
+        'id': np.arange(rows, dtype=np.int64) + 1,
+        'date': pd.Timestamp('2018-01-01') + pd.to_timedelta(rng.integers(0, 3 * 365, rows), unit='D'),
+        'amount': (rng.integers(-100000, 100000, rows) / 100).round(2),
+        'category_id': frame['category_id'].to_numpy()[positions],
+        'created_at': pd.Timestamp('2018-01-01') + pd.to_timedelta(rng.integers(0, 3 * 365 * 86400, rows), unit='s'),
+        'plaid_transaction_id': [f"{i:037x}" for i in rng.integers(0, 2**62, rows)],
+        'merchant_city': np.where(missing, None, rng.choice(CITIES, rows)),
+        'merchant_state': np.where(missing, None, rng.choice(STATES, rows)),
+        'lat': np.where(missing, np.nan, rng.uniform(25, 49, rows)),
+        'lon': np.where(missing, np.nan, rng.uniform(-124, -67, rows)),
+        'purpose': rng.choice(PURPOSES, rows),
+    })
+    for level in CATEGORY_LEVELS:
+        df[level] = frame[level].to_numpy()[positions]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--accounts', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = synthetic_transactions(args.rows, args.accounts, seed=args.seed)
+    before = df.memory_usage(index=False, deep=True)
+    after = compact_transactions(df.copy()).memory_usage(index=False, deep=True)
+
+    print(f"{'column':<28}{'before B/row':>14}{'after B/row':>14}")
+    for column in df.columns:
+        print(f"{column:<28}{before[column] / args.rows:>14.2f}{after[column] / args.rows:>14.2f}")
+    print(f"{'total':<28}{before.sum() / args.rows:>14.2f}{after.sum() / args.rows:>14.2f}")
+    print(f"{args.rows} rows: {before.sum() / 2**20:.1f} MiB -> {after.sum() / 2**20:.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Compare serializing the transactions table with `fig.to_json()` against `dumps` of the figure dict.
+
+Run from the `project` directory:
+
+    python -m benchmarks.serialization --rows 100000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from app.api.figures import transactions_table_figure
+from app.api.serialization import dumps
+from benchmarks.schema_footprint import synthetic_transactions
+
+
+def table_frame(rows: int, seed: int = 0):
+    """Return a table-ready frame, as `Visualize.transaction_time_series_df`."""
+    df = synthetic_transactions(rows, 1, seed=seed)
+    df['amount'] = df['amount'].astype(int)
+    df['formatted_date'] = pd.Categorical(np.datetime_as_string(df['date'].to_numpy(), unit='D'))
+    return df.astype({'category_name': 'category', 'parent_category_name': 'category',
+                      'grandparent_category_name': 'category'})
+
+
+def plotly_table(df):
+    """The go.Table construction serialized with fig.to_json()."""
+    fig = go.Figure(data=[go.Table(header=dict(values=["Date", "Amount", "Category", "Parent Category",
+                                                       "Grandparent Category"],
+                                               fill_color='lightgray',
+                                               align='left'),
+                                   cells=dict(values=[df.formatted_date, df.amount, df.category_name,
+                                                      df.parent_category_name, df.grandparent_category_name],
+                                              fill_color='whitesmoke',
+                                              align='left'))])
+    fig.update_layout(title_text="Transactions: User 1", title_font_size=30)
+    return fig.to_json().encode('utf-8')
+
+
+def figure_dict_table(df):
+    return dumps(transactions_table_figure(df, title="Transactions: User 1"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = table_frame(args.rows)
+
+    print(f"{'serializer':<14}{'seconds':>12}{'KiB':>12}")
+    results = {}
+    for name, serialize in (('fig.to_json', plotly_table), ('dumps', figure_dict_table)):
+        best = float('inf')
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            results[name] = serialize(df)
+            best = min(best, time.perf_counter() - started)
+        print(f"{name:<14}{best:>12.4f}{len(results[name]) / 1024:>12.1f}")
+
+    assert json.loads(results['fig.to_json']) == json.loads(results['dumps'])
+    print("outputs match")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Compare the single-pass transaction wrangling with the previous step-by-step pipeline.
+
+Both pipelines run on the same synthetic raw frame, shaped like the rows of
+`_fetch_transactions_dataframe`, followed by the time series preparation of
+`Visualize`. That both produce the same frame is tested in
+`app/tests/test_utils.py`. Run from the `project` directory:
+
+    python -m benchmarks.wrangle --rows 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from app.api.categories import categories, CATEGORY_LEVELS
+from app.api.schema import compact_transactions
+from app.api.utils import SaverlifeUtility, Visualize
+from benchmarks.schema_footprint import synthetic_transactions
+
+
+def raw_transactions(rows: int, seed: int = 0):
+    """Return raw transaction rows: cents, string category ids, empty strings and duplicates."""
+    df = synthetic_transactions(rows, max(rows // 200, 1), seed=seed).drop(columns=CATEGORY_LEVELS)
+    df = df.rename(columns={'amount': 'amount_cents'})
+    df['amount_cents'] = (df['amount_cents'] * 100).round().astype('int64')
+    df['merchant_city'] = df['merchant_city'].where(df['merchant_city'].notna(), '')
+    # one row in a hundred repeats a plaid_transaction_id
+    df.loc[df.index[1::100], 'plaid_transaction_id'] = df['plaid_transaction_id'].iloc[0:-1:100].to_numpy()
+    return df
+
+
+def legacy_wrangle(x):
+    """The step-by-step pipeline, one full-size frame per step."""
+    X = x.copy()
+    X.replace('', np.nan, inplace=True)
+    X = X.fillna(value=np.nan)
+    for i in ['date', 'created_at']:
+        X[i] = pd.to_datetime(X[i], format="%m/%d/%Y, %H:%M:%S", errors='raise')
+    X = X.drop_duplicates(subset='plaid_transaction_id').reset_index(drop=True)
+    X.rename(columns={'amount_cents': 'amount'}, inplace=True)
+    X['amount'] = (X['amount'] / 100).round(2)
+    X = pd.merge(X, categories.frame(), on='category_id')
+    X = compact_transactions(X)
+
+    X = X.sort_values("date")
+    X["amount"] = X["amount"].astype(int)
+    X["formatted_date"] = X.date.dt.strftime('%Y-%m-%d')
+    X.sort_values("formatted_date", ascending=False, inplace=True)
+    return X
+
+
+def single_pass_wrangle(x):
+    """`_wrangle_transactions` followed by `Visualize.handle_transaction_timeseries_data`."""
+    visualize = Visualize.__new__(Visualize)
+    visualize.user_transactions_df = SaverlifeUtility._wrangle_transactions(x)
+    return visualize.handle_transaction_timeseries_data()
+
+
+def measure(wrangle, x, repeat: int):
+    """Return best wall time, peak traced memory and the last result.
+
+    Timed runs are untraced; tracemalloc slows object-heavy pandas code
+    considerably, so peak memory comes from one separate traced run.
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        result = None
+        started = time.perf_counter()
+        result = wrangle(x)
+        best = min(best, time.perf_counter() - started)
+
+    result = None
+    tracemalloc.start()
+    result = wrangle(x)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    x = raw_transactions(args.rows, seed=args.seed)
+
+    print(f"{'pipeline':<14}{'rows':>10}{'seconds':>12}{'peak MiB':>12}")
+    for name, wrangle in (('step-by-step', legacy_wrangle), ('single-pass', single_pass_wrangle)):
+        seconds, peak, result = measure(wrangle, x, args.repeat)
+        print(f"{name:<14}{len(result):>10}{seconds:>12.4f}{peak / 2**20:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()